@@ -1,11 +1,48 @@
 from blockchain_project import Transaction, Block, Blockchain
+from blockchain_project.checkpoints import load_checkpoints
+
+from app.api.config.env import STORAGE_ENCODING, WIRE_ENCODING, MEMPOOL_MAX_SIZE, MEMPOOL_MAX_BYTES, \
+                               BLOCK_MAX_TRANSACTIONS, BLOCK_MAX_BYTES, SIGNATURE_BACKEND, SIGNATURE_WORKERS, \
+                               SIGNATURE_MIN_BATCH, SIGNATURE_CACHE_SIZE, VERIFYING_KEY_CACHE_SIZE, \
+                               VERIFYING_KEY_PRECOMPUTE_THRESHOLD, CHECKPOINTS_FILE, CHECKPOINTS_PUBLIC_KEY, \
+                               PEER_CONCURRENCY, PEER_TIMEOUT, PEER_MAX_CONNECTIONS, PEER_MAX_KEEPALIVE_CONNECTIONS, \
+                               PEER_KEEPALIVE_EXPIRY, PEER_HTTP2, SEEN_CACHE_SIZE, SEEN_CACHE_TTL, \
+                               RELAY_WINDOW, RELAY_BATCH_SIZE, SYNC_BATCH_BLOCKS, SYNC_WINDOW
+
+def create_blockchain() -> Blockchain:
+    return Blockchain(chain_file_name="blockchain.json",
+                      storage_encoding=STORAGE_ENCODING,
+                      wire_encoding=WIRE_ENCODING,
+                      mempool_max_size=MEMPOOL_MAX_SIZE,
+                      mempool_max_bytes=MEMPOOL_MAX_BYTES,
+                      block_max_transactions=BLOCK_MAX_TRANSACTIONS,
+                      block_max_bytes=BLOCK_MAX_BYTES,
+                      signature_backend=SIGNATURE_BACKEND,
+                      signature_workers=SIGNATURE_WORKERS,
+                      signature_min_batch=SIGNATURE_MIN_BATCH,
+                      signature_cache_size=SIGNATURE_CACHE_SIZE,
+                      verifying_key_cache_size=VERIFYING_KEY_CACHE_SIZE,
+                      verifying_key_precompute_threshold=VERIFYING_KEY_PRECOMPUTE_THRESHOLD,
+                      peer_concurrency=PEER_CONCURRENCY,
+                      peer_timeout=PEER_TIMEOUT,
+                      peer_max_connections=PEER_MAX_CONNECTIONS,
+                      peer_max_keepalive_connections=PEER_MAX_KEEPALIVE_CONNECTIONS,
+                      peer_keepalive_expiry=PEER_KEEPALIVE_EXPIRY,
+                      peer_http2=PEER_HTTP2,
+                      seen_cache_size=SEEN_CACHE_SIZE,
+                      seen_cache_ttl=SEEN_CACHE_TTL,
+                      relay_window=RELAY_WINDOW,
+                      relay_batch_size=RELAY_BATCH_SIZE,
+                      sync_batch_blocks=SYNC_BATCH_BLOCKS,
+                      sync_window=SYNC_WINDOW,
+                      checkpoints=load_checkpoints(CHECKPOINTS_FILE, CHECKPOINTS_PUBLIC_KEY) if CHECKPOINTS_FILE else [])
 
 # Instantiating the blockchain
-_blockchain_instance = Blockchain(chain_file_name="blockchain.json")
+_blockchain_instance = create_blockchain()
 
 def get_blockchain():
     return _blockchain_instance
 
 def reset_blockchain():
     global _blockchain_instance
-    _blockchain_instance = Blockchain(chain_file_name="blockchain.json")
\ No newline at end of file
+    _blockchain_instance = create_blockchain()
\ No newline at end of file
@@ -10,6 +10,35 @@ PRODUCTION_SERVER_URL = os.getenv('PRODUCTION_SERVER_URL')
 DEVELOPMENT_SERVER_URL = os.getenv('DEVELOPMENT_SERVER_URL')
 IS_PRODUCTION = os.getenv('IS_PRODUCTION') # Boolean to determine if is prod environment or nah
 
+# Node configuration
+STORAGE_ENCODING = os.getenv('STORAGE_ENCODING', 'json') # Encoding of the stored blocks: json or binary
+WIRE_ENCODING = os.getenv('WIRE_ENCODING', 'json') # Encoding of the blocks and transactions sent to peers: json or binary
+MEMPOOL_MAX_SIZE = int(os.getenv('MEMPOOL_MAX_SIZE', 10000)) # Maximum number of unconfirmed transactions (0 means unbounded)
+MEMPOOL_MAX_BYTES = int(os.getenv('MEMPOOL_MAX_BYTES', 32000000)) # Maximum size in bytes of the unconfirmed transactions (0 means unbounded)
+BLOCK_MAX_TRANSACTIONS = int(os.getenv('BLOCK_MAX_TRANSACTIONS', 1000)) # Maximum number of transactions in a mined block (0 means unbounded)
+BLOCK_MAX_BYTES = int(os.getenv('BLOCK_MAX_BYTES', 1000000)) # Maximum size in bytes of the transactions in a mined block (0 means unbounded)
+SIGNATURE_BACKEND = os.getenv('SIGNATURE_BACKEND', 'ecdsa') # ECDSA implementation: ecdsa (pure Python) or coincurve (libsecp256k1, optional)
+SIGNATURE_WORKERS = int(os.getenv('SIGNATURE_WORKERS', 0)) # Processes verifying block signatures (0 means one per core, 1 disables the pool)
+SIGNATURE_MIN_BATCH = int(os.getenv('SIGNATURE_MIN_BATCH', 64)) # Smaller batches of signatures are verified serially
+SIGNATURE_CACHE_SIZE = int(os.getenv('SIGNATURE_CACHE_SIZE', 100000)) # Verified signatures remembered by the node (0 disables the cache)
+VERIFYING_KEY_CACHE_SIZE = int(os.getenv('VERIFYING_KEY_CACHE_SIZE', 4096)) # Parsed public keys of the recent signers (0 disables the cache)
+VERIFYING_KEY_PRECOMPUTE_THRESHOLD = int(os.getenv('VERIFYING_KEY_PRECOMPUTE_THRESHOLD', 64)) # Verifications after which a signer key is precomputed (0 disables it)
+CHECKPOINTS_FILE = os.getenv('CHECKPOINTS_FILE') # JSON file of trusted checkpoints (height, hash, state_digest), the history below them skips the transaction checks
+CHECKPOINTS_PUBLIC_KEY = os.getenv('CHECKPOINTS_PUBLIC_KEY') # When set, the checkpoints file must be signed by this key
+PEER_CONCURRENCY = int(os.getenv('PEER_CONCURRENCY', 16)) # Peers contacted at the same time by the announcements and the consensus (0 means all of them)
+PEER_TIMEOUT = float(os.getenv('PEER_TIMEOUT', 5.0)) # Seconds given to each peer for an announcement or consensus request (0 means no timeout)
+PEER_MAX_CONNECTIONS = int(os.getenv('PEER_MAX_CONNECTIONS', 100)) # Connections to the peers open at the same time (0 means unbounded)
+PEER_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('PEER_MAX_KEEPALIVE_CONNECTIONS', 20)) # Idle connections to the peers kept open for reuse (0 means unbounded)
+PEER_KEEPALIVE_EXPIRY = float(os.getenv('PEER_KEEPALIVE_EXPIRY', 30.0)) # Seconds an idle connection to a peer is kept open
+PEER_HTTP2 = os.getenv('PEER_HTTP2', 'true').lower() == 'true' # Use HTTP/2 with the peers that support it (needs the h2 package)
+REGISTER_TIMEOUT = float(os.getenv('REGISTER_TIMEOUT', 300.0)) # Seconds given to a peer to send its whole chain when connecting to it (0 means no timeout)
+SEEN_CACHE_SIZE = int(os.getenv('SEEN_CACHE_SIZE', 100000)) # Transaction and block hashes remembered to stop gossip loops (0 disables the cache)
+SEEN_CACHE_TTL = float(os.getenv('SEEN_CACHE_TTL', 600.0)) # Seconds a seen hash is remembered (0 means until the cache is full)
+RELAY_WINDOW = float(os.getenv('RELAY_WINDOW', 0.05)) # Seconds the transactions to a peer are coalesced before being relayed in one message (0 relays them at once)
+RELAY_BATCH_SIZE = int(os.getenv('RELAY_BATCH_SIZE', 500)) # Transactions relayed to a peer in one message at most (1000 at most)
+SYNC_BATCH_BLOCKS = int(os.getenv('SYNC_BATCH_BLOCKS', 100)) # Blocks per request when synchronizing with a peer
+SYNC_WINDOW = int(os.getenv('SYNC_WINDOW', 4)) # Block requests in flight when synchronizing with a peer
+
 # IncidentsBug library configuration
 JIRA_PROJECT_ID = os.getenv('JIRA_PROJECT_ID')
 RABBIT_USER = os.getenv('RABBIT_USER') # Your Jira credentials
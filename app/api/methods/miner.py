@@ -40,8 +40,8 @@ async def mine_block(initial_delay: float = 33):
             else:
                 logger.info("No transactions to mine.")
 
-            # Save the blockchain
-            blockchain.save_chain()
+            # Save the blockchain (only new blocks are appended), the file I/O runs out of the event loop
+            await blockchain.save_chain_async()
 
             await asyncio.sleep(33)
     except asyncio.CancelledError:
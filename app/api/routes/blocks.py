@@ -16,10 +16,15 @@ from app.api.methods.methods import handle_error
 # Blockchain project import
 from app.api.config.blockchain import get_blockchain
 
-from blockchain_project.blocks import Block, BlockWithAdditionalData
+from blockchain_project.blocks import Block, BlockWithAdditionalData, BlockHeader
+from blockchain_project.codec import decode_block
 
 router = APIRouter()
 
+MAX_BLOCKS_PER_REQUEST = 500
+MAX_HEADERS_PER_REQUEST = 2000
+MAX_LOCATOR_HASHES = 128
+
 # Log file name
 log_filename = f"api_{API_NAME}.log"
 
@@ -54,6 +59,53 @@ def add_new_block(block: BlockWithAdditionalData, request: Request):
     try:
         blockchain = get_blockchain()
         logger.info("Adding new block...")
+        if blockchain.has_seen(block.hash):
+            logger.info("Block already known.")
+            return block.dict()
+        if not blockchain.add_block(block, block.hash):
+            raise HTTPException(status_code=400, detail="The block was discarded by the node.")
+        logger.info("Block added to the blockchain.")
+        return block.dict()
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.post('/block/binary/', 
+            response_model=BlockWithAdditionalData,
+            status_code=status.HTTP_200_OK, 
+            tags=["BLOCKS"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                400: {"model": ResponseError, "description": "Invalid data."},
+            })
+@limiter.limit("5/minute")
+async def add_new_binary_block(request: Request):
+    """
+    Add a new block to the blockchain, sent by a peer in the binary format.
+    
+    Body:
+    - bytes: The block encoded with blockchain_project.codec.
+
+    Returns:
+    - BlockWithAdditionalData: The block added to the blockchain.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info("Adding new binary block...")
+
+        try:
+            block = decode_block(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid data")
+
+        if blockchain.has_seen(block.hash):
+            logger.info("Block already known.")
+            return block.dict()
         if not blockchain.add_block(block, block.hash):
             raise HTTPException(status_code=400, detail="The block was discarded by the node.")
         logger.info("Block added to the blockchain.")
@@ -64,4 +116,189 @@ def add_new_block(block: BlockWithAdditionalData, request: Request):
         # This is to ensure HTTPException is not caught in the generic Exception
         raise
     except Exception as e:
-        handle_error(e, logger)
\ No newline at end of file
+        handle_error(e, logger)
+
+@router.get('/block/{height}/', 
+            response_model=BlockWithAdditionalData,
+            status_code=status.HTTP_200_OK, 
+            tags=["BLOCKS"],
+            responses={
+                404: {"model": ResponseError, "description": "Block not found."},
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+            })
+@limiter.limit("500/minute")
+def get_block(height: int, request: Request):
+    """
+    Get a block by its height.
+    
+    Args:
+    - height (int): The height (index) of the block.
+
+    Returns:
+    - BlockWithAdditionalData: The block at the given height.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Fetching block #{height}.")
+
+        block = blockchain.get_block(height)
+        if block is None:
+            raise HTTPException(status_code=404, detail="Block not found.")
+
+        return block
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.get('/block/hash/{block_hash}/', 
+            response_model=BlockWithAdditionalData,
+            status_code=status.HTTP_200_OK, 
+            tags=["BLOCKS"],
+            responses={
+                404: {"model": ResponseError, "description": "Block not found."},
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+            })
+@limiter.limit("500/minute")
+def get_block_by_hash(block_hash: str, request: Request):
+    """
+    Get a block by its hash.
+    
+    Args:
+    - block_hash (str): The hash of the block.
+
+    Returns:
+    - BlockWithAdditionalData: The block with the given hash.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Fetching block {block_hash}.")
+
+        block = blockchain.get_block_by_hash(block_hash)
+        if block is None:
+            raise HTTPException(status_code=404, detail="Block not found.")
+
+        return block
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.get('/blocks/', 
+            response_model=list[BlockWithAdditionalData],
+            status_code=status.HTTP_200_OK, 
+            tags=["BLOCKS"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                400: {"model": ResponseError, "description": "Invalid data."},
+            })
+@limiter.limit("500/minute")
+def get_blocks(start: int, end: int, request: Request):
+    """
+    Get a range of blocks by height.
+    
+    Args:
+    - start (int): The height of the first block (inclusive).
+    - end (int): The height of the last block (exclusive). At most MAX_BLOCKS_PER_REQUEST blocks are returned.
+
+    Returns:
+    - list[BlockWithAdditionalData]: The blocks in the range.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Fetching blocks #{start} to #{end}.")
+
+        if start < 0 or end < start:
+            raise HTTPException(status_code=400, detail="Invalid data")
+
+        return blockchain.get_blocks(start, min(end, start + MAX_BLOCKS_PER_REQUEST))
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.get('/headers/', 
+            response_model=list[BlockHeader],
+            status_code=status.HTTP_200_OK, 
+            tags=["BLOCKS"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                400: {"model": ResponseError, "description": "Invalid data."},
+            })
+@limiter.limit("500/minute")
+def get_headers(start: int, end: int, request: Request):
+    """
+    Get a range of block headers by height, for light clients.
+    
+    Args:
+    - start (int): The height of the first header (inclusive).
+    - end (int): The height of the last header (exclusive). At most MAX_HEADERS_PER_REQUEST headers are returned.
+
+    Returns:
+    - list[BlockHeader]: The headers in the range.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Fetching headers #{start} to #{end}.")
+
+        if start < 0 or end < start:
+            raise HTTPException(status_code=400, detail="Invalid data")
+
+        return blockchain.get_headers(start, min(end, start + MAX_HEADERS_PER_REQUEST))
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.post('/headers/locate/', 
+            response_model=list[BlockHeader],
+            status_code=status.HTTP_200_OK, 
+            tags=["BLOCKS"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                400: {"model": ResponseError, "description": "Invalid data."},
+            })
+@limiter.limit("500/minute")
+def locate_headers(locator: List[str], request: Request):
+    """
+    Get the headers after the common ancestor with a node, for a headers-first synchronization.
+    
+    Args:
+    - locator (list[str]): Block hashes of the node, from its last block down to its genesis block (see Blockchain.get_block_locator).
+
+    Returns:
+    - list[BlockHeader]: The headers after the first locator hash found in the chain (from the genesis block if none is),
+      at most MAX_HEADERS_PER_REQUEST.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Locating the headers after {len(locator)} block hashes.")
+
+        if len(locator) > MAX_LOCATOR_HASHES:
+            raise HTTPException(status_code=400, detail="Invalid data")
+
+        return blockchain.locate_headers(locator, MAX_HEADERS_PER_REQUEST)
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
@@ -18,6 +18,7 @@ from app.api.config.blockchain import get_blockchain
 
 from blockchain_project.blocks import Block, BlockWithAdditionalData
 from blockchain_project.transactions import Transaction, TransactionWithAdditionalData
+from blockchain_project.checkpoints import Checkpoint
 
 router = APIRouter()
 
@@ -83,5 +84,59 @@ def get_unconfirmed_transactions(request: Request):
     except HTTPException:
         # This is to ensure HTTPException is not caught in the generic Exception
         raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.get('/crypto/stats/', 
+            response_model=dict[str, dict[str, int]],
+            status_code=status.HTTP_200_OK, 
+            tags=["CHAIN"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."}
+            })
+@limiter.limit("500/minute")
+def get_crypto_stats(request: Request):
+    """
+    Retrieve the counters of the signature verification caches.
+    
+    Returns:
+    - dict: The size, hits and misses of the verified signature cache and of the verifying key cache.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info("Fetching the signature verification stats.")
+        return blockchain.get_crypto_stats()
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.get('/checkpoint/', 
+            response_model=Checkpoint,
+            status_code=status.HTTP_200_OK, 
+            tags=["CHAIN"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."}
+            })
+@limiter.limit("500/minute")
+def get_checkpoint(request: Request):
+    """
+    Retrieve the checkpoint of the last block, to be distributed (signed) to the new nodes.
+    
+    Returns:
+    - Checkpoint: The height and hash of the last block and the digest of the state after it.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info("Fetching the checkpoint of the last block.")
+        return blockchain.create_checkpoint()
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
     except Exception as e:
         handle_error(e, logger)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import asyncio
+import httpx
 from fastapi import APIRouter, HTTPException, Request, Depends, status
 from pydantic import IPvAnyAddress
-import requests
 from slowapi.errors import RateLimitExceeded
 from bson import ObjectId
 from typing import Any, Dict, List
@@ -11,7 +11,7 @@ import logging
 # Configuration, models, methods and authentication modules imports
 #from app.api.config.db import database
 from app.api.config.limiter import limiter
-from app.api.config.env import API_NAME
+from app.api.config.env import API_NAME, REGISTER_TIMEOUT
 from app.api.models.models import ResponseError
 #from app.api.auth.auth import auth_handler
 from app.api.methods.methods import handle_error
@@ -21,6 +21,7 @@ from app.api.methods.miner import mine_block
 from app.api.config.blockchain import get_blockchain, reset_blockchain
 
 from blockchain_project.blockchain import Blockchain
+from blockchain_project.network import peer_client
 
 router = APIRouter()
 
@@ -177,8 +178,11 @@ async def connect_to_new_node(node_address: str, request: Request):
 
         logger.info(f"Connecting to {node_address} from {address}.")
 
-        # Connect to the node and get the response
-        response = requests.post(f"http://{node_address}/api/v1/blockchain/register/{address}/{blockchain.node_id}/")
+        # Connect to the node and get the response (through the connection pool shared by the peer requests),
+        # the response carries the whole chain so it gets a longer timeout than the other peer requests
+        client = peer_client.get()
+        response = await client.post(f"http://{node_address}/api/v1/blockchain/register/{address}/{blockchain.node_id}/",
+                                     timeout=httpx.Timeout(REGISTER_TIMEOUT or None, connect=5.0))
 
         # If the status code is 200, it means that everything went well.
         # Update the blockchain and the peers.
@@ -196,7 +200,7 @@ async def connect_to_new_node(node_address: str, request: Request):
         
             # Send the peers to the new peer node
             logger.info(f"Sending peers to {node_address}.")
-            response = requests.post(f"http://{node_address}/api/v1/blockchain/register/peers/", json=blockchain.peers)
+            response = await client.post(f"http://{node_address}/api/v1/blockchain/register/peers/", json=blockchain.peers)
 
             if response.status_code != 200:
                 logger.error("Failed to send peers to the new peer node.")
@@ -204,7 +208,7 @@ async def connect_to_new_node(node_address: str, request: Request):
             
             # Get the next mining time
             logger.info(f"Getting the next mining time from {node_address}.")
-            response = requests.get(f"http://{node_address}/api/v1/blockchain/mining/time/")
+            response = await client.get(f"http://{node_address}/api/v1/blockchain/mining/time/")
 
             if response.status_code != 200:
                 logger.error("Failed to get the next mining time from the new peer node.")
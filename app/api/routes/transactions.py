@@ -15,11 +15,17 @@ from app.api.models.models import ResponseError
 from app.api.methods.methods import handle_error
 
 # Blockchain project import
-from blockchain_project import Transaction, TransactionType, TransactionWithAdditionalData
+from blockchain_project import Transaction, TransactionType, TransactionWithAdditionalData, TransactionReceipt, MerkleProof, \
+                               MempoolFullError
+from blockchain_project.codec import decode_transaction, decode_transactions
+from blockchain_project.network import NODE_ID_HEADER
 from app.api.config.blockchain import get_blockchain
 
 router = APIRouter()
 
+MAX_INVENTORY_HASHES = 1000
+MAX_TRANSACTIONS_PER_BATCH = 1000
+
 # Log file name
 log_filename = f"api_{API_NAME}.log"
 
@@ -38,7 +44,8 @@ logger = logging.getLogger(__name__)
             responses={
                 400: {"model": ResponseError, "description": "Invalid transaction data."},
                 500: {"model": ResponseError, "description": "Internal server error."},
-                429: {"model": ResponseError, "description": "Too many requests."}
+                429: {"model": ResponseError, "description": "Too many requests."},
+                503: {"model": ResponseError, "description": "The mempool is full, retry later."}
             })
 @limiter.limit("500/minute")
 async def add_new_transaction(transaction: Transaction, request: Request):
@@ -48,7 +55,7 @@ async def add_new_transaction(transaction: Transaction, request: Request):
     - transaction (Transaction): Transaction data to be added.
     
     Returns:
-    - str: Response message after adding the transaction.
+    - list[TransactionWithAdditionalData]: The unconfirmed transactions of the node after adding the transaction.
     """
     try:
         blockchain = get_blockchain()
@@ -74,6 +81,10 @@ async def add_new_transaction(transaction: Transaction, request: Request):
         return blockchain.get_unconfirmed_transactions()
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
+    except MempoolFullError as e:
+        # Back-pressure, not a failure of the node
+        logger.info(str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
     except HTTPException:
         # This is to ensure HTTPException is not caught in the generic Exception
         raise
@@ -81,7 +92,7 @@ async def add_new_transaction(transaction: Transaction, request: Request):
         handle_error(e, logger)
 
 @router.post('/transaction/node/', 
-            response_model=list[TransactionWithAdditionalData], 
+            response_model=List[str], 
             status_code=status.HTTP_201_CREATED, 
             tags=["TRANSACTIONS"],
             responses={
@@ -97,13 +108,18 @@ async def receive_transaction(transaction: TransactionWithAdditionalData, reques
     - transaction (TransactionWithAdditionalData): Transaction data to be added.
     
     Returns:
-    - str: Response message after adding the transaction.
+    - list[str]: The hash of the transaction if it was added, empty if it was already known.
     """
     try:
         blockchain = get_blockchain()
         logger.info("Adding a new transaction.")
         logger.debug(f"Transaction data: {transaction.dict()}") # Using debug level for transaction details
         
+        # Transactions seen recently, pending or confirmed are neither admitted nor relayed again
+        if blockchain.has_seen(transaction.hash):
+            logger.info("Transaction already exists.")
+            return []
+
         # Verify the transaction data (signature, ...)
         logger.info("Verifying the transaction.")
         if not blockchain.is_valid_transaction(transaction):
@@ -112,18 +128,270 @@ async def receive_transaction(transaction: TransactionWithAdditionalData, reques
         if blockchain.add_new_unconfirmed_transaction_from_node(transaction):
             logger.info("Transaction successfully added.")
 
-            # Propagate the transaction to other nodes
+            # Propagate the transaction to other nodes, except the one it came from
             logger.info("Propagating the transaction to other nodes.")
-            await blockchain.announce_new_transaction(transaction)
+            await blockchain.announce_new_transaction(transaction, origin=request.headers.get(NODE_ID_HEADER))
             logger.info("Transaction successfully propagated.")
-        else:
+            return [transaction.hash]
+
+        logger.info("Transaction already exists.")
+        return []
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.post('/transactions/node/', 
+            response_model=List[str], 
+            status_code=status.HTTP_201_CREATED, 
+            tags=["TRANSACTIONS"],
+            responses={
+                400: {"model": ResponseError, "description": "Invalid transaction data."},
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."}
+            })
+@limiter.limit("500/minute")
+async def receive_transactions(transactions: List[TransactionWithAdditionalData], request: Request):
+    """Add a batch of new transactions to the blockchain from other node (batched relay).
+    
+    Args:
+    - transactions (list[TransactionWithAdditionalData]): The transactions, at most MAX_TRANSACTIONS_PER_BATCH.
+    
+    Returns:
+    - list[str]: The hashes of the transactions added, the others were already known or invalid.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Adding a batch of {len(transactions)} transactions.")
+
+        if len(transactions) > MAX_TRANSACTIONS_PER_BATCH:
+            raise HTTPException(status_code=400, detail="Invalid transaction.")
+
+        # The batch is validated at once
+        added_transactions = blockchain.add_new_unconfirmed_transactions_from_node(transactions)
+        logger.info(f"{len(added_transactions)} transactions successfully added.")
+
+        # Propagate the added transactions to other nodes, except the one they came from
+        if added_transactions:
+            logger.info("Propagating the transactions to other nodes.")
+            await blockchain.announce_new_transactions(added_transactions, origin=request.headers.get(NODE_ID_HEADER))
+
+        return [transaction.hash for transaction in added_transactions]
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.post('/transactions/node/binary/', 
+            response_model=List[str], 
+            status_code=status.HTTP_201_CREATED, 
+            tags=["TRANSACTIONS"],
+            responses={
+                400: {"model": ResponseError, "description": "Invalid transaction data."},
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."}
+            })
+@limiter.limit("500/minute")
+async def receive_binary_transactions(request: Request):
+    """Add a batch of new transactions to the blockchain from other node, sent in the binary format (batched relay).
+    
+    Body:
+    - bytes: The transactions encoded with blockchain_project.codec, at most MAX_TRANSACTIONS_PER_BATCH.
+    
+    Returns:
+    - list[str]: The hashes of the transactions added, the others were already known or invalid.
+    """
+    try:
+        blockchain = get_blockchain()
+
+        try:
+            transactions = decode_transactions(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid transaction.")
+
+        logger.info(f"Adding a batch of {len(transactions)} binary transactions.")
+        if len(transactions) > MAX_TRANSACTIONS_PER_BATCH:
+            raise HTTPException(status_code=400, detail="Invalid transaction.")
+
+        # The batch is validated at once
+        added_transactions = blockchain.add_new_unconfirmed_transactions_from_node(transactions)
+        logger.info(f"{len(added_transactions)} transactions successfully added.")
+
+        # Propagate the added transactions to other nodes, except the one they came from
+        if added_transactions:
+            logger.info("Propagating the transactions to other nodes.")
+            await blockchain.announce_new_transactions(added_transactions, origin=request.headers.get(NODE_ID_HEADER))
+
+        return [transaction.hash for transaction in added_transactions]
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.post('/transaction/inventory/', 
+            response_model=List[str], 
+            status_code=status.HTTP_200_OK, 
+            tags=["TRANSACTIONS"],
+            responses={
+                400: {"model": ResponseError, "description": "Invalid data."},
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."}
+            })
+@limiter.limit("500/minute")
+def receive_transaction_inventory(hashes: List[str], request: Request):
+    """Receive the hashes of the transactions a node announces (inventory gossip).
+    
+    Args:
+    - hashes (list[str]): The hashes of the announced transactions, at most MAX_INVENTORY_HASHES.
+    
+    Returns:
+    - list[str]: The hashes of the transactions this node does not have, the announcing node sends their bodies
+      to /transaction/node/.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Receiving an inventory of {len(hashes)} transactions.")
+
+        if len(hashes) > MAX_INVENTORY_HASHES:
+            raise HTTPException(status_code=400, detail="Invalid data")
+
+        return blockchain.get_unknown_transactions(hashes)
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.post('/transaction/node/binary/', 
+            response_model=List[str], 
+            status_code=status.HTTP_201_CREATED, 
+            tags=["TRANSACTIONS"],
+            responses={
+                400: {"model": ResponseError, "description": "Invalid transaction data."},
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."}
+            })
+@limiter.limit("500/minute")
+async def receive_binary_transaction(request: Request):
+    """Add a new transaction to the blockchain from other node, sent in the binary format.
+    
+    Body:
+    - bytes: The transaction encoded with blockchain_project.codec.
+    
+    Returns:
+    - list[str]: The hash of the transaction if it was added, empty if it was already known.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info("Adding a new binary transaction.")
+
+        try:
+            transaction = decode_transaction(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid transaction.")
+
+        # Transactions seen recently, pending or confirmed are neither admitted nor relayed again
+        if blockchain.has_seen(transaction.hash):
             logger.info("Transaction already exists.")
+            return []
 
-        return blockchain.get_unconfirmed_transactions()
+        # Verify the transaction data (signature, ...)
+        logger.info("Verifying the transaction.")
+        if not blockchain.is_valid_transaction(transaction):
+            raise HTTPException(status_code=400, detail="Invalid transaction.")
+
+        if blockchain.add_new_unconfirmed_transaction_from_node(transaction):
+            logger.info("Transaction successfully added.")
+
+            # Propagate the transaction to other nodes, except the one it came from
+            logger.info("Propagating the transaction to other nodes.")
+            await blockchain.announce_new_transaction(transaction, origin=request.headers.get(NODE_ID_HEADER))
+            logger.info("Transaction successfully propagated.")
+            return [transaction.hash]
+
+        logger.info("Transaction already exists.")
+        return []
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
     except HTTPException:
         # This is to ensure HTTPException is not caught in the generic Exception
         raise
     except Exception as e:
-        handle_error(e, logger)
\ No newline at end of file
+        handle_error(e, logger)
+
+@router.get('/transaction/status/{transaction_hash}/', 
+            response_model=TransactionReceipt, 
+            status_code=status.HTTP_200_OK, 
+            tags=["TRANSACTIONS"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."}
+            })
+@limiter.limit("500/minute")
+def get_transaction_status(transaction_hash: str, request: Request):
+    """Get the status of a transaction by its hash.
+    
+    Args:
+    - transaction_hash (str): The hash of the transaction.
+    
+    Returns:
+    - TransactionReceipt: Whether the transaction is confirmed (with its block and position), pending or unknown.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Fetching the status of the transaction {transaction_hash}.")
+
+        return blockchain.get_transaction_receipt(transaction_hash)
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
+
+@router.get('/transaction/proof/{transaction_hash}/', 
+            response_model=MerkleProof, 
+            status_code=status.HTTP_200_OK, 
+            tags=["TRANSACTIONS"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                404: {"model": ResponseError, "description": "Transaction not found."}
+            })
+@limiter.limit("500/minute")
+def get_transaction_proof(transaction_hash: str, request: Request):
+    """Get the Merkle inclusion proof of a confirmed transaction.
+    
+    Args:
+    - transaction_hash (str): The hash of the transaction.
+    
+    Returns:
+    - MerkleProof: The sibling hashes from the transaction to the Merkle root, and the header of the block.
+    """
+    try:
+        blockchain = get_blockchain()
+        logger.info(f"Fetching the Merkle proof of the transaction {transaction_hash}.")
+
+        proof = blockchain.get_merkle_proof(transaction_hash)
+        if proof is None:
+            raise HTTPException(status_code=404, detail="Transaction not found.")
+        return proof
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except HTTPException:
+        # This is to ensure HTTPException is not caught in the generic Exception
+        raise
+    except Exception as e:
+        handle_error(e, logger)
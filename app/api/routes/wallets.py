@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException, Request, Depends, status
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, status
 from slowapi.errors import RateLimitExceeded
-from typing import List
+from typing import List, Optional
 import pymongo.errors
 import logging
 
@@ -113,24 +113,39 @@ def get_wallet_balance(public_key: str, request: Request):
                 500: {"model": ResponseError, "description": "Internal server error."},
                 429: {"model": ResponseError, "description": "Too many requests."}
             })
-@limiter.limit("50/hour")
-def get_wallet_transactions(public_key: str, request: Request):
+@limiter.limit("500/minute")
+def get_wallet_transactions(public_key: str, request: Request, response: Response,
+                            cursor: Optional[str] = None, limit: Optional[int] = None, newest_first: bool = False):
     """Get transactions associated with a wallet.
     
     Args:
     - public_key (str): The public key of the wallet.
+    - cursor (Optional[str]): The X-Next-Cursor header of the previous page, to get the next one.
+    - limit (Optional[int]): The maximum number of transactions to return.
+    - newest_first (bool): True to get the most recent transactions first.
     
     Returns:
     - List[TransactionWithAdditionalData]: List of transactions associated with the wallet.
+      When there may be more transactions, the X-Next-Cursor header has the cursor of the next page.
     """
     try:
         blockchain = get_blockchain()
         logger.info(f"Fetching transactions for wallet {public_key}.")
 
-        transactions = blockchain.get_transactions_for_wallet(public_key)
+        if limit is not None and limit <= 0:
+            raise HTTPException(status_code=400, detail="Invalid data")
+
+        try:
+            transactions, next_cursor = blockchain.get_wallet_history(public_key, cursor, limit, newest_first)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+
         if transactions is None:
             raise HTTPException(status_code=404, detail="Wallet not found.")
 
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+
         logger.info(f"Found {len(transactions)} transactions for wallet {public_key}.")
         return transactions
     except HTTPException:
@@ -0,0 +1,53 @@
+import json
+import uuid
+
+import pytest
+
+from blockchain_project import Blockchain, Transaction, TransactionType, TransactionWithAdditionalData
+from blockchain_project.crypto import sign_message
+
+# Treasury wallet (see clients/wallet_config.json), funded by the genesis state
+PRIVATE_KEY = "d1c038626f6552f55fbfa0732b5424f48cc366fca322292bed79ec7439ae639b"
+PUBLIC_KEY = "eea28673cdf0a5d5bb429aac8be6ff29520d436cd402af205776ae3bbf428d9055ede3bf09b6c802c99c40e444a0a5e84afcf32b9ed648d008e08d09334fbb6e"
+RECEIVER = "ab" * 64
+
+def new_transaction(amount: float, receiver: str = RECEIVER) -> Transaction:
+    content = {"sender": PUBLIC_KEY, "receiver": receiver, "amount": amount}
+    signature = sign_message(json.dumps(content, separators=(',', ':')).encode(), PRIVATE_KEY)
+    return Transaction(uuid=str(uuid.uuid4()), type=TransactionType.COIN_TRANSFER, content=content, signature=signature)
+
+def relayed(transaction: TransactionWithAdditionalData) -> TransactionWithAdditionalData:
+    # The copy a peer receives
+    return TransactionWithAdditionalData.parse_raw(transaction.json())
+
+def reload(blockchain: Blockchain, **settings) -> Blockchain:
+    # A node restarted from the files of another one
+    reloaded = Blockchain(chain_file_name=blockchain.chain_file_name, signature_workers=1, **settings)
+    reloaded.load_from_file()
+    return reloaded
+
+@pytest.fixture
+def new_blockchain(tmp_path):
+    """
+    Factory of nodes validating every block themselves (both genesis validators are the node).
+    """
+    def factory(name: str = "node", **settings) -> Blockchain:
+        settings.setdefault("signature_workers", 1)
+        blockchain = Blockchain(chain_file_name=str(tmp_path / f"{name}.json"), **settings)
+        blockchain.peers = {"localhost:8000": blockchain.node_id, "localhost:8001": blockchain.node_id}
+        return blockchain
+    return factory
+
+@pytest.fixture
+def mine_blocks():
+    """
+    Mine blocks of transfers from the treasury, it returns the mined transactions.
+    """
+    def mine(blockchain: Blockchain, blocks: int, per_block: int = 2, receiver: str = RECEIVER) -> list[TransactionWithAdditionalData]:
+        transactions = []
+        for _ in range(blocks):
+            for i in range(per_block):
+                transactions.append(blockchain.add_new_unconfirmed_transaction(new_transaction(float(i + 1), receiver)))
+            assert blockchain.mine()
+        return transactions
+    return mine
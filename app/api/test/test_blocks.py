@@ -0,0 +1,67 @@
+import pytest
+
+from blockchain_project.blocks.methods import compute_merkle_root, compute_merkle_proof, verify_merkle_proof
+
+from conftest import new_transaction, relayed
+
+def test_relayed_transaction_with_a_wrong_hash_is_rejected(new_blockchain):
+    node, peer = new_blockchain("node"), new_blockchain("peer")
+    transaction = relayed(peer.add_new_unconfirmed_transaction(new_transaction(5.0)))
+    transaction.hash = "00" * 32
+
+    assert not node.add_new_unconfirmed_transaction_from_node(transaction)
+    assert len(node.unconfirmed_transactions) == 0
+
+def test_mining_drops_transactions_with_a_wrong_hash(new_blockchain):
+    node = new_blockchain()
+    bad = node.add_new_unconfirmed_transaction(new_transaction(5.0))
+    bad.hash = "00" * 32 # Corrupted after admission, it can never be mined
+    node.add_new_unconfirmed_transaction(new_transaction(1.0))
+
+    assert not node.mine()
+    assert len(node.chain) == 1
+    assert len(node.unconfirmed_transactions) == 1
+
+    # The chain grows again without it
+    assert node.mine()
+    assert len(node.chain) == 2
+    assert node.get_balance(new_transaction(1.0).content.receiver) == 1.0
+
+def test_blocks_commit_to_their_transactions(new_blockchain, mine_blocks):
+    node = new_blockchain()
+    mine_blocks(node, 1)
+    block, block_hash = node.last_block, node.last_block.hash
+    assert block.has_valid_merkle_root()
+    assert node.is_valid_proof(block, block_hash)
+
+    block.transactions[0].content.amount = 1000.0
+    assert not node.is_valid_proof(block, block_hash)
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8])
+def test_merkle_proofs_of_every_position(count):
+    hashes = [f"{i:064x}" for i in range(count)]
+    root = compute_merkle_root(hashes)
+    for position, transaction_hash in enumerate(hashes):
+        proof = compute_merkle_proof(hashes, position)
+        assert verify_merkle_proof(transaction_hash, proof, root)
+        assert not verify_merkle_proof("ff" * 32, proof, root)
+        if proof:
+            side, sibling = proof[0]
+            assert not verify_merkle_proof(transaction_hash, [("right" if side == "left" else "left", sibling)] + proof[1:], root)
+    # A promoted node is not duplicated: a list and its copy with the last hash repeated have different roots
+    assert compute_merkle_root(hashes + hashes[-1:]) != root
+    with pytest.raises(IndexError):
+        compute_merkle_proof(hashes, count)
+
+def test_node_serves_proofs_of_confirmed_transactions(new_blockchain, mine_blocks):
+    node = new_blockchain()
+    transactions = mine_blocks(node, 2, per_block=3)
+    pending = node.add_new_unconfirmed_transaction(new_transaction(4.0))
+
+    for transaction in transactions:
+        proof = node.get_merkle_proof(transaction.hash)
+        assert proof.verify()
+        # The header is the one of the block of the chain
+        assert proof.header.compute_hash() == node.chain[proof.block_height].hash
+        assert proof.copy(update={"transaction_hash": pending.hash}).verify() is False
+    assert node.get_merkle_proof(pending.hash) is None
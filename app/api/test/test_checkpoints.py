@@ -0,0 +1,95 @@
+import pytest
+
+import blockchain_project.blocks.classes as block_classes
+from blockchain_project import BlockWithAdditionalData, CheckpointList, TransactionType, TransactionWithAdditionalData
+from blockchain_project.checkpoints import load_checkpoints
+from blockchain_project.crypto import sign_message
+
+from conftest import PRIVATE_KEY, PUBLIC_KEY
+
+@pytest.fixture
+def chain_dump(new_blockchain, mine_blocks):
+    blockchain = new_blockchain("source")
+    mine_blocks(blockchain, 8, per_block=3)
+    return blockchain, [block.dict() for block in blockchain.chain]
+
+@pytest.fixture
+def checkpoint(new_blockchain, chain_dump):
+    # The checkpoint of height 5 comes from a node that applied the blocks up to it
+    _, dump = chain_dump
+    blockchain = new_blockchain("checkpointer")
+    assert blockchain.create_chain_from_dump(dump[:6])
+    return blockchain.create_checkpoint()
+
+@pytest.fixture
+def count_signature_checks(monkeypatch):
+    calls = []
+    get_signature_items = BlockWithAdditionalData.get_signature_items
+    def counted(block):
+        calls.append(block.index)
+        return get_signature_items(block)
+    monkeypatch.setattr(block_classes.BlockWithAdditionalData, "get_signature_items", counted)
+    return calls
+
+def forged_chain(genesis: BlockWithAdditionalData, amount: float, length: int) -> list[BlockWithAdditionalData]:
+    """
+    A chain of blocks with unsigned transfers from the treasury, with valid hashes and Merkle roots.
+    """
+    blocks, previous = [genesis], genesis
+    for index in range(1, length):
+        transaction = TransactionWithAdditionalData(type=TransactionType.COIN_TRANSFER, content={"sender": PUBLIC_KEY, "receiver": "cd" * 64, "amount": amount},
+                                                    signature="00" * 64)
+        transaction.hash = transaction.compute_hash()
+        block = BlockWithAdditionalData(index=index, transactions=[transaction], previous_hash=previous.hash)
+        block.merkle_root = block.compute_merkle_root()
+        block.hash = block.compute_hash()
+        blocks.append(block)
+        previous = block
+    return blocks
+
+def test_blocks_up_to_the_checkpoint_skip_the_signatures(new_blockchain, chain_dump, checkpoint, count_signature_checks):
+    source, dump = chain_dump
+    blockchain = new_blockchain("node", checkpoints=[checkpoint])
+
+    assert blockchain.create_chain_from_dump(dump)
+    assert sorted(count_signature_checks) == [6, 7, 8]
+    assert blockchain.balances == source.balances
+
+def test_state_digest_mismatch_is_rejected(new_blockchain, chain_dump, checkpoint):
+    _, dump = chain_dump
+    blockchain = new_blockchain("node", checkpoints=[checkpoint.copy(update={"state_digest": "00"})])
+
+    assert not blockchain.create_chain_from_dump(dump)
+    assert len(blockchain.chain) == checkpoint.height
+
+@pytest.mark.parametrize("length", [2, 7, 10])
+def test_forged_chains_are_fully_checked(new_blockchain, checkpoint, length):
+    # Blocks that do not lead to the checkpoint hash are not trusted, whatever their indexes
+    blockchain = new_blockchain("node", checkpoints=[checkpoint])
+    balances = dict(blockchain.balances)
+
+    assert not blockchain.create_chain_from_dump(forged_chain(blockchain.chain[0], 1000000.0, length))
+    assert len(blockchain.chain) == 1
+    assert blockchain.balances == balances
+
+def test_forged_chain_is_rejected_in_batches(new_blockchain, chain_dump, checkpoint):
+    # A batch below the checkpoint height is only trusted once its hash chain is linked to the checkpoint
+    source, dump = chain_dump
+    blockchain = new_blockchain("node", checkpoints=[checkpoint])
+    assert blockchain.create_chain_from_dump(dump[:3])
+
+    forged = forged_chain(blockchain.last_block, 1000000.0, 3)[1:]
+    for height, block in enumerate(forged, start=3):
+        block.index = height
+    assert not blockchain.add_blocks(forged)
+    assert len(blockchain.chain) == 3
+
+def test_signed_checkpoint_lists(tmp_path, checkpoint):
+    checkpoint_list = CheckpointList(checkpoints=[checkpoint])
+    checkpoint_list.signature = sign_message(checkpoint_list.signed_message(), PRIVATE_KEY)
+    path = tmp_path / "checkpoints.json"
+    path.write_text(checkpoint_list.json())
+
+    assert load_checkpoints(str(path), PUBLIC_KEY) == [checkpoint]
+    with pytest.raises(ValueError):
+        load_checkpoints(str(path), "ab" * 64)
@@ -0,0 +1,72 @@
+import pydantic
+import pytest
+
+from blockchain_project import TransactionType, TransactionWithAdditionalData
+from blockchain_project.codec import encode_block, decode_block, encode_transaction, decode_transaction, \
+                                     encode_transactions, decode_transactions, dump_block, load_block
+from blockchain_project.codec.methods import CODEC_VERSION, write_string, write_varint
+
+from conftest import PUBLIC_KEY
+
+def contract_call(args) -> TransactionWithAdditionalData:
+    transaction = TransactionWithAdditionalData(type=TransactionType.SMART_CONTRACT_EXECUTION,
+                                                content={"sender": PUBLIC_KEY, "contract_address": "ab" * 20,
+                                                         "function_signature": "transfer(address,uint256)",
+                                                         "args": args, "kwargs": {"memo": "é"}},
+                                                timestamp=1700000000)
+    transaction.hash = transaction.compute_hash()
+    return transaction
+
+def test_blocks_round_trip(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 2, per_block=3)
+    block = blockchain.last_block
+
+    for decoded in [decode_block(encode_block(block)), load_block(dump_block(block, "binary")), load_block(dump_block(block))]:
+        assert decoded == block
+        assert decoded.compute_hash() == block.hash
+        assert all(transaction.has_valid_hash() for transaction in decoded.transactions)
+    assert len(encode_block(block)) < len(block.json())
+
+def test_transactions_round_trip():
+    transactions = [contract_call(["cd" * 20, 10]), contract_call([1.5])]
+    assert decode_transaction(encode_transaction(transactions[0])) == transactions[0]
+    assert decode_transactions(encode_transactions(transactions)) == transactions
+    assert all(transaction.has_valid_hash() for transaction in decode_transactions(encode_transactions(transactions)))
+
+def test_truncated_and_unknown_messages_are_rejected():
+    data = encode_transaction(contract_call([]))
+    with pytest.raises(ValueError):
+        decode_transaction(data[:-5])
+    with pytest.raises(ValueError):
+        decode_transaction(bytes([CODEC_VERSION + 1]) + data[1:])
+
+def test_peer_data_is_validated():
+    # A contract call whose arguments are not a list
+    transaction = contract_call([])
+    buffer = bytearray([CODEC_VERSION])
+    write_string(buffer, transaction.uuid)
+    buffer.append(int(transaction.type))
+    write_string(buffer, transaction.content.sender)
+    write_string(buffer, transaction.content.contract_address)
+    write_string(buffer, transaction.content.function_signature)
+    write_string(buffer, '"not a list"')
+    write_string(buffer, "{}")
+    write_string(buffer, None)
+    write_varint(buffer, 0)
+    write_string(buffer, None)
+
+    with pytest.raises(pydantic.ValidationError):
+        decode_transaction(bytes(buffer))
+
+    # The same content inside a block
+    block = bytearray([CODEC_VERSION])
+    write_varint(block, 1)
+    write_string(block, "00" * 32)
+    write_varint(block, 0)
+    write_string(block, None)
+    write_string(block, None)
+    write_varint(block, 1)
+    block += buffer[1:]
+    with pytest.raises(pydantic.ValidationError):
+        decode_block(bytes(block))
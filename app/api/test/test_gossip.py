@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from blockchain_project.network import RelayQueue, SeenCache
+
+from conftest import new_transaction, relayed
+
+def test_seen_cache_is_bounded():
+    cache = SeenCache(max_size=2, ttl=0)
+    assert cache.add("a") and cache.add("b")
+    assert not cache.add("a")
+    assert cache.add("c")
+    assert "a" not in cache and "b" in cache and "c" in cache
+
+def test_seen_cache_forgets_expired_hashes(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("blockchain_project.network.classes.time.monotonic", lambda: now[0])
+    cache = SeenCache(max_size=10, ttl=5.0)
+    cache.add("a")
+    now[0] += 4.0
+    cache.add("b")
+    assert "a" in cache
+    now[0] += 1.0
+    assert "a" not in cache and "b" in cache
+    cache.discard("b")
+    assert "b" not in cache and len(cache) == 0
+
+def test_seen_transactions_are_not_admitted_again(new_blockchain):
+    node, peer = new_blockchain("node"), new_blockchain("peer")
+    transaction = relayed(peer.add_new_unconfirmed_transaction(new_transaction(5.0)))
+    assert node.add_new_unconfirmed_transaction_from_node(transaction)
+    assert node.mine()
+
+    # Mined, it left the mempool but is still known
+    assert node.has_seen(transaction.hash)
+    assert not node.add_new_unconfirmed_transaction_from_node(relayed(transaction))
+    assert len(node.unconfirmed_transactions) == 0
+
+@pytest.mark.parametrize("undo_journal_depth", [1000, 0], ids=["journals", "replay"])
+def test_rolled_back_blocks_are_forgotten(new_blockchain, mine_blocks, undo_journal_depth):
+    node = new_blockchain(undo_journal_depth=undo_journal_depth)
+    mine_blocks(node, 3)
+    removed_blocks = node.rollback_to(1)
+
+    assert all(not node.has_seen(block.hash) for block in removed_blocks)
+    assert node.has_seen(node.last_block.hash)
+    # An announcement of the same blocks is accepted again
+    assert node.add_blocks(removed_blocks)
+    assert all(node.has_seen(block.hash) for block in removed_blocks)
+
+def test_relay_queue_coalesces_messages():
+    async def relay() -> list[list[int]]:
+        batches = []
+        async def send(items):
+            batches.append(items)
+        queue = RelayQueue(send, window=0.05, max_size=3)
+
+        # Messages within the window go together
+        queue.add(1)
+        queue.add(2)
+        assert batches == [] and len(queue) == 2
+        await asyncio.sleep(0.1)
+        assert batches == [[1, 2]]
+
+        # A full queue is sent right away
+        for item in range(3, 7):
+            queue.add(item)
+        await asyncio.sleep(0)
+        assert batches == [[1, 2], [3, 4, 5]] and len(queue) == 1
+        await queue.flush()
+        return batches
+    assert asyncio.run(relay()) == [[1, 2], [3, 4, 5], [6]]
+
+def test_relay_queue_failures_do_not_stop_flush():
+    async def relay() -> list[list[int]]:
+        batches = []
+        async def send(items):
+            batches.append(items)
+            raise OSError("peer down")
+        queue = RelayQueue(send, window=10.0, max_size=2)
+        for item in range(5):
+            queue.add(item)
+        await queue.flush()
+        return batches
+    assert asyncio.run(relay()) == [[0, 1], [2, 3], [4]]
+
+def test_relayed_batches_skip_invalid_and_repeated_transactions(new_blockchain):
+    node, peer = new_blockchain("node"), new_blockchain("peer")
+    transactions = [relayed(peer.add_new_unconfirmed_transaction(new_transaction(float(amount)))) for amount in [1, 2, 3]]
+    forged = relayed(transactions[1])
+    forged.signature = transactions[0].signature
+
+    added = node.add_new_unconfirmed_transactions_from_node([transactions[0], forged, transactions[2], relayed(transactions[0])])
+    assert [transaction.hash for transaction in added] == [transactions[0].hash, transactions[2].hash]
+    assert node.add_new_unconfirmed_transactions_from_node([transactions[1], relayed(transactions[2])]) == [transactions[1]]
+    assert len(node.unconfirmed_transactions) == 3
@@ -0,0 +1,58 @@
+from blockchain_project import TransactionStatus
+
+from conftest import PUBLIC_KEY, RECEIVER, new_transaction, reload
+
+def history(blockchain, public_key, limit, newest_first=False) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        transactions, cursor = blockchain.get_wallet_history(public_key, cursor, limit, newest_first)
+        pages.append([transaction.hash for transaction in transactions])
+        if cursor is None:
+            return pages
+
+def test_wallet_history_pages_in_both_directions(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    hashes = [transaction.hash for transaction in mine_blocks(blockchain, 3, per_block=2)]
+    other = [transaction.hash for transaction in mine_blocks(blockchain, 1, per_block=1, receiver="cd" * 64)]
+
+    assert [transaction.hash for transaction in blockchain.get_transactions_for_wallet(RECEIVER)] == hashes
+    assert history(blockchain, RECEIVER, 4) == [hashes[:4], hashes[4:]]
+    assert history(blockchain, RECEIVER, 3, newest_first=True) == [hashes[:2:-1], hashes[2::-1], []]
+    assert sum(history(blockchain, PUBLIC_KEY, 2), []) == hashes + other
+    assert blockchain.get_transactions_for_wallet("ef" * 64) == []
+
+def test_address_index_follows_rollbacks_and_restarts(new_blockchain, mine_blocks):
+    blockchain = new_blockchain(snapshot_interval=2)
+    hashes = [transaction.hash for transaction in mine_blocks(blockchain, 3, per_block=1)]
+    blockchain.save_chain()
+
+    blockchain.rollback_to(2)
+    assert [transaction.hash for transaction in blockchain.get_transactions_for_wallet(RECEIVER)] == hashes[:2]
+    mine_blocks(blockchain, 1, per_block=1, receiver="cd" * 64)
+    assert [transaction.hash for transaction in blockchain.get_transactions_for_wallet(RECEIVER)] == hashes[:2]
+
+    blockchain.save_chain()
+    reloaded = reload(blockchain)
+    for address in [RECEIVER, PUBLIC_KEY, "cd" * 64]:
+        assert reloaded.get_transactions_for_wallet(address) == blockchain.get_transactions_for_wallet(address)
+
+def test_blocks_and_transactions_are_found_by_hash(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    transactions = mine_blocks(blockchain, 2, per_block=2)
+    pending = blockchain.add_new_unconfirmed_transaction(new_transaction(3.0))
+
+    for height, block in enumerate(blockchain.chain):
+        assert blockchain.get_block_by_hash(block.hash).index == height
+    assert blockchain.get_block_by_hash("00" * 32) is None
+
+    receipt = blockchain.get_transaction_receipt(transactions[3].hash)
+    assert receipt.status == TransactionStatus.CONFIRMED
+    assert (receipt.block_height, receipt.block_hash, receipt.position) == (2, blockchain.chain[2].hash, 1)
+    assert blockchain.get_transaction_receipt(pending.hash).status == TransactionStatus.PENDING
+    assert blockchain.get_transaction_receipt("00" * 32).status == TransactionStatus.UNKNOWN
+
+    # A rolled back block and its transactions are forgotten
+    dropped = blockchain.last_block
+    blockchain.rollback_to(1)
+    assert blockchain.get_block_by_hash(dropped.hash) is None
+    assert blockchain.get_transaction_receipt(transactions[3].hash).status == TransactionStatus.UNKNOWN
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "clients"))
+import light_client
+
+class Response:
+    def __init__(self, status_code: int, data=None):
+        self.status_code = status_code
+        self.data = data
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+@pytest.fixture
+def node(new_blockchain, monkeypatch, tmp_path):
+    """
+    A node answering the requests of the light client.
+    """
+    blockchain = new_blockchain()
+    url = light_client.api_url("node")
+
+    def get(request_url: str, params: dict = None) -> Response:
+        if request_url == f"{url}/headers/":
+            return Response(200, [json.loads(header.json()) for header in blockchain.get_headers(params["start"], params["end"])])
+        transaction_hash = request_url[len(f"{url}/transaction/proof/"):-1]
+        proof = blockchain.get_merkle_proof(transaction_hash)
+        return Response(404) if proof is None else Response(200, json.loads(proof.json()))
+
+    monkeypatch.setattr(light_client.requests, "get", get)
+    monkeypatch.setattr(light_client, "HEADERS_FILE", str(tmp_path / "headers.json"))
+    return blockchain
+
+def hashes(headers: list[dict]) -> list[str]:
+    return [header["hash"] for header in headers]
+
+def test_headers_follow_the_branch_of_the_node(node, mine_blocks):
+    mine_blocks(node, 4, per_block=1)
+    headers = light_client.sync_headers("node", [])
+    assert hashes(headers) == [block.hash for block in node.chain]
+
+    # A reorganization to another branch, then a reset to a shorter chain
+    node.rollback_to(2)
+    mine_blocks(node, 3, per_block=1, receiver="cd" * 64)
+    assert hashes(light_client.sync_headers("node", headers)) == [block.hash for block in node.chain]
+    node.rollback_to(1)
+    assert hashes(light_client.sync_headers("node", headers)) == [block.hash for block in node.chain]
+    assert hashes(light_client.sync_headers("node", headers)) == [block.hash for block in node.chain]
+
+def test_transactions_of_a_new_branch_are_verified(node, mine_blocks):
+    mine_blocks(node, 3, per_block=2)
+    headers = light_client.sync_headers("node", [])
+    light_client.save_headers(headers)
+
+    node.rollback_to(1)
+    transactions = mine_blocks(node, 3, per_block=2, receiver="cd" * 64)
+    assert light_client.verify_transaction("node", transactions[-1].hash, light_client.load_headers())
+    # The headers synced to verify it were saved
+    assert hashes(light_client.load_headers()) == [block.hash for block in node.chain]
+    assert not light_client.verify_transaction("node", "00" * 32, light_client.load_headers())
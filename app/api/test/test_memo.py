@@ -0,0 +1,75 @@
+from blockchain_project import BlockWithAdditionalData
+from blockchain_project.memo import MemoizedModel
+from blockchain_project.transactions.classes import CoinTransferTransaction
+
+from conftest import RECEIVER
+
+def test_cached_block_values_follow_changes_of_the_transactions(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 1, per_block=3)
+    block = blockchain.last_block
+    block_json, merkle_root = block.json(), block.compute_merkle_root()
+
+    # A change deep in a transaction reaches the block
+    block.transactions[1].content.amount = 100.0
+    assert block.json() != block_json
+    block.transactions[1].content.amount = 2.0
+    assert block.json() == block_json
+    block.transactions[1].hash = "00" * 32
+    assert block.compute_merkle_root() != merkle_root
+
+    # An assigned content is linked as well
+    content = CoinTransferTransaction(**block.transactions[0].content.dict())
+    block.transactions[0].content = content
+    assert '"amount": 1.0' in block.json()
+    content.amount = 5.0
+    assert '"amount": 5.0' in block.json()
+
+    # Transactions added in place are linked as well
+    transaction = block.transactions.pop()
+    merkle_root = block.compute_merkle_root()
+    block.transactions.append(transaction)
+    assert block.compute_merkle_root() != merkle_root
+    transaction.hash = "11" * 32
+    assert '"hash": "' + "11" * 32 in block.json()
+
+def test_copies_and_constructed_models_are_tracked(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 1, per_block=2)
+    block = blockchain.last_block
+    block_json = block.json()
+
+    for copy in [block.copy(deep=True), BlockWithAdditionalData.construct(**dict(block.copy(deep=True)))]:
+        assert copy.json() == block_json
+        copy.transactions[0].content.amount = 100.0
+        assert copy.json() != block_json
+    assert block.json() == block_json
+
+class Item(MemoizedModel):
+    value: int
+
+class Box(MemoizedModel):
+    items: list[Item]
+
+    def total(self) -> int:
+        return self.memoize("total", lambda: sum(item.value for item in self.items))
+
+def test_items_replaced_in_place_are_not_taken_for_the_removed_ones():
+    box = Box(items=[Item(value=1)])
+    for value in range(2, 20):
+        assert box.total() == value - 1
+        # The removed item is not referenced anymore, the new one can be allocated at its address
+        box.items.pop()
+        box.items.append(Item(value=value))
+        assert box.total() == value
+
+def test_block_hash_does_not_depend_on_the_transactions(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 1, per_block=2)
+    block = blockchain.last_block
+    block_hash = block.compute_hash()
+
+    block.transactions.pop()
+    assert block.compute_hash() == block_hash # The Merkle root field was not updated
+    block.timestamp += 1
+    assert block.compute_hash() != block_hash
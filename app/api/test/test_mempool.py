@@ -0,0 +1,70 @@
+import pytest
+
+from blockchain_project import Mempool, MempoolFullError, TransactionWithAdditionalData
+from blockchain_project.mempool import transaction_size
+import blockchain_project.transactions.classes as transaction_classes
+
+from conftest import new_transaction
+
+def pending(amount: float, timestamp: int) -> TransactionWithAdditionalData:
+    transaction = TransactionWithAdditionalData(**dict(new_transaction(amount)), timestamp=timestamp)
+    transaction.hash = transaction.compute_hash()
+    return transaction
+
+def test_priority_is_the_time_the_node_received_the_transactions():
+    # A client timestamp in the past does not move a transaction ahead
+    first, second, third = pending(1.0, 2000000000), pending(2.0, 0), pending(3.0, 1000)
+    mempool = Mempool()
+    assert mempool.add(first, received=100)
+    assert mempool.add(second, received=100)
+    assert mempool.add(third, received=99)
+
+    assert mempool.select() == [third, first, second]
+    assert mempool.select(max_count=2) == [third, first]
+    assert mempool.received(second.hash) == 100
+
+def test_full_mempool_only_evicts_for_older_transactions():
+    mempool = Mempool(max_size=2)
+    old, new = pending(1.0, 0), pending(2.0, 0)
+    assert mempool.add(old, received=100) and mempool.add(new, received=101)
+
+    # A new arrival is the youngest transaction, it is rejected
+    arrival = pending(3.0, 0)
+    assert mempool.make_room(arrival, received=102) is None
+    assert len(mempool) == 2
+
+    # A transaction given back by a reorganization was received before, the youngest one makes room for it
+    returned = pending(4.0, 0)
+    assert mempool.make_room(returned, received=50) == [new]
+    assert mempool.add(returned, received=50)
+    assert mempool.select() == [returned, old]
+
+def test_byte_budget_skips_larger_transactions():
+    mempool = Mempool()
+    small, large = pending(1.0, 0), pending(2.0, 0)
+    large.content.receiver = "cd" * 128
+    mempool.add(large, received=1)
+    mempool.add(small, received=2)
+    assert mempool.select(max_bytes=transaction_size(small)) == [small]
+
+def test_defaults_are_set_per_transaction(monkeypatch):
+    class Clock:
+        @staticmethod
+        def now(tz):
+            return Clock.time.astimezone(tz)
+    for seconds in [1000, 2000]:
+        Clock.time = transaction_classes.datetime.fromtimestamp(seconds, transaction_classes.pytz.utc)
+        monkeypatch.setattr(transaction_classes, "datetime", Clock)
+        transaction = TransactionWithAdditionalData(type=0, content={"sender": "ab", "receiver": "cd", "amount": 1.0})
+        assert transaction.timestamp == seconds
+        monkeypatch.undo()
+
+    transactions = [TransactionWithAdditionalData(type=0, content={"sender": "ab", "receiver": "cd", "amount": 1.0}) for _ in range(2)]
+    assert transactions[0].uuid != transactions[1].uuid
+
+def test_new_transactions_are_refused_by_a_full_mempool(new_blockchain):
+    blockchain = new_blockchain(mempool_max_size=1)
+    blockchain.add_new_unconfirmed_transaction(new_transaction(1.0))
+    with pytest.raises(MempoolFullError):
+        blockchain.add_new_unconfirmed_transaction(new_transaction(2.0))
+    assert len(blockchain.unconfirmed_transactions) == 1
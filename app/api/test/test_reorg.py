@@ -0,0 +1,61 @@
+import pytest
+
+from conftest import PUBLIC_KEY, new_transaction, relayed
+
+def pending_amount(blockchain) -> float:
+    return sum(transaction.content.amount for transaction in blockchain.unconfirmed_transactions)
+
+@pytest.fixture(params=[1000, 0], ids=["journals", "replay"])
+def fork(request, new_blockchain, mine_blocks):
+    """
+    A node and a peer sharing two blocks, then each mining its own branch.
+    The node has a pending transaction that the branch of the peer confirms.
+    """
+    node = new_blockchain("node", undo_journal_depth=request.param)
+    mine_blocks(node, 2)
+    peer = new_blockchain("peer")
+    assert peer.create_chain_from_dump([block.dict() for block in node.chain])
+
+    shared = peer.add_new_unconfirmed_transaction(new_transaction(7.0))
+    mine_blocks(peer, 3, per_block=1)
+    mine_blocks(node, 2, per_block=3)
+    assert node.add_new_unconfirmed_transaction_from_node(relayed(shared))
+    return node, peer
+
+def test_rollback_restores_the_state_of_the_height(new_blockchain, mine_blocks):
+    node = new_blockchain()
+    mine_blocks(node, 1)
+    balances, stakes = dict(node.balances), dict(node.stakes)
+    transactions = mine_blocks(node, 2)
+
+    removed_blocks = node.rollback_to(1)
+    assert [block.index for block in removed_blocks] == [2, 3]
+    assert len(node.chain) == 2
+    assert node.balances == balances
+    assert node.stakes == stakes
+    assert all(node.get_transaction_receipt(transaction.hash).status == "unknown" for transaction in transactions)
+
+def test_reorganization_follows_the_new_branch(fork):
+    node, peer = fork
+    old_branch = node.chain[3:]
+
+    assert node.set_chain(peer.chain)
+    assert [block.hash for block in node.chain] == [block.hash for block in peer.chain]
+    assert node.balances == peer.balances
+
+    # The transfers of the old branch are pending again, the one the new branch confirmed is not
+    returned = {transaction.hash for block in old_branch for transaction in block.transactions}
+    assert {transaction.hash for transaction in node.unconfirmed_transactions} == returned
+    assert node.unconfirmed_balances[PUBLIC_KEY] == pending_amount(node) == 12.0
+
+def test_invalid_branch_restores_the_current_one(fork):
+    node, peer = fork
+    hashes = [block.hash for block in node.chain]
+    balances = dict(node.balances)
+    chain = [block.copy(deep=True) for block in peer.chain]
+    chain[-1].transactions[0].content.amount = 1000.0
+
+    assert not node.set_chain(chain)
+    assert [block.hash for block in node.chain] == hashes
+    assert node.balances == balances
+    assert node.unconfirmed_balances[PUBLIC_KEY] == pending_amount(node) == 7.0
@@ -0,0 +1,96 @@
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import blockchain_project.crypto.classes as crypto_classes
+from blockchain_project.crypto import EcdsaBackend, CoincurveBackend, SIGNATURE_BACKENDS, VerifyingKeyCache, SignatureVerifier
+from blockchain_project.crypto.methods import get_signature_backend, set_signature_backend
+
+# Treasury wallet (see clients/wallet_config.json)
+PRIVATE_KEY = "d1c038626f6552f55fbfa0732b5424f48cc366fca322292bed79ec7439ae639b"
+PUBLIC_KEY = "eea28673cdf0a5d5bb429aac8be6ff29520d436cd402af205776ae3bbf428d9055ede3bf09b6c802c99c40e444a0a5e84afcf32b9ed648d008e08d09334fbb6e"
+MESSAGE = b'{"sender":"eea2","receiver":"b9c1","amount":10.0}'
+
+# secp256k1 group order
+ORDER = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+def available_backends():
+    backends = []
+    for name, backend_class in SIGNATURE_BACKENDS.items():
+        try:
+            backends.append(pytest.param(backend_class(), id=name))
+        except ImportError:
+            backends.append(pytest.param(None, id=name, marks=pytest.mark.skip(reason=f"{name} is not installed")))
+    return backends
+
+BACKENDS = available_backends()
+
+@pytest.fixture(scope="module")
+def reference():
+    return EcdsaBackend()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_public_key_from_private_key(backend):
+    assert backend.public_key_from_private_key(PRIVATE_KEY) == PUBLIC_KEY
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_generated_keys_are_interchangeable(backend, reference):
+    private_key = backend.generate_private_key()
+    public_key = backend.public_key_from_private_key(private_key)
+    assert len(private_key) == 64 and len(public_key) == 128
+    assert reference.public_key_from_private_key(private_key) == public_key
+
+@pytest.mark.parametrize("signer", BACKENDS)
+@pytest.mark.parametrize("verifier", BACKENDS)
+def test_signatures_verify_across_backends(signer, verifier):
+    signature = signer.sign(MESSAGE, PRIVATE_KEY)
+    assert len(signature) == 128
+    assert verifier.verify(MESSAGE, signature, PUBLIC_KEY)
+    assert not verifier.verify(MESSAGE + b" ", signature, PUBLIC_KEY)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_high_s_signatures_are_accepted(backend, reference):
+    # The ecdsa package does not normalize S, both halves must be valid everywhere
+    signature = reference.sign(MESSAGE, PRIVATE_KEY)
+    r, s = signature[:64], int(signature[64:], 16)
+    for value in (s, ORDER - s):
+        assert backend.verify(MESSAGE, r + format(value, "064x"), PUBLIC_KEY)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("signature, public_key", [
+    ("zz" * 64, PUBLIC_KEY), # Not hex
+    ("00" * 64, PUBLIC_KEY), # r = s = 0
+    ("ff" * 64, PUBLIC_KEY), # r, s >= order
+    ("00" * 10, PUBLIC_KEY), # Wrong length
+    (None, PUBLIC_KEY),
+    ("00" * 64, "00" * 64), # Not a point of the curve
+    ("00" * 64, "abcd"),
+    ("00" * 64, None),
+])
+def test_malformed_inputs_are_rejected(backend, reference, signature, public_key):
+    assert backend.verify(MESSAGE, signature, public_key) is False
+    assert reference.verify(MESSAGE, signature, public_key) is False
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_cached_and_precomputed_keys(backend, reference):
+    cache = VerifyingKeyCache(backend=backend, precompute_threshold=2)
+    signature = reference.sign(MESSAGE, PRIVATE_KEY)
+    assert all(cache.verify(MESSAGE, signature, PUBLIC_KEY) for _ in range(5))
+    assert not cache.verify(MESSAGE + b" ", signature, PUBLIC_KEY)
+    assert cache.get_stats()["misses"] == 1
+
+def test_spawned_workers_use_the_backend_of_the_node(monkeypatch):
+    pytest.importorskip("coincurve")
+    spawn = multiprocessing.get_context("spawn")
+    monkeypatch.setattr(crypto_classes, "ProcessPoolExecutor", functools.partial(ProcessPoolExecutor, mp_context=spawn))
+    set_signature_backend("coincurve")
+    verifier = SignatureVerifier(workers=2, min_batch_size=1)
+    try:
+        assert verifier.get_pool().submit(get_signature_backend).result().name == "coincurve"
+        items = [(MESSAGE, CoincurveBackend().sign(MESSAGE, PRIVATE_KEY), PUBLIC_KEY)] * 2
+        assert verifier.verify_uncached(items) == [True, True]
+    finally:
+        verifier.close()
+        set_signature_backend("ecdsa")
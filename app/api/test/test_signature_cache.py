@@ -0,0 +1,82 @@
+import pytest
+
+from blockchain_project.crypto import SignatureCache, SignatureVerifier, signature_cache, verifying_key_cache, sign_message
+
+from conftest import PRIVATE_KEY, PUBLIC_KEY, new_transaction, relayed
+
+@pytest.fixture
+def count_verifications(monkeypatch):
+    """
+    The signatures really verified (not found in the cache).
+    """
+    calls = []
+    verify = verifying_key_cache.verify
+    def counted(message, signature, public_key):
+        calls.append(signature)
+        return verify(message, signature, public_key)
+    monkeypatch.setattr(verifying_key_cache, "verify", counted)
+    monkeypatch.setattr(verifying_key_cache, "verify_batch", lambda items: [counted(*item) for item in items])
+    signature_cache.clear()
+    yield calls
+    signature_cache.clear()
+
+def test_only_valid_signatures_are_cached(count_verifications):
+    cache = SignatureCache(max_size=2)
+    messages = [b"a", b"b", b"c"]
+    signatures = [sign_message(message, PRIVATE_KEY) for message in messages]
+
+    assert not cache.verify(b"a", signatures[1], PUBLIC_KEY)
+    assert not cache.verify(b"a", signatures[1], PUBLIC_KEY)
+    assert len(cache) == 0 and len(count_verifications) == 2
+
+    for message, signature in zip(messages, signatures):
+        assert cache.verify(message, signature, PUBLIC_KEY)
+    assert cache.verify(b"c", signatures[2], PUBLIC_KEY)
+    # The oldest entry was evicted
+    assert cache.key(b"a", signatures[0], PUBLIC_KEY) not in cache._entries
+    assert cache.get_stats() == {"size": 2, "max_size": 2, "hits": 1, "misses": 5}
+
+def test_batches_skip_and_fill_the_cache(count_verifications):
+    cache = SignatureCache()
+    verifier = SignatureVerifier(workers=1, cache=cache)
+    items = [(message, sign_message(message, PRIVATE_KEY), PUBLIC_KEY) for message in [b"a", b"b"]]
+    items.append((b"c", items[0][1], PUBLIC_KEY))
+
+    assert verifier.verify(items) == [True, True, False]
+    assert verifier.verify(items) == [True, True, False]
+    assert len(count_verifications) == 4 # Only the invalid signature is verified again
+
+def test_a_transaction_is_verified_once_per_node(new_blockchain, count_verifications):
+    node, peer = new_blockchain("node"), new_blockchain("peer")
+    transaction = relayed(peer.add_new_unconfirmed_transaction(new_transaction(5.0)))
+    # Both nodes share the cache of the process
+    signature_cache.clear()
+    count_verifications.clear()
+
+    # Relayed then mined by the node
+    assert node.add_new_unconfirmed_transaction_from_node(transaction)
+    assert node.mine()
+    assert node.last_block.transactions[0].hash == transaction.hash
+    assert count_verifications == [transaction.signature]
+
+def test_parallel_imports_share_the_cache_of_the_node(new_blockchain, mine_blocks):
+    source = new_blockchain("source")
+    mine_blocks(source, 12, per_block=1)
+    dump = [block.dict() for block in source.chain]
+    signature_cache.clear()
+
+    # The workers verify the signatures of a cold import, the node remembers them
+    node = new_blockchain("node", signature_workers=2)
+    assert node.create_chain_from_dump(dump)
+    assert node.get_signature_verifier()._pool is not None
+    assert signature_cache.get_stats()["size"] == 12 and signature_cache.hits == 0
+
+    # Another import (e.g. a replay) and a relay of the same transactions hit the cache
+    other = new_blockchain("other", signature_workers=2)
+    assert other.create_chain_from_dump(dump)
+    assert signature_cache.hits == 12 and signature_cache.misses == 12
+    transaction = relayed(source.chain[1].transactions[0])
+    assert node.verify_signatures([transaction])
+    assert signature_cache.hits == 13
+    node.get_signature_verifier().close()
+    other.get_signature_verifier().close()
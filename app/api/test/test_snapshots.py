@@ -0,0 +1,77 @@
+import json
+
+from blockchain_project import Blockchain
+
+from conftest import new_transaction, reload
+
+def test_reload_from_a_snapshot_matches_a_full_replay(new_blockchain, mine_blocks):
+    blockchain = new_blockchain(snapshot_interval=2)
+    mine_blocks(blockchain, 2)
+    # Pending when the snapshot is taken, mined after it
+    blockchain.add_new_unconfirmed_transaction(new_transaction(3.0))
+    blockchain.save_chain()
+    assert blockchain.get_snapshot_store().list_heights() == [2]
+    assert blockchain.mine()
+    blockchain.save_chain()
+
+    from_snapshot = reload(blockchain)
+    replayed = new_blockchain("replayed")
+    assert replayed.create_chain_from_dump([block.dict() for block in blockchain.chain])
+
+    assert from_snapshot.last_block.hash == blockchain.last_block.hash
+    assert from_snapshot.balances == replayed.balances == blockchain.balances
+    assert from_snapshot.stakes == replayed.stakes
+    # The mempool is not persisted, neither are the unconfirmed balances
+    assert from_snapshot.unconfirmed_balances == replayed.unconfirmed_balances == {}
+
+def test_only_the_blocks_after_the_snapshot_are_replayed(new_blockchain, mine_blocks, monkeypatch):
+    blockchain = new_blockchain(snapshot_interval=2)
+    for _ in range(5):
+        mine_blocks(blockchain, 1)
+        blockchain.save_chain()
+    assert blockchain.get_snapshot_store().list_heights()[-1] == 4
+
+    replayed = []
+    add_block = Blockchain.add_block
+    def spy(self, block, proof, **kwargs):
+        replayed.append(block.index)
+        return add_block(self, block, proof, **kwargs)
+    monkeypatch.setattr(Blockchain, "add_block", spy)
+
+    reloaded = reload(blockchain)
+    assert replayed == [5]
+    assert reloaded.balances == blockchain.balances
+    assert [transaction.hash for transaction in reloaded.get_transactions_for_wallet("ab" * 64)] == \
+           [transaction.hash for transaction in blockchain.get_transactions_for_wallet("ab" * 64)]
+
+def test_snapshot_ahead_of_the_log_is_ignored(new_blockchain, mine_blocks):
+    blockchain = new_blockchain(snapshot_interval=2)
+    for _ in range(4):
+        mine_blocks(blockchain, 1)
+        blockchain.save_chain()
+    blocks = [block.dict() for block in blockchain.chain[:3]]
+    del blockchain.chain[3:] # The log is cut below the last snapshot
+
+    replayed = new_blockchain("replayed")
+    assert replayed.create_chain_from_dump(blocks)
+    reloaded = reload(blockchain)
+    assert len(reloaded.chain) == 3
+    assert reloaded.balances == replayed.balances
+
+def test_snapshots_hold_the_state_only(new_blockchain, mine_blocks):
+    blockchain = new_blockchain(snapshot_interval=2)
+    transactions = mine_blocks(blockchain, 2)
+    blockchain.save_chain()
+    mine_blocks(blockchain, 1)
+    blockchain.save_chain()
+
+    snapshot_store = blockchain.get_snapshot_store()
+    with open(snapshot_store.snapshot_path(2)) as snapshot_file:
+        assert set(json.load(snapshot_file)) == {"height", "hash", "balances", "stakes", "deployed_smart_contracts"}
+
+    # The indexes are rebuilt from the block log
+    reloaded = reload(blockchain)
+    for height, block in enumerate(blockchain.chain):
+        assert reloaded.get_block_by_hash(block.hash).index == height
+    for transaction in transactions:
+        assert reloaded.get_transaction_receipt(transaction.hash) == blockchain.get_transaction_receipt(transaction.hash)
@@ -0,0 +1,134 @@
+import asyncio
+import os
+
+import pytest
+
+from blockchain_project import StoredChain
+from blockchain_project.storage import BlockLog, BlockStore
+from blockchain_project.storage.methods import RECORD_HEADER
+
+from conftest import reload
+
+def test_saving_only_writes_the_blocks_captured_on_the_loop(new_blockchain, mine_blocks):
+    blockchain = new_blockchain(snapshot_interval=2)
+    mine_blocks(blockchain, 2)
+    write, release = blockchain.prepare_save()
+    mine_blocks(blockchain, 1) # Mined while the blocks are written
+
+    write()
+    release()
+    assert not isinstance(blockchain.chain, StoredChain) # The chain changed, it stays in memory
+    assert reload(blockchain).last_block.hash == blockchain.chain[2].hash
+
+    asyncio.run(blockchain.save_chain_async())
+    assert isinstance(blockchain.chain, StoredChain)
+    assert reload(blockchain).last_block.hash == blockchain.last_block.hash
+
+def test_blocks_rolled_back_while_saving_are_not_persisted(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 1)
+    blockchain.save_chain()
+    mine_blocks(blockchain, 2)
+
+    write, release = blockchain.prepare_save()
+    blockchain.rollback_to(2)
+    mine_blocks(blockchain, 1, receiver="cd" * 64)
+    write()
+    release()
+    assert len(blockchain.chain.tail) == 2 # The replaced block is still to be written
+
+    blockchain.save_chain()
+    reloaded = reload(blockchain)
+    assert [block.hash for block in reloaded.chain] == [block.hash for block in blockchain.chain]
+    assert reloaded.balances == blockchain.balances
+
+@pytest.fixture
+def blocks(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 4, per_block=1)
+    return list(blockchain.chain)
+
+def test_log_rolls_segments_and_syncs_only_the_changes(tmp_path, blocks):
+    block_log = BlockLog(directory=str(tmp_path / "log"), segment_size=1)
+    assert block_log.sync(blocks[:3]) == 3
+    assert block_log.list_segments() == [0, 1, 2]
+    assert block_log.sync(blocks) == 2
+
+    # A replaced block and everything after it are rewritten
+    assert block_log.sync(blocks[:2] + [blocks[3]]) == 1
+    assert [block.hash for block in block_log.replay()] == [blocks[0].hash, blocks[1].hash, blocks[3].hash]
+    assert block_log.list_segments() == [0, 1, 2] and block_log.is_consistent()
+
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+def test_replay_truncates_a_torn_or_corrupted_tail(tmp_path, blocks, encoding):
+    block_log = BlockLog(directory=str(tmp_path / "log"), encoding=encoding)
+    block_log.append(blocks)
+    segment_path = block_log.segment_path(0)
+    size = os.path.getsize(segment_path)
+
+    # A crash in the middle of the last record
+    with open(segment_path, "r+b") as segment_file:
+        segment_file.truncate(size - 3)
+    assert not block_log.is_consistent()
+    assert [block.hash for block in block_log.replay()] == [block.hash for block in blocks[:-1]]
+    assert block_log.height == len(blocks) - 1 and block_log.is_consistent()
+
+    # A flipped byte in the second record drops it and the ones after it
+    _, offset, _ = block_log.position(1)
+    with open(segment_path, "r+b") as segment_file:
+        segment_file.seek(offset + RECORD_HEADER.size + 10)
+        byte = segment_file.read(1)
+        segment_file.seek(-1, os.SEEK_CUR)
+        segment_file.write(bytes([byte[0] ^ 0xFF]))
+    assert [block.hash for block in block_log.replay()] == [blocks[0].hash]
+    assert os.path.getsize(segment_path) == offset
+
+def test_chain_reloads_after_a_torn_write(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 3)
+    blockchain.save_chain()
+    block_log = blockchain.get_block_log()
+    with open(block_log.segment_path(block_log.list_segments()[-1]), "r+b") as segment_file:
+        segment_file.truncate(os.path.getsize(segment_file.name) - 1)
+
+    reloaded = reload(blockchain)
+    assert [block.hash for block in reloaded.chain] == [block.hash for block in blockchain.chain[:-1]]
+
+def test_block_store_reads_a_growing_log(tmp_path, blocks):
+    block_log = BlockLog(directory=str(tmp_path / "log"), segment_size=1)
+    block_store = BlockStore(directory=block_log.directory, cache_size=2)
+    block_log.append(blocks[:2])
+    assert [block.hash for block in block_store.get_range(-1, 10)] == [block.hash for block in blocks[:2]]
+
+    # Blocks appended after the files were mapped
+    block_log.append(blocks[2:])
+    assert block_store.get(4).hash == blocks[4].hash
+    assert [block.hash for block in block_store.get_range(1, 4)] == [block.hash for block in blocks[1:4]]
+    assert len(block_store._cache) == 2
+
+    # A record damaged after the log was written
+    block_store.reset()
+    _, offset, _ = block_log.position(3)
+    with open(block_log.segment_path(3), "r+b") as segment_file:
+        segment_file.seek(offset + RECORD_HEADER.size)
+        segment_file.write(b"#")
+    with pytest.raises(ValueError):
+        block_store.get(3)
+
+def test_stored_chain_serves_persisted_and_new_blocks(new_blockchain, mine_blocks):
+    blockchain = new_blockchain()
+    mine_blocks(blockchain, 2)
+    blockchain.save_chain()
+    mine_blocks(blockchain, 1)
+    hashes = [block.hash for block in blockchain.chain]
+
+    chain = blockchain.chain
+    assert isinstance(chain, StoredChain) and chain.persisted == 3 and len(chain.tail) == 1
+    assert [block.hash for block in chain[1:]] == hashes[1:]
+    assert chain[-1].hash == hashes[-1] and chain[-2].hash == hashes[-2]
+    with pytest.raises(IndexError):
+        chain[len(hashes)]
+
+    # Truncating below the persisted height drops the blocks from disk too
+    del chain[1:]
+    assert len(chain) == 1 and blockchain.get_block_log().height == 1
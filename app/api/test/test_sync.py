@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from conftest import new_transaction
+
+@pytest.fixture
+def peer(new_blockchain, mine_blocks):
+    blockchain = new_blockchain("peer")
+    mine_blocks(blockchain, 8, per_block=1)
+    return blockchain
+
+@pytest.fixture
+def fork(new_blockchain, mine_blocks, peer):
+    """
+    A node sharing three blocks with the peer, then mining two of its own.
+    """
+    blockchain = new_blockchain("node", sync_batch_blocks=2, sync_window=2)
+    assert blockchain.create_chain_from_dump([block.dict() for block in peer.chain[:3]])
+    mine_blocks(blockchain, 2, per_block=2, receiver="cd" * 64)
+    blockchain.add_new_unconfirmed_transaction(new_transaction(3.0))
+    return blockchain
+
+def serve(blockchain, send_blocks=None, on_request=None) -> httpx.AsyncClient:
+    """
+    A client for the routes a peer serves to synchronize (send_blocks can change the blocks it sends).
+    """
+    def handler(request: httpx.Request) -> httpx.Response:
+        if on_request is not None:
+            on_request(request)
+        params = {key: int(value) for key, value in request.url.params.items()}
+        if request.url.path == "/api/v1/blockchain/headers/locate/":
+            items = blockchain.locate_headers(json.loads(request.content), 2000)
+        elif request.url.path == "/api/v1/blockchain/headers/":
+            items = blockchain.get_headers(params["start"], min(params["end"], params["start"] + 2000))
+        elif request.url.path == "/api/v1/blockchain/blocks/":
+            items = blockchain.get_blocks(params["start"], params["end"])
+            if send_blocks is not None:
+                items = send_blocks(params["start"], params["end"], items)
+        else:
+            return httpx.Response(404)
+        return httpx.Response(200, json=[json.loads(item.json()) for item in items])
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def sync(blockchain, client) -> bool:
+    return asyncio.run(blockchain.sync_with_peer(client, "peer"))
+
+def state(blockchain):
+    return [block.hash for block in blockchain.chain], dict(blockchain.balances), dict(blockchain.unconfirmed_balances)
+
+def test_sync_switches_to_the_branch_of_the_peer(fork, peer):
+    old_branch = fork.chain[3:]
+    chains = []
+    client = serve(peer, on_request=lambda request: chains.append([block.hash for block in fork.chain]))
+
+    assert sync(fork, client)
+    assert [block.hash for block in fork.chain] == [block.hash for block in peer.chain]
+    assert fork.balances == peer.balances
+    # The chain did not change while the blocks were downloaded
+    assert all(hashes == chains[0] for hashes in chains)
+    # The transfers of the dropped branch are pending again
+    pending = {transaction.hash for transaction in fork.unconfirmed_transactions}
+    assert {transaction.hash for block in old_branch for transaction in block.transactions} <= pending
+
+def test_fresh_node_syncs_past_its_checkpoints(new_blockchain, peer):
+    checkpointer = new_blockchain("checkpointer")
+    assert checkpointer.create_chain_from_dump([block.dict() for block in peer.chain[:6]])
+    blockchain = new_blockchain("node", checkpoints=[checkpointer.create_checkpoint()], sync_batch_blocks=3)
+
+    assert sync(blockchain, serve(peer))
+    assert [block.hash for block in blockchain.chain] == [block.hash for block in peer.chain]
+
+@pytest.mark.parametrize("send_blocks", [
+    lambda start, end, blocks: blocks[:-1], # A short batch
+    lambda start, end, blocks: blocks + blocks[-1:], # A long batch
+    lambda start, end, blocks: blocks[::-1], # Swapped blocks
+    lambda start, end, blocks: [blocks[0].copy(update={"index": 0})] + blocks[1:], # A height before the fork
+], ids=["short", "long", "swapped", "negative"])
+def test_batches_not_matching_the_headers_leave_the_chain_untouched(fork, peer, send_blocks):
+    before = state(fork)
+
+    assert not sync(fork, serve(peer, send_blocks=lambda start, end, blocks: send_blocks(start, end, blocks) if start > 3 else blocks))
+    assert state(fork) == before
+
+def test_invalid_blocks_restore_the_branch(fork, peer):
+    before = state(fork)
+    def send_blocks(start, end, blocks):
+        blocks = [block.copy(deep=True) for block in blocks]
+        if start <= 7 < end:
+            blocks[7 - start].transactions[0].content.amount = 1000.0
+        return blocks
+
+    assert not sync(fork, serve(peer, send_blocks=send_blocks))
+    assert state(fork) == before
@@ -23,6 +23,7 @@ from app.api.routes.wallets import router as wallets
 from app.api.routes.stakes import router as stakes
 
 from blockchain_project.blockchain import Blockchain
+from blockchain_project.network import peer_client
 
 from fastapi.openapi.utils import get_openapi
 
@@ -90,6 +91,9 @@ async def on_startup():
     # Actions to be executed when the API starts.
     blockchain.load_from_file()
 
+    # Open the connection pool shared by the requests to the peers
+    await peer_client.start()
+
     # Start mining
     app.state.mining_task = asyncio.create_task(mine_block())
     print('API started')
@@ -97,6 +101,8 @@ async def on_startup():
 @app.on_event('shutdown')
 async def on_shutdown():
     # Actions to be executed when the API shuts down.
+    await get_blockchain().flush_relay_queues()
+    await peer_client.close()
     print('API shut down')
 
 # Include the routes
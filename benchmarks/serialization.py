@@ -0,0 +1,121 @@
+"""
+Counts the serializations (JSON encodings of models and signed messages) per transaction along its whole path
+through two nodes: admission, gossip, block building, block import, validation and saving.
+The same run is made with and without the memoized encodings, repeats times each (alternating, with cold
+signature caches), and the median time is reported: the time is dominated by the signatures and varies between runs.
+The cost of getting the hash and the JSON of the mined block, cached or not, is reported as well.
+
+Usage: python benchmarks/serialization.py [transactions] [repeats]
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pydantic import BaseConfig
+
+from blockchain_project import Blockchain, Transaction, TransactionType, TransactionWithAdditionalData, \
+                               BlockWithAdditionalData
+from blockchain_project.crypto import sign_message, signature_cache
+from blockchain_project.memo import MemoizedModel
+
+# The treasury wallet, funded by the genesis state
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "wallets.json")) as file:
+    TREASURY = json.load(file)[0]
+
+RECEIVER = "ab" * 64
+
+class SerializationCounter:
+    """
+    Counts the calls to json.dumps, directly or through the models (BaseModel.json and the canonical encodings).
+    """
+    def __init__(self) -> None:
+        self.count = 0
+        self.original_dumps = json.dumps
+        self.original_model_dumps = BaseConfig.json_dumps
+
+    def __enter__(self):
+        def counted(original):
+            def dumps(*args, **kwargs):
+                self.count += 1
+                return original(*args, **kwargs)
+            return dumps
+        json.dumps = counted(self.original_dumps)
+        BaseConfig.json_dumps = staticmethod(counted(self.original_model_dumps))
+        return self
+
+    def __exit__(self, *exc_info):
+        json.dumps = self.original_dumps
+        BaseConfig.json_dumps = self.original_model_dumps
+
+def new_node(directory: str, name: str) -> Blockchain:
+    blockchain = Blockchain(chain_file_name=os.path.join(directory, f"{name}.json"))
+    # Both genesis validators are this node, so it can mine
+    blockchain.peers = {"localhost:8000": blockchain.node_id, "localhost:8001": blockchain.node_id}
+    return blockchain
+
+def new_transactions(count: int) -> list[Transaction]:
+    transactions = []
+    for i in range(count):
+        content = {"sender": TREASURY["public_key"], "receiver": RECEIVER, "amount": float(i + 1)}
+        signature = sign_message(json.dumps(content, separators=(',', ':')).encode(), TREASURY["private_key"])
+        transactions.append(Transaction(uuid=str(uuid.uuid4()), type=TransactionType.COIN_TRANSFER,
+                                        content=content, signature=signature))
+    return transactions
+
+def run(count: int, memoization: bool) -> tuple[int, float]:
+    MemoizedModel.memoization_enabled = memoization
+    transactions = new_transactions(count)
+    signature_cache.clear()
+
+    with tempfile.TemporaryDirectory() as directory:
+        node, peer = new_node(directory, "node"), new_node(directory, "peer")
+        start = time.perf_counter()
+        with SerializationCounter() as counter:
+            for transaction in transactions:
+                # Admission and gossip
+                transaction = node.add_new_unconfirmed_transaction(transaction)
+                gossip = transaction.json()
+                peer.add_new_unconfirmed_transaction_from_node(TransactionWithAdditionalData.parse_raw(gossip))
+
+            # Block building, announce and import
+            node.mine()
+            node.save_chain()
+            announce = node.last_block.json()
+            block = BlockWithAdditionalData.parse_raw(announce)
+            peer.add_block(block, block.hash)
+            peer.remove_mined_transactions(block)
+            peer.save_chain()
+        elapsed = time.perf_counter() - start
+
+        block = node.last_block
+        lookups = {"hash": timeit.timeit(block.compute_hash, number=100) / 100,
+                   "json": timeit.timeit(block.json, number=100) / 100}
+
+    MemoizedModel.memoization_enabled = True
+    return counter.count, elapsed, lookups
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    results = {False: [], True: []}
+    for _ in range(repeats):
+        for memoization in [False, True]:
+            results[memoization].append(run(count, memoization))
+
+    for memoization in [False, True]:
+        serializations, _, lookups = results[memoization][0]
+        elapsed = statistics.median(elapsed for _, elapsed, _ in results[memoization])
+        label = "memoized" if memoization else "not memoized"
+        print(f"{label:>12}: {serializations / count:.1f} serializations per transaction, "
+              f"{elapsed * 1000 / count:.2f} ms per transaction (median of {repeats}), "
+              f"block hash {lookups['hash'] * 1e6:.1f} us, block JSON {lookups['json'] * 1e6:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,18 @@ from .stake import Stake
 
 from .vm import VM
 
+from .crypto import SignatureVerifier
+
 from .transactions import TransactionType, Transaction, TransactionWithAdditionalData, \
-                          StakeTransaction
-from .blocks import Block, BlockWithAdditionalData
+                          StakeTransaction, TransactionStatus, TransactionReceipt
+from .blocks import Block, BlockWithAdditionalData, BlockHeader, MerkleProof
+from .codec import encode_block, decode_block, encode_transaction, decode_transaction
+from .storage import BlockLog, BlockStore, StoredChain, StateSnapshot, SnapshotStore
+from .indexes import AddressIndex, TransactionIndex, BlockIndex
+from .mempool import Mempool, MempoolFullError
+from .checkpoints import Checkpoint, CheckpointList
+from .journal import UndoJournal
+from .network import PeerResult
 from .blockchain import Blockchain
 
 from .wallets import Wallet
@@ -1,16 +1,28 @@
+import asyncio
 from datetime import datetime
 import hashlib
 import json
 import os
 import time
-from typing import List, Optional, Union
+from typing import Callable, List, Optional, Union
 import uuid
 import httpx
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, PrivateAttr, validator
 
-from blockchain_project import Block, BlockWithAdditionalData, \
+from blockchain_project import Block, BlockWithAdditionalData, BlockHeader, MerkleProof, encode_block, encode_transaction, \
                                TransactionType, Transaction, TransactionWithAdditionalData, \
-                               Stake, StakeTransaction, VM
+                               Stake, StakeTransaction, VM, BlockLog, BlockStore, StoredChain, \
+                               StateSnapshot, SnapshotStore, AddressIndex, TransactionIndex, BlockIndex, \
+                               TransactionStatus, TransactionReceipt, Mempool, SignatureVerifier, Checkpoint, \
+                               UndoJournal
+from blockchain_project.mempool import MempoolFullError, transaction_size
+from blockchain_project.transactions import get_signature_message
+from blockchain_project.blocks import BlockValidator
+from blockchain_project.checkpoints import compute_state_digest
+from blockchain_project.crypto import signature_cache, verifying_key_cache, set_signature_backend
+from blockchain_project.codec import BINARY_MEDIA_TYPE, encode_transactions
+from blockchain_project.indexes import encode_cursor, decode_cursor
+from blockchain_project.network import PeerResult, SeenCache, RelayQueue, NODE_ID_HEADER, fan_out, peer_client
 
 class Blockchain(BaseModel):
     """
@@ -41,10 +53,68 @@ class Blockchain(BaseModel):
     virtual_machine = VM()
 
     # Blockchain data
-    unconfirmed_transactions: list[TransactionWithAdditionalData] = []
+    unconfirmed_transactions: Mempool = Field(default_factory=Mempool)
+    mempool_max_size: int = 10000 # Maximum number of unconfirmed transactions (0 means unbounded)
+    mempool_max_bytes: int = 32000000 # Maximum serialized size of the unconfirmed transactions (0 means unbounded)
+    block_max_transactions: int = 1000 # Maximum number of transactions in a mined block (0 means unbounded)
+    block_max_bytes: int = 1000000 # Maximum serialized size of the transactions in a mined block (0 means unbounded)
     chain: list[BlockWithAdditionalData] = []
     chain_file_name: str = None
 
+    # Persistence support
+    snapshot_interval: int = 100 # Blocks between two state snapshots (0 disables them)
+    storage_encoding: str = "json" # Encoding of the stored blocks: "json" or "binary"
+    wire_encoding: str = "json" # Encoding of the blocks and transactions sent to peers: "json" or "binary"
+    _block_log: Optional[BlockLog] = PrivateAttr(default=None)
+    _block_store: Optional[BlockStore] = PrivateAttr(default=None)
+    _snapshot_store: Optional[SnapshotStore] = PrivateAttr(default=None)
+    _last_snapshot_height: int = PrivateAttr(default=0)
+
+    # Index support
+    _address_index: AddressIndex = PrivateAttr(default_factory=AddressIndex)
+    _transaction_index: TransactionIndex = PrivateAttr(default_factory=TransactionIndex)
+    _block_index: BlockIndex = PrivateAttr(default_factory=BlockIndex)
+
+    # Signature verification support
+    signature_backend: str = "ecdsa" # ECDSA implementation: "ecdsa" (pure Python) or "coincurve" (libsecp256k1)
+    signature_workers: int = 0 # Processes verifying the signatures of blocks (0 means one per core, 1 disables the pool)
+    signature_min_batch: int = 64 # Smaller batches of signatures are verified serially
+    signature_segment_blocks: int = 256 # Blocks checked together (hashes and signatures) when a chain is replayed
+    signature_cache_size: int = 100000 # Verified signatures remembered by the node (0 disables the cache)
+    verifying_key_cache_size: int = 4096 # Parsed public keys of the recent signers (0 disables the cache)
+    verifying_key_precompute_threshold: int = 64 # Verifications after which a signer key gets precomputation tables (0 disables them)
+    _signature_verifier: Optional[SignatureVerifier] = PrivateAttr(default=None)
+    _block_validator: Optional[BlockValidator] = PrivateAttr(default=None)
+
+    # Peer communication support
+    peer_concurrency: int = 16 # Peers contacted at the same time by the announcements and the consensus (0 means all of them)
+    peer_timeout: float = 5.0 # Seconds given to each peer for a request of an announcement or the consensus (0 means no timeout)
+    peer_max_connections: int = 100 # Connections to the peers open at the same time (0 means unbounded)
+    peer_max_keepalive_connections: int = 20 # Idle connections to the peers kept open for reuse (0 means unbounded)
+    peer_keepalive_expiry: float = 30.0 # Seconds an idle connection to a peer is kept open
+    peer_http2: bool = True # Use HTTP/2 with the peers that support it (needs the h2 package)
+    seen_cache_size: int = 100000 # Transaction and block hashes remembered to stop gossip loops (0 disables the cache)
+    seen_cache_ttl: float = 600.0 # Seconds a seen hash is remembered (0 means until the cache is full)
+    _seen_hashes: SeenCache = PrivateAttr(default_factory=SeenCache)
+    relay_window: float = 0.05 # Seconds the transactions to a peer are coalesced before being relayed in one message (0 relays them at once)
+    relay_batch_size: int = 500 # Transactions relayed to a peer in one message at most
+    _relay_queues: dict[str, RelayQueue] = PrivateAttr(default_factory=dict)
+
+    # Synchronization support
+    sync_batch_blocks: int = 100 # Blocks per request when synchronizing with a peer
+    sync_window: int = 4 # Block requests in flight when synchronizing with a peer
+
+    # Reorganization support
+    undo_journal_depth: int = 1000 # Last blocks that can be rolled back without replaying the chain (0 disables the journals)
+    _undo_journals: dict[int, UndoJournal] = PrivateAttr(default_factory=dict)
+
+    # Checkpoint support
+    checkpoints: list[Checkpoint] = [] # Trusted (height, hash, state digest), the blocks up to the last one skip the transaction checks
+    _checkpoints: dict[int, Checkpoint] = PrivateAttr(default_factory=dict)
+
+    class Config:
+        json_encoders = {Mempool: Mempool.to_list}
+
     @validator('chain', pre=True, always=True)
     def create_genesis(cls, chain):
         """
@@ -56,16 +126,58 @@ class Blockchain(BaseModel):
             genesis_block_data_with_additional_data = BlockWithAdditionalData(**genesis_block_data)
             genesis_block_data_with_additional_data.hash = genesis_block_data_with_additional_data.compute_hash()
             return [genesis_block_data_with_additional_data]
+        if isinstance(chain, StoredChain):
+            return list(chain)
         return chain
+
+    def __init__(self, **data) -> None:
+        super().__init__(**data)
+        self.unconfirmed_transactions.max_size = self.mempool_max_size or None
+        self.unconfirmed_transactions.max_bytes = self.mempool_max_bytes or None
+        set_signature_backend(self.signature_backend)
+        signature_cache.resize(self.signature_cache_size)
+        verifying_key_cache.resize(self.verifying_key_cache_size)
+        verifying_key_cache.precompute_threshold = self.verifying_key_precompute_threshold
+        peer_client.configure(self.peer_max_connections, self.peer_max_keepalive_connections,
+                              self.peer_keepalive_expiry, self.peer_http2)
+        self._seen_hashes.configure(self.seen_cache_size, self.seen_cache_ttl)
+        self._checkpoints = {checkpoint.height: checkpoint for checkpoint in self.checkpoints}
+        # The chain given at creation time (at least the genesis block) has to be indexed
+        self.rebuild_indexes()
  
     def load_from_file(self) -> None:
         """
-        A method to load the blockchain's chain from a file.
+        A method to load the blockchain's chain from its block log.
+        The state is restored from the latest snapshot and only the blocks after it are replayed,
+        without any snapshot the whole log is replayed.
+        A legacy JSON dump in chain_file_name is still loaded (and migrated to the log on the next save).
         """
         if self.chain_file_name is not None:
             try:
-                # First, we need to check if the file exists
-                if os.path.exists(self.chain_file_name):
+                block_log = self.get_block_log()
+
+                if block_log.exists():
+                    if not block_log.is_consistent():
+                        # Rebuild the index from the records (dropping a torn tail)
+                        for _ in block_log.replay():
+                            pass
+
+                    snapshot = self.get_snapshot_store().latest(
+                        lambda snapshot: snapshot.height < block_log.height and \
+                                         block_log.read(snapshot.height).hash == snapshot.hash)
+
+                    if snapshot is not None:
+                        self.restore_snapshot(snapshot)
+                        self.chain = StoredChain(block_log, self.get_block_store(), height=snapshot.height + 1)
+                        # The indexes are not in the snapshots, they are rebuilt from the stored blocks
+                        self.rebuild_indexes()
+
+                        # Replay only the blocks after the snapshot
+                        self.add_blocks([block_log.read(height) for height in range(snapshot.height + 1, block_log.height)])
+                    else:
+                        # Replay the log, block by block
+                        self.create_chain_from_dump(list(block_log.replay()))
+                elif os.path.exists(self.chain_file_name):
                     with open(self.chain_file_name, 'r') as chain_file:
                         raw_data = chain_file.read()
                         if raw_data and len(raw_data) != 0:
@@ -73,10 +185,116 @@ class Blockchain(BaseModel):
                             chain_data = json.loads(raw_data)
                             self.create_chain_from_dump(chain_data)
 
-                print(f"Blockchain loaded from {self.chain_file_name}")
+                print(f"Blockchain loaded from {block_log.directory}")
             except Exception as e:
                 print(f"Error occurred loading the blockchain: {e}")
 
+    def get_block_log(self) -> BlockLog:
+        """
+        A method to get the block log stored next to chain_file_name (e.g. blockchain.json -> blockchain.blocks/).
+        """
+        if self._block_log is None:
+            directory = os.path.splitext(self.chain_file_name)[0] + ".blocks"
+            self._block_log = BlockLog(directory=directory, encoding=self.storage_encoding)
+        return self._block_log
+
+    def get_signature_verifier(self) -> SignatureVerifier:
+        """
+        A method to get the (process pool backed) batch signature verifier.
+        """
+        if self._signature_verifier is None:
+            self._signature_verifier = SignatureVerifier(workers=self.signature_workers,
+                                                         min_batch_size=self.signature_min_batch)
+        return self._signature_verifier
+
+    def get_block_validator(self) -> BlockValidator:
+        """
+        A method to get the validator of the stateless part of the blocks, sharing the process pool of the signature verifier.
+        """
+        if self._block_validator is None:
+            self._block_validator = BlockValidator(self.get_signature_verifier())
+        return self._block_validator
+
+    def get_block_store(self) -> BlockStore:
+        """
+        A method to get the memory-mapped reader of the block log.
+        """
+        if self._block_store is None:
+            self._block_store = BlockStore(directory=self.get_block_log().directory)
+        return self._block_store
+
+    def get_snapshot_store(self) -> SnapshotStore:
+        """
+        A method to get the state snapshots stored next to chain_file_name (e.g. blockchain.json -> blockchain.snapshots/).
+        """
+        if self._snapshot_store is None:
+            directory = os.path.splitext(self.chain_file_name)[0] + ".snapshots"
+            self._snapshot_store = SnapshotStore(directory=directory)
+        return self._snapshot_store
+
+    def create_snapshot(self) -> StateSnapshot:
+        """
+        A method to capture the confirmed state of the blockchain at its last block, in O(state): the indexes,
+        which grow with the history, are rebuilt from the block log on load.
+        """
+        last_block = self.last_block
+        return StateSnapshot(height=len(self.chain) - 1,
+                             hash=last_block.hash,
+                             balances=dict(self.balances),
+                             stakes={public_key: stake.copy() for public_key, stake in self.stakes.items()},
+                             deployed_smart_contracts={address: contract.copy(deep=True) for address, contract in
+                                                       self.virtual_machine.deployed_smart_contracts.items()})
+
+    def compute_state_digest(self) -> str:
+        """
+        A method to get the digest of the confirmed state (balances, stakes and smart contracts).
+        """
+        return compute_state_digest(self.balances, self.stakes, self.virtual_machine.deployed_smart_contracts)
+
+    def create_checkpoint(self) -> Checkpoint:
+        """
+        A method to get the checkpoint of the last block, for other nodes to trust.
+        """
+        return Checkpoint(height=len(self.chain) - 1, hash=self.last_block.hash, state_digest=self.compute_state_digest())
+
+    def get_last_checkpoint_height(self) -> int:
+        """
+        A method to get the height of the last checkpoint, -1 without checkpoints.
+        """
+        return max(self._checkpoints, default=-1)
+
+    def get_checkpointed_height(self, blocks: list[BlockWithAdditionalData]) -> int:
+        """
+        A method to get the height of the last checkpoint that the blocks to add after the chain lead to,
+        following their hash chain back from the checkpoint hash (heights are the ones in the chain, not the
+        indexes claimed by the blocks). -1 if they lead to none.
+        """
+        start = len(self.chain)
+        for height in sorted(self._checkpoints, reverse=True):
+            position = height - start
+            if position < 0:
+                break
+            if position >= len(blocks) or blocks[position].hash != self._checkpoints[height].hash:
+                continue
+
+            previous_hash = self.last_block.hash
+            for block in blocks[:position + 1]:
+                if block.previous_hash != previous_hash:
+                    return -1
+                previous_hash = block.hash
+            return height
+        return -1
+
+    def restore_snapshot(self, snapshot: StateSnapshot) -> None:
+        """
+        A method to set the state of the blockchain from a snapshot.
+        """
+        self.balances = dict(snapshot.balances)
+        self.unconfirmed_balances = {} # The mempool is not persisted
+        self.stakes = dict(snapshot.stakes)
+        self.virtual_machine.deployed_smart_contracts = dict(snapshot.deployed_smart_contracts)
+        self._last_snapshot_height = snapshot.height
+
     @property
     def last_block(self) -> BlockWithAdditionalData:
         """
@@ -96,19 +314,48 @@ class Blockchain(BaseModel):
         """
         self.peers = self.peers | peers
 
-    def set_chain(self, chain: list[BlockWithAdditionalData]) -> None:
+    def set_chain(self, chain: list[BlockWithAdditionalData]) -> bool:
+        """
+        A method to set the blockchain: the blocks after the common prefix with the current chain are
+        reorganized (see reorganize), the state follows the new chain.
         """
-        A method to set the blockchain.
-        """        
         # Convert dict to BlockWithAdditionalData
-        self.chain = [BlockWithAdditionalData(**block) for block in chain]
+        blocks = [block if isinstance(block, BlockWithAdditionalData) else BlockWithAdditionalData(**block) for block in chain]
+
+        ancestor = -1
+        while ancestor + 1 < min(len(blocks), len(self.chain)) and blocks[ancestor + 1].hash == self.chain[ancestor + 1].hash:
+            ancestor += 1
+
+        return self.reorganize(ancestor, blocks[ancestor + 1:])
+
+    def index_block(self, height: int, block: BlockWithAdditionalData) -> None:
+        """
+        A method to add a block appended to the chain to the indexes.
+        """
+        self._address_index.add_block(height, block)
+        self._transaction_index.add_block(height, block)
+        self._block_index.add_block(height, block)
+
+    def rebuild_indexes(self) -> None:
+        """
+        A method to rebuild the indexes from the whole chain.
+        """
+        self._address_index.clear()
+        self._transaction_index.clear()
+        self._block_index.clear()
+        for height, block in enumerate(self.chain):
+            self.index_block(height, block)
 
     def set_unconfirmed_transactions(self, unconfirmed_transactions: list[TransactionWithAdditionalData]) -> None:
         """
         A method to set the unconfirmed transactions.
         """
         # Convert dict to TransactionWithAdditionalData
-        self.unconfirmed_transactions = [TransactionWithAdditionalData(**transaction) for transaction in unconfirmed_transactions]
+        self.unconfirmed_transactions = Mempool(
+            (TransactionWithAdditionalData(**dict(transaction)) for transaction in unconfirmed_transactions),
+            max_size=self.mempool_max_size or None,
+            max_bytes=self.mempool_max_bytes or None
+        )
 
     def get_difficulty(self) -> int:
         """
@@ -128,6 +375,80 @@ class Blockchain(BaseModel):
         """
         return [block.dict() for block in self.chain]
     
+    def get_block(self, height: int) -> Optional[BlockWithAdditionalData]:
+        """
+        A method to get the block at a given height, or None if there is no such block.
+        """
+        if height < 0 or height >= len(self.chain):
+            return None
+        return self.chain[height]
+
+    def get_blocks(self, start: int, end: int) -> list[BlockWithAdditionalData]:
+        """
+        A method to get the blocks with a height in [start, end).
+        """
+        return self.chain[max(start, 0):max(end, 0)]
+
+    def get_block_by_hash(self, block_hash: str) -> Optional[BlockWithAdditionalData]:
+        """
+        A method to get a block by its hash, or None if there is no such block.
+        """
+        height = self._block_index.get(block_hash)
+        return None if height is None else self.chain[height]
+
+    def get_headers(self, start: int, end: int) -> list[BlockHeader]:
+        """
+        A method to get the headers of the blocks in [start, end).
+        """
+        return [block.get_header() for block in self.get_blocks(start, end)]
+
+    def get_merkle_proof(self, transaction_hash: str) -> Optional[MerkleProof]:
+        """
+        A method to get the Merkle inclusion proof of a confirmed transaction, with the header of its block.
+        None if the transaction is not confirmed or its block has no Merkle root (blocks created before them).
+        """
+        location = self._transaction_index.get(transaction_hash)
+        if location is None:
+            return None
+
+        height, position = location
+        block = self.chain[height]
+        if block.merkle_root is None:
+            return None
+
+        return MerkleProof(transaction_hash=transaction_hash,
+                           block_height=height,
+                           position=position,
+                           steps=block.get_merkle_proof(position),
+                           header=block.get_header())
+
+    def get_transaction_receipt(self, transaction_hash: str) -> TransactionReceipt:
+        """
+        A method to know if a transaction is confirmed (and where), pending or unknown.
+        """
+        location = self._transaction_index.get(transaction_hash)
+        if location is not None:
+            height, position = location
+            return TransactionReceipt(hash=transaction_hash,
+                                      status=TransactionStatus.CONFIRMED,
+                                      block_height=height,
+                                      block_hash=self.chain[height].hash,
+                                      position=position)
+
+        if transaction_hash in self.unconfirmed_transactions:
+            return TransactionReceipt(hash=transaction_hash, status=TransactionStatus.PENDING)
+
+        return TransactionReceipt(hash=transaction_hash, status=TransactionStatus.UNKNOWN)
+
+    def get_crypto_stats(self) -> dict[str, dict[str, int]]:
+        """
+        A method to get the hit/miss counters of the signature and verifying key caches.
+        """
+        return {
+            "signatures": signature_cache.get_stats(),
+            "verifying_keys": verifying_key_cache.get_stats(),
+        }
+
     def get_stakes(self) -> dict[str, Stake]:
         """
         A method to display the stakes.
@@ -141,53 +462,333 @@ class Blockchain(BaseModel):
         return [dict(block) for block in self.unconfirmed_transactions]
     
     def check_chain_validity(self, chain: list[BlockWithAdditionalData]) -> bool:
-        result = True
+        """
+        Check a chain in two phases: the hashes, Merkle roots and signatures of its blocks (in parallel),
+        then the links between the blocks, in order.
+        """
         previous_hash = "0"
 
-        for block in chain:
-            block_hash = block.hash
-            # remove the hash field to recompute the hash again
-            # using `compute_hash` method.
-            delattr(block, "hash")
+        for block, valid in zip(chain, self.get_block_validator().validate(chain)):
+            if not valid or previous_hash != block.previous_hash:
+                return False
+            previous_hash = block.hash
 
-            if not self.is_valid_proof(block, block_hash) or previous_hash != block.previous_hash:
-                result = False
-                break
+        return True
 
-            block.hash, previous_hash = block_hash, block_hash
+    async def announce_new_block(self, block: BlockWithAdditionalData) -> list[PeerResult]:
+        data = block.json()
+        binary_data = encode_block(block) if self.wire_encoding == "binary" else None
 
-        return result
+        client = peer_client.get()
+        return await self.fan_out_to_peers(
+            lambda node_url: self.post_to_peer(client, f"http://{node_url}/api/v1/blockchain/block/", data, binary_data))
 
-    async def announce_new_block(self, block: BlockWithAdditionalData) -> None:
-        async with httpx.AsyncClient() as client:
-            for node_url, node_id in self.peers.items():
-                url = f"http://{node_url}/api/v1/blockchain/block/"
-                data = block.json()
-                response = await client.post(url, data=data)
+    async def fan_out_to_peers(self, request, exclude: Optional[str] = None, node_urls: Optional[list[str]] = None) -> list[PeerResult]:
+        """
+        Run a request (coroutine function of the peer url) against all the peers (or node_urls) concurrently,
+        peer_concurrency at a time and each within peer_timeout. The failed peers are reported.
+        The peer with the node id exclude (the one a relayed message came from) is skipped.
+        """
+        if node_urls is None:
+            node_urls = [node_url for node_url, node_id in self.peers.items() if exclude is None or node_id != exclude]
+        results = await fan_out(node_urls, request, self.peer_concurrency, self.peer_timeout)
+        for result in results:
+            if not result.ok:
+                print(f"Request to {result.node_url} failed: {result.error or result.status_code} ({result.elapsed:.3f}s)")
+        return results
+
+    async def post_to_peer(self, client: httpx.AsyncClient, url: str, data: str, binary_data: Optional[bytes] = None) -> httpx.Response:
+        """
+        Post a block or transaction to a peer. When binary_data is given, it is sent to the "binary/" variant
+        of the endpoint, falling back to the JSON data for peers that do not support it.
+        The node id goes along, so the peer does not relay the message back.
+        """
+        if binary_data is not None:
+            response = await client.post(f"{url}binary/", content=binary_data,
+                                         headers={"Content-Type": BINARY_MEDIA_TYPE, NODE_ID_HEADER: self.node_id})
+            if response.status_code not in [404, 405, 415]:
+                return response
+        return await client.post(url, content=data, headers={"Content-Type": "application/json", NODE_ID_HEADER: self.node_id})
 
     async def consensus(self) -> bool:
         """
-        A simple consensus algorithm that replaces our chain with the higgest stake in the network.
+        A simple consensus algorithm that follows the chain with the higgest stake in the network.
+        Only the blocks after the common ancestor with that chain are downloaded (see sync_with_peer).
         """
-        longest_chain = None
+        best_peer = None
         current_max_stake = self.calculate_total_stake(self.stakes)
 
-        async with httpx.AsyncClient() as client:
-            for node_url, node_id in self.peers.items():
-                response = await client.get(f'http://{node_url}/api/v1/blockchain/stakes/')
-                stake = self.calculate_total_stake(response.json())
+        client = peer_client.get()
 
-                if stake > current_max_stake:
-                    node_chain = await client.get(f'http://{node_url}/api/v1/blockchain/chain/')
-                    longest_chain = node_chain.json()
-                    current_max_stake = stake
-                    print(f"New longest chain")
+        async def get_stakes(node_url: str) -> dict:
+            response = await client.get(f'http://{node_url}/api/v1/blockchain/stakes/')
+            response.raise_for_status()
+            return response.json()
+
+        for result in await self.fan_out_to_peers(get_stakes):
+            if not result.ok:
+                continue
+            stake = self.calculate_total_stake(result.value)
+
+            if stake > current_max_stake:
+                best_peer = result.node_url
+                current_max_stake = stake
+
+        if best_peer is not None:
+            print(f"New longest chain")
+            return await self.sync_with_peer(client, best_peer)
 
-        if longest_chain:
-            return self.set_chain(longest_chain)
-        
         return False
- 
+
+    def get_block_locator(self) -> list[str]:
+        """
+        A method to get the hashes that describe the chain to a peer: the last blocks one by one,
+        then exponentially sparser down to the genesis block.
+        """
+        locator, height, step = [], len(self.chain) - 1, 1
+        while height > 0:
+            locator.append(self.chain[height].hash)
+            if len(locator) >= 10:
+                step *= 2
+            height -= step
+        locator.append(self.chain[0].hash)
+        return locator
+
+    def locate_headers(self, locator: list[str], max_count: int) -> list[BlockHeader]:
+        """
+        A method to get the headers after the first locator hash in the chain (the common ancestor with the
+        requesting node), from the genesis block if none is.
+        """
+        start = 0
+        for block_hash in locator:
+            height = self._block_index.get(block_hash)
+            if height is not None:
+                start = height + 1
+                break
+        return self.get_headers(start, start + max_count)
+
+    async def fetch_peer_headers(self, client: httpx.AsyncClient, node_url: str) -> list[BlockHeader]:
+        """
+        A method to download the headers of a peer after the common ancestor, checking that they form a chain.
+        """
+        response = await client.post(f'http://{node_url}/api/v1/blockchain/headers/locate/', json=self.get_block_locator())
+        response.raise_for_status()
+        headers = [BlockHeader(**header) for header in response.json()]
+
+        while headers:
+            start = headers[-1].index + 1
+            response = await client.get(f'http://{node_url}/api/v1/blockchain/headers/',
+                                        params={"start": start, "end": start + self.sync_batch_blocks * self.sync_window})
+            response.raise_for_status()
+            batch = [BlockHeader(**header) for header in response.json()]
+            if not batch:
+                break
+            headers.extend(batch)
+
+        for previous, header in zip(headers, headers[1:]):
+            if header.index != previous.index + 1 or header.previous_hash != previous.hash:
+                raise ValueError(f"The headers of {node_url} do not form a chain at height {header.index}")
+        for header in headers:
+            if header.merkle_root is not None and header.compute_hash() != header.hash:
+                raise ValueError(f"Invalid header hash at height {header.index} from {node_url}")
+            checkpoint = self._checkpoints.get(header.index)
+            if checkpoint is not None and checkpoint.hash != header.hash:
+                raise ValueError(f"The headers of {node_url} do not match the checkpoint at height {header.index}")
+
+        return headers
+
+    async def sync_with_peer(self, client: httpx.AsyncClient, node_url: str) -> bool:
+        """
+        Headers-first synchronization with a peer: its headers after the common ancestor are downloaded and checked,
+        then only the missing blocks are fetched, in pipelined batches (sync_window requests in flight), and checked
+        against the headers. The chain is only changed once all of them arrived: the local blocks after the common
+        ancestor are rolled back and the new ones applied without awaiting, and the old branch is restored if the
+        blocks of the peer turn out invalid.
+        """
+        try:
+            headers = await self.fetch_peer_headers(client, node_url)
+            if not headers:
+                return False
+
+            ancestor = headers[0].index - 1
+            if ancestor >= 0 and (ancestor >= len(self.chain) or self.chain[ancestor].hash != headers[0].previous_hash):
+                print(f"The headers of {node_url} do not extend a block of the chain")
+                return False
+            if ancestor < min(len(self.chain) - 1, self.get_last_checkpoint_height()):
+                print(f"The chain of {node_url} forks below the last checkpoint")
+                return False
+
+            async def fetch_blocks(start: int, end: int) -> list[BlockWithAdditionalData]:
+                response = await client.get(f'http://{node_url}/api/v1/blockchain/blocks/', params={"start": start, "end": end})
+                response.raise_for_status()
+                blocks = [BlockWithAdditionalData(**block) for block in response.json()]
+
+                # The blocks must be the ones announced by the headers, at the requested heights
+                if len(blocks) != end - start:
+                    raise ValueError(f"{node_url} sent {len(blocks)} blocks for heights [{start}, {end})")
+                for height, block in enumerate(blocks, start=start):
+                    if block.index != height or block.hash != headers[height - ancestor - 1].hash:
+                        raise ValueError(f"Block #{height} of {node_url} does not match its header")
+                return blocks
+
+            batch_size = max(1, self.sync_batch_blocks)
+            ranges = [(start, min(start + batch_size, headers[-1].index + 1))
+                      for start in range(ancestor + 1, headers[-1].index + 1, batch_size)]
+            pending = [asyncio.create_task(fetch_blocks(*block_range)) for block_range in ranges[:max(1, self.sync_window)]]
+            next_range = len(pending)
+
+            blocks = []
+            try:
+                while pending:
+                    blocks.extend(await pending.pop(0))
+                    if next_range < len(ranges):
+                        pending.append(asyncio.create_task(fetch_blocks(*ranges[next_range])))
+                        next_range += 1
+            finally:
+                for task in pending:
+                    task.cancel()
+
+            # The hashes of the blocks are the ones of the headers, which match the checkpoints they cover
+            linked_height = max((header.index for header in headers if header.index in self._checkpoints), default=-1)
+            if not self.reorganize(ancestor, blocks, linked_height):
+                return False
+
+            print(f"Synchronized {len(blocks)} blocks from {node_url}")
+            return True
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Error occurred synchronizing with {node_url}: {e}")
+            return False
+
+    def get_state_mappings(self) -> dict[str, dict]:
+        """
+        A method to get the mappings of the state changed by the blocks, by name (see UndoJournal).
+        """
+        return {"balances": self.balances,
+                "unconfirmed_balances": self.unconfirmed_balances,
+                "stakes": self.stakes,
+                "deployed_smart_contracts": self.virtual_machine.deployed_smart_contracts}
+
+    def reset_state(self) -> None:
+        """
+        A method to set the confirmed state (balances, stakes and smart contracts) back to the genesis one.
+        """
+        for name in ["balances", "stakes", "virtual_machine"]:
+            setattr(self, name, self.__fields__[name].get_default())
+
+    def undo_last_block(self) -> BlockWithAdditionalData:
+        """
+        A method to roll back the last block with its undo journal: its state changes are reverted
+        and it is removed from the indexes, the chain and the seen hashes.
+        """
+        height = len(self.chain) - 1
+        block = self.chain[height]
+        journal = self._undo_journals.pop(height)
+
+        journal.undo(self.get_state_mappings())
+        self._address_index.remove_block(height, block)
+        self._transaction_index.remove_block(height, block)
+        self._block_index.remove_block(height, block)
+        self._seen_hashes.discard(block.hash)
+        del self.chain[height:]
+
+        self._last_snapshot_height = min(self._last_snapshot_height, height - 1)
+        return block
+
+    def rollback_to(self, height: int) -> list[BlockWithAdditionalData]:
+        """
+        A method to drop the blocks above height (all of them for -1), the unconfirmed balances are
+        rebuilt from the mempool.
+        The blocks are undone one by one with their undo journals, in O(depth). Without journals for all of them
+        (deeper than undo_journal_depth, or after a restart) the state is rebuilt by replaying the chain up to height.
+
+        Returns:
+        - list[BlockWithAdditionalData]: The dropped blocks, in chain order.
+        """
+        if height >= len(self.chain) - 1:
+            return []
+
+        if height >= 0 and all(block_height in self._undo_journals for block_height in range(height + 1, len(self.chain))):
+            removed_blocks = []
+            while len(self.chain) - 1 > height:
+                removed_blocks.append(self.undo_last_block())
+            self.rebuild_unconfirmed_balances()
+            return removed_blocks[::-1]
+
+        blocks = self.chain[:height + 1]
+        removed_blocks = self.chain[height + 1:]
+        for block in removed_blocks:
+            self._seen_hashes.discard(block.hash)
+
+        self.reset_state()
+        self.chain = []
+        self.rebuild_indexes()
+        if blocks:
+            self.create_chain_from_dump(blocks)
+
+        self.rebuild_unconfirmed_balances()
+        self._last_snapshot_height = min(self._last_snapshot_height, max(height, 0))
+        return removed_blocks
+
+    def restore_branch(self, height: int, branch: list[BlockWithAdditionalData]) -> None:
+        """
+        A method to put back a branch rolled back from height (after a failed reorganization).
+        """
+        self.rollback_to(height)
+        if branch and not (self.add_blocks(branch) if self.chain else self.create_chain_from_dump(branch)):
+            print(f"Error occurred restoring the branch after block #{height}")
+        self.rebuild_unconfirmed_balances()
+
+    def reorganize(self, height: int, blocks: list[BlockWithAdditionalData], linked_height: int = -1) -> bool:
+        """
+        A method to switch to another branch forking after the block at height: the current blocks after it
+        are rolled back and the new ones applied. If a new block is invalid, the current branch and the mempool are restored.
+        The transactions of the dropped blocks that the new branch does not include go back to the mempool.
+        linked_height is passed to add_blocks.
+        """
+        pending_transactions = [(transaction, self.unconfirmed_transactions.received(transaction.hash))
+                                for transaction in self.unconfirmed_transactions]
+        old_branch = self.rollback_to(height)
+
+        if not (self.add_blocks(blocks, linked_height) if self.chain else self.create_chain_from_dump(blocks)):
+            self.restore_branch(height, old_branch)
+            self.readmit_transactions(pending_transactions)
+            return False
+
+        self.return_to_mempool(old_branch)
+        return True
+
+    def return_to_mempool(self, blocks: list[BlockWithAdditionalData]) -> None:
+        """
+        A method to give the transactions of rolled back blocks back to the mempool, unless they are confirmed again.
+        """
+        # They keep the priority of the time they were mined
+        self.readmit_transactions([(transaction, block.timestamp) for block in blocks for transaction in block.transactions])
+
+    def readmit_transactions(self, transactions: list[tuple[TransactionWithAdditionalData, Optional[int]]]) -> None:
+        """
+        A method to put transactions that were pending or confirmed before a reorganization back in the mempool,
+        with the time they were received (or mined), unless they are confirmed by the chain.
+        The unconfirmed balances are rebuilt from the mempool first: the new chain may have confirmed transactions
+        of the mempool, and the readmitted ones are checked against the pending amounts.
+        """
+        self.rebuild_unconfirmed_balances()
+        for transaction, received in transactions:
+            if self._transaction_index.get(transaction.hash) is not None:
+                continue
+
+            if not self.transaction_exists(transaction.hash) and \
+               self.is_valid_transaction(transaction, check_signature=False) and \
+               self.admit_unconfirmed_transaction(transaction, received):
+                self.proccess_unconfirmed_balances(transaction)
+
+    def rebuild_unconfirmed_balances(self) -> None:
+        """
+        A method to compute the unconfirmed balances from scratch, from the transactions of the mempool.
+        """
+        self.unconfirmed_balances = {}
+        for transaction in self.unconfirmed_transactions:
+            self.proccess_unconfirmed_balances(transaction)
+
     def register_new_peer(self, node_address: str, node_id: str) -> None:
         """
         Add a new node to the list of peers.
@@ -196,17 +797,58 @@ class Blockchain(BaseModel):
 
     def create_chain_from_dump(self, chain_dump: list) -> None:
         """
-        A method to add the chain from a dump and validate it.
-        """
-        for index, block_data in enumerate(chain_dump):
-            block = BlockWithAdditionalData(**block_data)
-
-            if index == 0:
-                self.chain = []
-                self.chain.append(block)
-            else:
-                added = self.add_block(block, block.hash)
-                if not added: return False
+        A method to add the chain from a dump (blocks or their dicts) and validate it.
+        """
+        blocks = [block_data if isinstance(block_data, BlockWithAdditionalData) else BlockWithAdditionalData(**block_data)
+                  for block_data in chain_dump]
+
+        if blocks:
+            self.chain = []
+            self.chain.append(blocks[0])
+            self._undo_journals = {}
+            self.rebuild_indexes()
+
+        return self.add_blocks(blocks[1:])
+
+    def add_blocks(self, blocks: list[BlockWithAdditionalData], linked_height: int = -1) -> bool:
+        """
+        A method to add a chain segment in two phases. The stateless checks of the blocks (hashes, Merkle roots,
+        signatures) run in parallel, segment by segment, then the blocks are linked and applied to the state in order.
+        The next segment is checked while the current one is applied.
+        The blocks whose hash chain leads to a checkpoint are only checked through it (no signatures nor
+        transaction checks), the checkpoints pin their hashes and the resulting state. linked_height is the height
+        up to which the caller already linked the hashes of the blocks to a checkpoint (see sync_with_peer).
+        """
+        segment_size = max(1, self.signature_segment_blocks)
+        trusted_height = max(self.get_checkpointed_height(blocks), min(linked_height, self.get_last_checkpoint_height()))
+
+        # Segments do not straddle the trusted height, the ones below it skip the signatures
+        segments = []
+        for height, block in enumerate(blocks, start=len(self.chain)):
+            trusted = height <= trusted_height
+            if not segments or len(segments[-1][1]) >= segment_size or segments[-1][0] != trusted:
+                segments.append((trusted, []))
+            segments[-1][1].append(block)
+
+        block_validator = self.get_block_validator()
+
+        def submit(position: int):
+            trusted, segment = segments[position]
+            return block_validator.submit(segment, check_signatures=not trusted)
+
+        pending = submit(0) if segments else None
+        for position, (trusted, segment) in enumerate(segments):
+            results = pending.result()
+            pending = submit(position + 1) if position + 1 < len(segments) else None
+
+            for block, valid in zip(segment, results):
+                if not valid:
+                    print("Block hash or transaction signature is not valid")
+                if not valid or not self.add_block(block, block.hash, check_signatures=False, check_proof=False,
+                                                   check_transactions=not trusted):
+                    if pending is not None:
+                        pending.cancel()
+                    return False
 
         return True
 
@@ -219,9 +861,13 @@ class Blockchain(BaseModel):
         genesis_block_with_additional_data.hash = genesis_block_with_additional_data.compute_hash() # Manually set the hash of the genesis block
         self.chain.append(genesis_block)
 
-    def add_block(self, block: BlockWithAdditionalData, proof: str) -> bool:
+    def add_block(self, block: BlockWithAdditionalData, proof: str, check_signatures: bool = True, check_proof: bool = True,
+                  check_transactions: bool = True) -> bool:
         """
         A method that adds the block to the chain after verification.
+        The signatures are verified in a batch first, check_signatures=False means they were already verified
+        and check_proof=False that the hash of the block was (see add_blocks).
+        check_transactions=False applies the transactions without checking them against the state (blocks under a checkpoint).
         """
         previous_hash = dict(self.last_block)['hash']
         
@@ -229,39 +875,68 @@ class Blockchain(BaseModel):
             print("Previous hash is not equal")
             return False
         
-        if not self.is_valid_proof(block, proof):
+        if check_proof and not self.is_valid_proof(block, proof):
             print("Proof is not valid")
             return False
+
+        checkpoint = self._checkpoints.get(block.index)
+        if checkpoint is not None and checkpoint.hash != proof:
+            print(f"Block does not match the checkpoint at height {block.index}")
+            return False
         
-        mined_transactions_uuids = set()
+        # Verify the signatures of the transactions (stateless, in parallel)
+        if check_signatures and not self.verify_signatures(block.transactions):
+            print("Transaction signature is not valid")
+            return False
 
         # Proccess the transactions
+        if check_transactions:
+            for transaction in block.transactions:
+                # Verify the transaction data (balances, ...)
+                if not self.is_valid_transaction(transaction, check_signature=False):
+                    print("Transaction is not valid")
+                    return False
+        
+        # Journal the state the transactions change, to undo the block in a reorganization (or if it fails)
+        height = len(self.chain)
+        state = self.get_state_mappings()
+        journal = UndoJournal(height=height, hash=proof)
         for transaction in block.transactions:
-            mined_transactions_uuids.add(transaction.uuid)
+            journal.record(state, transaction)
 
-            # Verify the transaction data (signature, ...)
-            if not self.is_valid_transaction(transaction):
-                print("Transaction is not valid")
-                return False
-        
         # Process the transactions
         if not self.process_transactions(block.transactions):
             print("Error processing transactions")
+            journal.undo(state)
             return False
 
-        # Update the unconfirmed transactions
-        unconfirmed_transactions = [
-            transaction for transaction in self.unconfirmed_transactions
-            if transaction.uuid not in mined_transactions_uuids
-        ]
+        if checkpoint is not None and checkpoint.state_digest != self.compute_state_digest():
+            print(f"State does not match the checkpoint at height {block.index}")
+            journal.undo(state)
+            return False
 
-        self.set_unconfirmed_transactions(unconfirmed_transactions)
+        journal.close(state)
+        if self.undo_journal_depth > 0:
+            self._undo_journals[height] = journal
+            self._undo_journals.pop(height - self.undo_journal_depth, None)
+
+        # Update the unconfirmed transactions, only the mined ones are removed (the others are left untouched)
+        self.remove_mined_transactions(block)
         
         block.hash = proof
         self.chain.append(block)
+        self.index_block(len(self.chain) - 1, block)
+        self._seen_hashes.add(proof)
 
         return True
  
+    def remove_mined_transactions(self, block: BlockWithAdditionalData) -> None:
+        """
+        Remove the transactions included in a block from the unconfirmed transactions.
+        """
+        for transaction in block.transactions:
+            self.unconfirmed_transactions.remove_by_uuid(transaction.uuid)
+
     def is_valid_proof(self, block: BlockWithAdditionalData, block_hash: str) -> bool:
         """
         Check if block_hash is valid hash of block and satisfies the difficulty criteria.
@@ -269,6 +944,11 @@ class Blockchain(BaseModel):
         # Remove the hash field from the block copy and then compute the hash again.
         # Because on previous computing block does not have hash field.
         block.hash = None
+
+        # The header commits to the transactions through the Merkle root (older blocks are hashed as a whole)
+        if block.merkle_root is not None and not block.has_valid_merkle_root():
+            return False
+
         return block_hash == block.compute_hash()
 
     def add_new_unconfirmed_transaction_from_node(self, transaction: TransactionWithAdditionalData) -> bool:
@@ -277,22 +957,77 @@ class Blockchain(BaseModel):
         """
         if not self.is_valid_transaction(transaction):
             raise False
+
+        # The hash is claimed by the peer, mined blocks commit to it (Merkle root)
+        if not transaction.has_valid_hash():
+            return False
         
-        if self.transaction_exists(transaction.hash):
+        if self.has_seen(transaction.hash):
+            return False
+
+        if not self.admit_unconfirmed_transaction(transaction):
             return False
         
+        self._seen_hashes.add(transaction.hash)
         self.proccess_unconfirmed_balances(transaction)
-        self.unconfirmed_transactions.append(transaction)
         return True
 
+    def add_new_unconfirmed_transactions_from_node(self, transactions: list[TransactionWithAdditionalData]) -> list[TransactionWithAdditionalData]:
+        """
+        Adds a batch of unconfirmed transactions relayed by a node, their signatures are verified together.
+        The transactions already seen and the invalid ones are skipped.
+
+        Returns:
+        - list[TransactionWithAdditionalData]: The transactions added.
+        """
+        transactions = [transaction for transaction in transactions if not self.has_seen(transaction.hash)]
+
+        items = [(get_signature_message(transaction.content), transaction.signature, transaction.content.sender)
+                 for transaction in transactions if self.requires_signature(transaction)]
+        signature_results = iter(self.get_signature_verifier().verify(items))
+        valid_signatures = [next(signature_results) if self.requires_signature(transaction) else True
+                            for transaction in transactions]
+
+        added_transactions = []
+        for transaction, valid_signature in zip(transactions, valid_signatures):
+            if not valid_signature:
+                continue
+            # The hash is checked, it is remembered by the node and announced to the peers
+            if not transaction.has_valid_hash() or self.has_seen(transaction.hash):
+                continue
+            if not self.is_valid_transaction(transaction, check_signature=False):
+                continue
+            if not self.admit_unconfirmed_transaction(transaction):
+                continue
+
+            self._seen_hashes.add(transaction.hash)
+            self.proccess_unconfirmed_balances(transaction)
+            added_transactions.append(transaction)
+
+        return added_transactions
+
+    def admit_unconfirmed_transaction(self, transaction: TransactionWithAdditionalData, received: Optional[int] = None) -> bool:
+        """
+        Add a transaction to the mempool, evicting lower priority transactions if it is full.
+        Its priority is the time the node received it (now by default), see Mempool.
+        The unconfirmed balances of the evicted transactions are reverted.
+        """
+        size = transaction_size(transaction)
+        evicted_transactions = self.unconfirmed_transactions.make_room(transaction, size, received)
+        if evicted_transactions is None:
+            return False
+
+        for evicted_transaction in evicted_transactions:
+            print(f"Evicting transaction {evicted_transaction.hash} from the mempool")
+            self.revert_unconfirmed_balances(evicted_transaction)
+
+        return self.unconfirmed_transactions.add(transaction, size, received)
+
     def transaction_exists(self, hash: str) -> bool:
         """
         Check if a transaction with a given hash exists in the blockchain.
         """
-        for transaction in self.unconfirmed_transactions:
-            if transaction.hash == hash:
-                return True
-        return False
+        return hash in self.unconfirmed_transactions
 
     def add_new_unconfirmed_transaction(self, transaction: Transaction) -> TransactionWithAdditionalData:
         """
@@ -301,23 +1036,109 @@ class Blockchain(BaseModel):
         if not self.is_valid_transaction(transaction):
             raise False
         
-        transaction_with_additional_data = TransactionWithAdditionalData(**transaction.dict())
+        # dict() keeps the content model (and its memoized signed message)
+        transaction_with_additional_data = TransactionWithAdditionalData(**dict(transaction))
         transaction_with_additional_data.hash = transaction_with_additional_data.compute_hash()
         
         if self.transaction_exists(transaction_with_additional_data.hash):
             raise Exception("Transaction already exists.")
+
+        if not self.admit_unconfirmed_transaction(transaction_with_additional_data):
+            # Nothing was evicted, a full mempool only makes room for transactions received before
+            if not self.unconfirmed_transactions.fits(transaction_size(transaction_with_additional_data)):
+                raise MempoolFullError("The mempool is full, retry later.")
+            raise Exception("Transaction rejected by the mempool (the uuid is already pending).")
         
+        self._seen_hashes.add(transaction_with_additional_data.hash)
         self.proccess_unconfirmed_balances(transaction)
 
-        self.unconfirmed_transactions.append(transaction_with_additional_data)
         return transaction_with_additional_data
 
-    async def announce_new_transaction(self, transaction: TransactionWithAdditionalData) -> None:
-        async with httpx.AsyncClient() as client:
+    async def announce_new_transaction(self, transaction: TransactionWithAdditionalData, origin: Optional[str] = None) -> list[PeerResult]:
+        return await self.announce_new_transactions([transaction], origin)
+
+    async def announce_new_transactions(self, transactions: list[TransactionWithAdditionalData], origin: Optional[str] = None) -> list[PeerResult]:
+        """
+        Announce transactions to the peers (see relay_transactions). With a relay_window, they are queued for every peer
+        and relayed with the other transactions of the window in one message, the results are only reported.
+        origin is the node id of the peer the transactions came from, they are not announced back to it.
+        """
+        if not transactions:
+            return []
+
+        if self.relay_window > 0:
             for node_url, node_id in self.peers.items():
-                url = f"http://{node_url}/api/v1/blockchain/transaction/node/"
-                data = transaction.json()
-                response = await client.post(url, data=data)
+                if origin is None or node_id != origin:
+                    relay_queue = self.get_relay_queue(node_url)
+                    for transaction in transactions:
+                        relay_queue.add(transaction)
+            return []
+
+        return await self.fan_out_to_peers(lambda node_url: self.relay_transactions(node_url, transactions), exclude=origin)
+
+    def get_relay_queue(self, node_url: str) -> RelayQueue:
+        """
+        A method to get the queue of the transactions waiting to be relayed to a peer.
+        """
+        relay_queue = self._relay_queues.get(node_url)
+        if relay_queue is None:
+            async def send(transactions: list[TransactionWithAdditionalData]) -> list[PeerResult]:
+                return await self.fan_out_to_peers(lambda node_url: self.relay_transactions(node_url, transactions),
+                                                   node_urls=[node_url])
+
+            relay_queue = self._relay_queues[node_url] = RelayQueue(send, self.relay_window, self.relay_batch_size)
+        return relay_queue
+
+    async def flush_relay_queues(self) -> None:
+        """
+        A method to relay the queued transactions right away, and wait for them.
+        """
+        await asyncio.gather(*[relay_queue.flush() for relay_queue in self._relay_queues.values()])
+
+    async def relay_transactions(self, node_url: str, transactions: list[TransactionWithAdditionalData]) -> httpx.Response:
+        """
+        Relay transactions to a peer by their hashes (inventory), the bodies are only sent for the hashes
+        the peer asks for, so every node receives a transaction about once. They are sent in one message,
+        one by one to the peers without the batch endpoint, and without asking to the peers without the inventory one.
+        """
+        client = peer_client.get()
+        url = f"http://{node_url}/api/v1/blockchain"
+
+        response = await client.post(f"{url}/transaction/inventory/", json=[transaction.hash for transaction in transactions],
+                                     headers={NODE_ID_HEADER: self.node_id})
+        if response.status_code not in [404, 405]:
+            if response.status_code != 200:
+                return response
+            wanted = set(response.json())
+            transactions = [transaction for transaction in transactions if transaction.hash in wanted]
+            if not transactions:
+                return response
+
+        if len(transactions) > 1:
+            data = "[" + ",".join(transaction.json() for transaction in transactions) + "]"
+            binary_data = encode_transactions(transactions) if self.wire_encoding == "binary" else None
+            response = await self.post_to_peer(client, f"{url}/transactions/node/", data, binary_data)
+            if response.status_code not in [404, 405]:
+                return response
+
+        for transaction in transactions:
+            binary_data = encode_transaction(transaction) if self.wire_encoding == "binary" else None
+            response = await self.post_to_peer(client, f"{url}/transaction/node/", transaction.json(), binary_data)
+        return response
+
+    def get_unknown_transactions(self, hashes: list[str]) -> list[str]:
+        """
+        A method to get the transactions of an inventory that the node has not seen, neither pending nor confirmed.
+        """
+        return [transaction_hash for transaction_hash in dict.fromkeys(hashes) if not self.has_seen(transaction_hash)]
+
+    def has_seen(self, hash: str) -> bool:
+        """
+        A method to check if a transaction or block was already seen by the node: recently (see SeenCache),
+        pending or confirmed.
+        """
+        return hash in self._seen_hashes or self.transaction_exists(hash) or \
+               self._transaction_index.get(hash) is not None or self._block_index.get(hash) is not None
 
     def mine(self) -> bool:
         """
@@ -339,17 +1160,29 @@ class Blockchain(BaseModel):
             if self.peers.get(validator_node_url) == self.node_id: # The selected validator is the current node
                 last_block = self.last_block
                 
-                new_block = Block(index=last_block.index + 1,
-                                transactions=self.unconfirmed_transactions,
-                                previous_hash=last_block.hash)
-                
-                new_block_with_additional_data = BlockWithAdditionalData(**new_block.dict())
+                # Block template: the highest priority transactions within the block budget
+                transactions = self.unconfirmed_transactions.select(self.block_max_transactions or None,
+                                                                    self.block_max_bytes or None)
+                if not transactions: # No transaction fits in a block
+                    return False
+
+                # Built from the mempool transactions themselves, their memoized encodings are reused
+                new_block_with_additional_data = BlockWithAdditionalData(index=last_block.index + 1,
+                                                                         transactions=transactions,
+                                                                         previous_hash=last_block.hash)
+                new_block_with_additional_data.merkle_root = new_block_with_additional_data.compute_merkle_root()
                 
                 proof = new_block_with_additional_data.compute_hash()
                 
-                self.add_block(new_block_with_additional_data, proof)
+                if not self.add_block(new_block_with_additional_data, proof):
+                    # Transactions with a wrong hash can never be mined, they are dropped so the next block is valid
+                    for transaction in transactions:
+                        if not transaction.has_valid_hash():
+                            print(f"Dropping transaction {transaction.hash} from the mempool, its hash is not valid")
+                            self.unconfirmed_transactions.remove_by_uuid(transaction.uuid)
+                            self.revert_unconfirmed_balances(transaction)
+                    return False
                 
-                self.unconfirmed_transactions = []
                 self.update_last_mining_time()
                 
                 return new_block_with_additional_data.index
@@ -375,20 +1208,72 @@ class Blockchain(BaseModel):
 
     def save_chain(self) -> None:
         """
-        A method to save the blockchain's chain to a file.
+        A method to save the blockchain's chain to its block log.
+        Only the blocks that are not persisted yet are written, and then released from memory:
+        from that point the chain reads them back from the block store.
+        Every snapshot_interval blocks, a snapshot of the state is saved as well.
         """
-        if self.chain_file_name is not None:
-            try:
-                # Get the chain as a JSON string
-                chain = self.get_chain()
-                
-                # Convert the chain to a JSON string
-                chain_json = json.dumps(chain, indent=4)  # Esto hace que el JSON sea más legible
+        try:
+            write, release = self.prepare_save()
+            write()
+            release()
+        except Exception as e:
+            print(f"Error occurred saving the blockchain: {e}")
+
+    async def save_chain_async(self) -> None:
+        """
+        A method to save the chain from the event loop (see save_chain): the blocks and the state are captured
+        on the loop, only the file I/O runs in a thread.
+        """
+        try:
+            write, release = self.prepare_save()
+            await asyncio.to_thread(write)
+            release()
+        except Exception as e:
+            print(f"Error occurred saving the blockchain: {e}")
+
+    def prepare_save(self) -> tuple[Callable[[], None], Callable[[], None]]:
+        """
+        A method to capture the blocks to write and the snapshot to take, if one is due.
+        It returns the function doing the file I/O, which does not read the blockchain, and the one releasing
+        the written blocks from memory, to be called afterwards from the thread that changes the chain.
+        """
+        if self.chain_file_name is None:
+            return (lambda: None), (lambda: None)
+
+        chain = self.chain
+        block_log, block_store, snapshot_store = self.get_block_log(), self.get_block_store(), self.get_snapshot_store()
+
+        # Capture the state before writing, it must match the saved blocks
+        snapshot = None
+        if self.snapshot_interval and len(chain) - 1 >= self._last_snapshot_height + self.snapshot_interval:
+            snapshot = self.create_snapshot()
+
+        if isinstance(chain, StoredChain):
+            persisted, blocks = chain.begin_flush()
+        else:
+            blocks = list(chain)
+
+        def write() -> None:
+            if isinstance(chain, StoredChain):
+                chain.write_blocks(persisted, blocks)
+            else:
+                block_store.reset()
+                block_log.sync(blocks)
+            if snapshot is not None:
+                snapshot_store.save(snapshot)
+
+        def release() -> None:
+            if isinstance(chain, StoredChain):
+                chain.end_flush(persisted, blocks)
+            elif self.chain is chain and len(chain) == len(blocks) and all(current is saved for current, saved in zip(chain, blocks)):
+                # The chain did not change while saving
+                self.chain = StoredChain(block_log, block_store)
+            if snapshot is not None:
+                self._last_snapshot_height = snapshot.height
+
+        return write, release
 
-                with open(self.chain_file_name, 'w') as chain_file:
-                    chain_file.write(chain_json)
-            except Exception as e:
-                print(f"Error occurred saving the blockchain: {e}")
     # Wallet methods
     def add_new_wallet(self, public_key: str) -> bool:
         """
@@ -439,16 +1324,53 @@ class Blockchain(BaseModel):
         Returns:
         - List[TransactionWithAdditionalData]: A list of transactions associated with the wallet.
         """
-        transactions = []
-        for block in self.chain:
-            for transaction in block.transactions:
-                if transaction.content.sender == public_key or transaction.content.receiver == public_key:
-                    transactions.append(transaction)
-
+        transactions, _ = self.get_wallet_history(public_key)
         return transactions
 
+    def get_wallet_history(self, public_key: str, cursor: Optional[str] = None, limit: Optional[int] = None,
+                           newest_first: bool = False) -> tuple[List[TransactionWithAdditionalData], Optional[str]]:
+        """
+        Retrieve a page of the transactions associated with a wallet, through the address index.
+
+        Args:
+        - public_key (str): The public key of the wallet.
+        - cursor (Optional[str]): The cursor returned with the previous page, None for the first page.
+        - limit (Optional[int]): The maximum number of transactions of the page, None for all of them.
+        - newest_first (bool): True to get the most recent transactions first.
+
+        Returns:
+        - tuple[List[TransactionWithAdditionalData], Optional[str]]: The transactions and the cursor of the next page
+          (None if there are no more transactions).
+        """
+        locations = self._address_index.get(public_key, decode_cursor(cursor), limit, newest_first)
+        transactions = [self.chain[height].transactions[position] for height, position in locations]
+
+        next_cursor = None
+        if limit is not None and len(locations) == limit:
+            next_cursor = encode_cursor(locations[-1])
+
+        return transactions, next_cursor
+
     # Transaction methods
-    def is_valid_transaction(self, transaction: Union[Transaction, TransactionWithAdditionalData]) -> bool:
+    def requires_signature(self, transaction: Union[Transaction, TransactionWithAdditionalData]) -> bool:
+        """
+        Check if the signature of a transaction is verified (stake deposits are not signed).
+        """
+        return transaction.requires_signature()
+
+    def verify_signatures(self, transactions: list[Union[Transaction, TransactionWithAdditionalData]]) -> bool:
+        """
+        Verify the signatures of a batch of transactions, across the process pool for big batches.
+        """
+        items = [(get_signature_message(transaction.content), transaction.signature, transaction.content.sender)
+                 for transaction in transactions if self.requires_signature(transaction)]
+        return all(self.get_signature_verifier().verify(items))
+
+    def is_valid_transaction(self, transaction: Union[Transaction, TransactionWithAdditionalData], check_signature: bool = True) -> bool:
+        """
+        Validate a transaction against the current state, check_signature=False skips the signature
+        (when it was already verified in a batch).
+        """
         if transaction.type == TransactionType.COIN_TRANSFER:
             # Verify if the sender has enough balance to avoid double spending
             sender_unconfirmed_balance = self.unconfirmed_balances.get(transaction.content.sender, 0.0)
@@ -456,30 +1378,19 @@ class Blockchain(BaseModel):
 
             if sender_balance - sender_unconfirmed_balance < transaction.content.amount:
                 return False
-            
-            # Verify the signature of the transaction
-            if not transaction.verify_signature(transaction.content, transaction.signature, transaction.content.sender):
-                return False 
         elif transaction.type == TransactionType.STAKE_DEPOSIT:
             sender_balance = self.get_balance(transaction.content.sender)
             sender_stake = self.stakes.get(transaction.content.sender, Stake(amount=0.0, node_url=transaction.content.node_url)).amount
 
             if sender_balance + sender_stake < transaction.content.amount:
                 return False  # No hay suficiente balance teniendo en cuenta el stake
-        elif transaction.type == TransactionType.STAKE_WITHDRAW:
-            # Verify the signature of the transaction
-            if not transaction.verify_signature(transaction.content, transaction.signature, transaction.content.sender):
-                return False 
-        elif transaction.type == TransactionType.SMART_CONTRACT_DEPLOY:
-            # Verify the signature of the transaction
-            if not transaction.verify_signature(transaction.content, transaction.signature, transaction.content.sender):
-                return False 
-        elif transaction.type == TransactionType.SMART_CONTRACT_EXECUTION:
-            # Verify the signature of the transaction
-            if not transaction.verify_signature(transaction.content, transaction.signature, transaction.content.sender):
-                return False 
         #else:
             # Add new transaction types here
+
+        # Verify the signature of the transaction (last, it is the most expensive check)
+        if check_signature and self.requires_signature(transaction):
+            if not transaction.verify_signature(transaction.content, transaction.signature, transaction.content.sender):
+                return False
         
         return True
     
@@ -494,6 +1405,16 @@ class Blockchain(BaseModel):
         # else:
             # Add new transaction types here
 
+    def revert_unconfirmed_balances(self, transaction: Union[Transaction, TransactionWithAdditionalData]) -> None:
+        """
+        Revert the unconfirmed balance of a transaction that leaves the mempool without being mined
+        """
+        if transaction.type in [TransactionType.COIN_TRANSFER, TransactionType.STAKE_DEPOSIT]:
+            if transaction.content.sender in self.unconfirmed_balances:
+                self.unconfirmed_balances[transaction.content.sender] -= transaction.content.amount
+        # else:
+            # Add new transaction types here
+
     def process_transactions(self, transactions: list[TransactionWithAdditionalData]) -> bool:
         """
         Process a list of transactions.
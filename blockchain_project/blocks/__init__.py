@@ -1 +1,3 @@
-from .classes import Block, BlockWithAdditionalData
\ No newline at end of file
+from .classes import Block, BlockWithAdditionalData, BlockHeader, MerkleProofStep, MerkleProof, BlockValidator
+from .methods import EMPTY_MERKLE_ROOT, compute_merkle_root, compute_merkle_proof, verify_merkle_proof, \
+                      merkle_leaf, merkle_node
\ No newline at end of file
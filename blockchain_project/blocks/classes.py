@@ -1,19 +1,79 @@
 import pytz
 from datetime import datetime
 import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 from hashlib import sha256
 from typing import Optional
 from pydantic import BaseModel
 
 from blockchain_project import TransactionWithAdditionalData
+from blockchain_project.crypto import SignatureVerifier, signature_cache, verifying_key_cache
+from blockchain_project.memo import MemoizedModel
+from blockchain_project.transactions import get_signature_message
 
-class Block(BaseModel):
+from .methods import compute_merkle_root, compute_merkle_proof, verify_merkle_proof
+
+# Fields the memoized hashes do not depend on
+HASH_FIELD = frozenset({"hash"})
+HEADER_FIELDS = frozenset({"index", "previous_hash", "timestamp", "merkle_root", "hash"})
+NON_HEADER_FIELDS = frozenset({"transactions", "hash"})
+
+class Block(MemoizedModel):
     """
     The Block class is a block that contains a list of transactions in the blockchain being developed.
     """
     index: int
     transactions: list[TransactionWithAdditionalData]
     previous_hash: str
+
+class BlockHeader(BaseModel):
+    """
+    The BlockHeader class contains the data of a block that is hashed, the transactions are committed
+    through their Merkle root.
+    """
+    index: int
+    previous_hash: str
+    timestamp: Optional[int] = None
+    merkle_root: Optional[str] = None # None for the blocks created before the Merkle roots (hashed as a whole)
+    hash: Optional[str] = None
+
+    def compute_hash(self) -> str:
+        """
+        Computes the hash of the header (its fields as compact JSON, the hash field excluded).
+        """
+        header_data = json.dumps({
+            "index": self.index,
+            "previous_hash": self.previous_hash,
+            "timestamp": self.timestamp,
+            "merkle_root": self.merkle_root,
+        }, separators=(',', ':'))
+        return sha256(header_data.encode()).hexdigest()
+
+class MerkleProofStep(BaseModel):
+    """
+    The MerkleProofStep class is a sibling hash of a Merkle inclusion proof, with its side ("left" or "right").
+    """
+    side: str
+    hash: str
+
+class MerkleProof(BaseModel):
+    """
+    The MerkleProof class proves that a transaction is included in a block: the steps rebuild the Merkle root
+    of the header from the transaction hash.
+    """
+    transaction_hash: str
+    block_height: int
+    position: int
+    steps: list[MerkleProofStep]
+    header: BlockHeader
+
+    def verify(self) -> bool:
+        """
+        Check the proof against the header it carries (the header itself has to be checked against a trusted chain).
+        """
+        return self.header.merkle_root is not None and \
+               verify_merkle_proof(self.transaction_hash, [(step.side, step.hash) for step in self.steps], self.header.merkle_root)
     
 class BlockWithAdditionalData(Block):
     """
@@ -21,13 +81,190 @@ class BlockWithAdditionalData(Block):
     """
     timestamp: Optional[int] = int(datetime.now(pytz.timezone('America/Bogota')).timestamp())
     hash: Optional[str] = None
+    merkle_root: Optional[str] = None
+
+    def json(self, **kwargs) -> str:
+        """
+        The JSON of the block, memoized when no option is given (storage, announces).
+        """
+        if kwargs:
+            return super().json(**kwargs)
+        return self.memoize("json", super().json)
+
+    def compute_merkle_root(self) -> str:
+        """
+        Computes the Merkle root of the transaction hashes of the block.
+        """
+        return self.memoize("merkle_root",
+                            lambda: compute_merkle_root([transaction.hash for transaction in self.transactions]),
+                            exclude=HEADER_FIELDS)
+
+    def has_valid_merkle_root(self) -> bool:
+        """
+        Check that the Merkle root matches the transactions (and the transaction hashes their content).
+        """
+        return all(transaction.has_valid_hash() for transaction in self.transactions) and \
+               self.merkle_root == self.compute_merkle_root()
+
+    def has_valid_hash(self) -> bool:
+        """
+        Check the hash of the block against its content (and its Merkle root against the transactions).
+        """
+        if self.hash is None:
+            return False
+        if self.merkle_root is not None and not self.has_valid_merkle_root():
+            return False
+        return self.hash == self.compute_hash()
+
+    def get_signature_items(self) -> list[tuple[bytes, str, str]]:
+        """
+        The (message, signature, public key) of the transactions of the block that require a signature.
+        """
+        return [(get_signature_message(transaction.content), transaction.signature, transaction.content.sender)
+                for transaction in self.transactions if transaction.requires_signature()]
+
+    def has_valid_signatures(self) -> bool:
+        """
+        Check the signatures of the transactions of the block (the verified ones are cached).
+        """
+        return all(signature_cache.verify(*item) for item in self.get_signature_items())
+
+    def get_merkle_proof(self, position: int) -> list[MerkleProofStep]:
+        """
+        Computes the Merkle inclusion proof of the transaction at the given position.
+        """
+        proof = compute_merkle_proof([transaction.hash for transaction in self.transactions], position)
+        return [MerkleProofStep(side=side, hash=sibling) for side, sibling in proof]
+
+    def get_header(self) -> BlockHeader:
+        return BlockHeader(index=self.index,
+                           previous_hash=self.previous_hash,
+                           timestamp=self.timestamp,
+                           merkle_root=self.merkle_root,
+                           hash=self.hash)
+
+    def canonical_bytes(self) -> bytes:
+        """
+        The encoding the hash of a block without Merkle root is computed from: its JSON with an empty hash field.
+        """
+        def encode() -> bytes:
+            data = self.dict(exclude={"merkle_root"})
+            data["hash"] = None
+            return self.__config__.json_dumps(data, default=self.__json_encoder__).encode()
+        return self.memoize("canonical_bytes", encode, exclude=HASH_FIELD)
 
     def compute_hash(block) -> str:
         """
-        Computes the hash of a block.
+        Computes the hash of a block (whatever the hash field holds, it is hashed empty).
+        Blocks with a Merkle root are hashed through their header only, older blocks through their whole JSON.
         :param block: Block to compute the hash of.
         :return: Hash of the block.
         """
-        block_data = block.json()
-        hash = sha256(block_data.encode()).hexdigest()
-        return hash
\ No newline at end of file
+        if block.merkle_root is not None:
+            # The header does not depend on the transactions, checking the cached hash does not compare them
+            return block.memoize("header_hash", lambda: block.get_header().compute_hash(), exclude=NON_HEADER_FIELDS)
+        return block.memoize("hash", lambda: sha256(block.canonical_bytes()).hexdigest(), exclude=HASH_FIELD)
+
+
+class BlockValidator:
+    """
+    The BlockValidator class checks everything in a batch of blocks that does not depend on the state:
+    the block hashes, the Merkle roots, the transaction hashes and the signatures.
+    The blocks are split in chunks across the process pool of a signature verifier, small batches
+    (or a single worker) are checked in the calling process.
+    Signatures in the cache of the verifier are skipped and the new valid ones are added to it, as the workers
+    have their own caches.
+    The linkage between the blocks and the state transitions are left to the caller, in order.
+    """
+    def __init__(self, verifier: SignatureVerifier, min_batch_size: int = 8):
+        self.verifier = verifier
+        self.min_batch_size = min_batch_size
+
+    @staticmethod
+    def validate_chunk(blocks: list[BlockWithAdditionalData], items: list[tuple[bytes, str, str]]) -> tuple[list[bool], list[bool]]:
+        # This is what every worker of the process pool runs: the hashes of the blocks, the signatures not cached
+        return [block.has_valid_hash() for block in blocks], verifying_key_cache.verify_batch(items)
+
+    def submit(self, blocks: list[BlockWithAdditionalData], check_signatures: bool = True) -> "PendingValidation":
+        """
+        Start checking a batch of blocks, so the caller can apply the previous batch meanwhile.
+        """
+        # (position of the block, cache key, item) of the signatures to verify
+        signatures = []
+        if check_signatures:
+            for position, block in enumerate(blocks):
+                for item in block.get_signature_items():
+                    key = self.verifier.cache.key(*item)
+                    if not self.verifier.cache.contains(key):
+                        signatures.append((position, key, item))
+
+        if self.verifier.workers <= 1 or len(blocks) < self.min_batch_size:
+            return PendingValidation(self, blocks, signatures)
+
+        # A few chunks per worker to balance the load without paying the IPC per block
+        chunk_size = max(1, -(-len(blocks) // (self.verifier.workers * 4)))
+        try:
+            pool = self.verifier.get_pool()
+            futures = [pool.submit(BlockValidator.validate_chunk, blocks[start:start + chunk_size],
+                                   [item for position, _, item in signatures if start <= position < start + chunk_size])
+                       for start in range(0, len(blocks), chunk_size)]
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            print(f"Block validation pool failed, validating serially: {e}")
+            self.verifier.close()
+            futures = None
+        return PendingValidation(self, blocks, signatures, futures)
+
+    def validate(self, blocks: list[BlockWithAdditionalData], check_signatures: bool = True) -> list[bool]:
+        """
+        Check a batch of blocks.
+
+        Returns:
+        - list[bool]: The result of every block, in the same order.
+        """
+        return self.submit(blocks, check_signatures).result()
+
+class PendingValidation:
+    """
+    The PendingValidation class holds a batch of blocks being checked, split in chunks across the process pool
+    or checked serially when its result is requested. If the pool breaks, the batch is checked again serially.
+    """
+    def __init__(self, validator: BlockValidator, blocks: list[BlockWithAdditionalData],
+                 signatures: list[tuple[int, tuple, tuple[bytes, str, str]]], futures: Optional[list[Future]] = None):
+        self.validator = validator
+        self.blocks = blocks
+        self.signatures = signatures
+        self.futures = futures
+        self._results: Optional[list[bool]] = None
+
+    def result(self) -> list[bool]:
+        """
+        Returns:
+        - list[bool]: The result of every block, in the same order.
+        """
+        if self._results is None:
+            results = None
+            if self.futures is not None:
+                try:
+                    results, signature_results = [], []
+                    for future in self.futures:
+                        chunk_results, chunk_signature_results = future.result()
+                        results.extend(chunk_results)
+                        signature_results.extend(chunk_signature_results)
+                except (BrokenProcessPool, OSError) as e:
+                    print(f"Block validation pool failed, validating serially: {e}")
+                    self.validator.verifier.close()
+                    results = None
+            if results is None:
+                results, signature_results = BlockValidator.validate_chunk(self.blocks, [item for _, _, item in self.signatures])
+
+            for (position, key, _), verified in zip(self.signatures, signature_results):
+                if verified:
+                    self.validator.verifier.cache.add(key)
+                else:
+                    results[position] = False
+            self._results = results
+        return self._results
+
+    def cancel(self) -> None:
+        for future in self.futures or []:
+            future.cancel()
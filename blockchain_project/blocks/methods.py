@@ -1,2 +1,69 @@
+from hashlib import sha256
 
+# Domain separation of the Merkle tree: a leaf can never be mistaken for an inner node
+MERKLE_LEAF_PREFIX = b"\x00"
+MERKLE_NODE_PREFIX = b"\x01"
+EMPTY_MERKLE_ROOT = sha256(b"").hexdigest()
 
+def merkle_leaf(transaction_hash: str) -> bytes:
+    return sha256(MERKLE_LEAF_PREFIX + bytes.fromhex(transaction_hash)).digest()
+
+def merkle_node(left: bytes, right: bytes) -> bytes:
+    return sha256(MERKLE_NODE_PREFIX + left + right).digest()
+
+def compute_merkle_root(transaction_hashes: list[str]) -> str:
+    """
+    Compute the Merkle root of a list of transaction hashes (hex).
+    A node without sibling is promoted to the next level as is (it is not duplicated, so two different lists
+    of transactions can not have the same root).
+    """
+    if not transaction_hashes:
+        return EMPTY_MERKLE_ROOT
+
+    level = [merkle_leaf(transaction_hash) for transaction_hash in transaction_hashes]
+    while len(level) > 1:
+        next_level = [merkle_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0].hex()
+
+def compute_merkle_proof(transaction_hashes: list[str], position: int) -> list[tuple[str, str]]:
+    """
+    Compute the inclusion proof of the transaction at the given position.
+
+    Returns:
+    - list[tuple[str, str]]: The (side, sibling hash) pairs from the leaf to the root, side being "left" or "right"
+      (the side of the sibling). Levels where the node has no sibling are skipped, as it is promoted as is.
+    """
+    if not 0 <= position < len(transaction_hashes):
+        raise IndexError("Transaction position out of range")
+
+    proof = []
+    level = [merkle_leaf(transaction_hash) for transaction_hash in transaction_hashes]
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append(("left" if sibling < position else "right", level[sibling].hex()))
+        next_level = [merkle_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level, position = next_level, position // 2
+    return proof
+
+def verify_merkle_proof(transaction_hash: str, proof: list[tuple[str, str]], merkle_root: str) -> bool:
+    """
+    Check that a transaction hash is included in a Merkle root, given its inclusion proof.
+    """
+    try:
+        node = merkle_leaf(transaction_hash)
+        for side, sibling in proof:
+            if side == "left":
+                node = merkle_node(bytes.fromhex(sibling), node)
+            elif side == "right":
+                node = merkle_node(node, bytes.fromhex(sibling))
+            else:
+                return False
+    except (ValueError, TypeError):
+        return False
+    return node.hex() == merkle_root
@@ -0,0 +1,2 @@
+from .classes import Checkpoint, CheckpointList
+from .methods import compute_state_digest, load_checkpoints
\ No newline at end of file
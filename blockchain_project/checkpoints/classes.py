@@ -0,0 +1,27 @@
+import json
+from typing import Optional
+from pydantic import BaseModel
+
+from blockchain_project.crypto import verify_signature
+
+class Checkpoint(BaseModel):
+    """
+    The Checkpoint class pins the block at a height and the state right after applying it.
+    The blocks up to the checkpoint are accepted after the verification of their hash chain alone.
+    """
+    height: int
+    hash: str # Hash of the block at height
+    state_digest: str # Digest of the state after the block (see compute_state_digest)
+
+class CheckpointList(BaseModel):
+    """
+    The CheckpointList class is the list of trusted checkpoints of a node, optionally signed by a trusted key.
+    """
+    checkpoints: list[Checkpoint] = []
+    signature: Optional[str] = None # Signature of the checkpoints (compact JSON)
+
+    def signed_message(self) -> bytes:
+        return json.dumps([checkpoint.dict() for checkpoint in self.checkpoints], separators=(',', ':')).encode()
+
+    def has_valid_signature(self, public_key: str) -> bool:
+        return self.signature is not None and verify_signature(self.signed_message(), self.signature, public_key)
@@ -0,0 +1,32 @@
+import json
+from hashlib import sha256
+from typing import Optional
+
+from .classes import Checkpoint, CheckpointList
+
+def compute_state_digest(balances: dict, stakes: dict, deployed_smart_contracts: dict) -> str:
+    """
+    Digest of the confirmed state (balances, stakes and smart contracts) as sorted compact JSON.
+    The unconfirmed balances are left out, they depend on the mempool of every node.
+    """
+    state = {
+        "balances": balances,
+        "stakes": {public_key: dict(stake) for public_key, stake in stakes.items()},
+        "deployed_smart_contracts": {address: dict(contract) for address, contract in deployed_smart_contracts.items()},
+    }
+    state_data = json.dumps(state, sort_keys=True, separators=(',', ':'), default=str)
+    return sha256(state_data.encode()).hexdigest()
+
+def load_checkpoints(path: str, public_key: Optional[str] = None) -> list[Checkpoint]:
+    """
+    Load the checkpoints of a JSON file: a list of checkpoints, or a signed checkpoint list.
+    When a public key is given, the list must be signed by it.
+    """
+    with open(path, "r") as checkpoints_file:
+        data = json.load(checkpoints_file)
+
+    checkpoint_list = CheckpointList(checkpoints=data) if isinstance(data, list) else CheckpointList(**data)
+    if public_key and not checkpoint_list.has_valid_signature(public_key):
+        raise ValueError(f"The checkpoints of {path} are not signed by the trusted key")
+
+    return checkpoint_list.checkpoints
@@ -0,0 +1,2 @@
+from .methods import CODEC_VERSION, SUPPORTED_CODEC_VERSIONS, BINARY_MEDIA_TYPE, encode_block, decode_block, encode_transaction, \
+                      decode_transaction, encode_transactions, decode_transactions, dump_block, load_block
\ No newline at end of file
@@ -0,0 +1,21 @@
+class Reader:
+    """
+    Cursor over an encoded message.
+    """
+    def __init__(self, data: bytes):
+        self.data = bytes(data)
+        self.offset = 0
+
+    def read(self, length: int) -> bytes:
+        end = self.offset + length
+        if end > len(self.data):
+            raise ValueError("Truncated binary message")
+        chunk = self.data[self.offset:end]
+        self.offset = end
+        return chunk
+
+    def read_byte(self) -> int:
+        if self.offset >= len(self.data):
+            raise ValueError("Truncated binary message")
+        self.offset += 1
+        return self.data[self.offset - 1]
@@ -0,0 +1,305 @@
+import json
+import math
+import re
+import struct
+from typing import Optional, Union
+
+from blockchain_project.transactions.classes import TransactionType, Transaction, TransactionWithAdditionalData, \
+                                                   CoinTransferTransaction, StakeTransaction, \
+                                                   SmartContractDeploymentTransaction, SmartContractTransaction
+from blockchain_project.blocks import Block, BlockWithAdditionalData
+
+from .classes import Reader
+
+# Binary format of blocks and transactions.
+# Every message starts with the codec version, strings carrying hex (keys, signatures, hashes) are stored
+# as raw bytes, uuids as 16 bytes and amounts as varints when they are whole numbers.
+# Version 2 adds the Merkle root of the blocks, version 1 messages are still decoded.
+CODEC_VERSION = 2
+SUPPORTED_CODEC_VERSIONS = {1, 2}
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+# String tags
+STRING_NONE = 0
+STRING_UTF8 = 1
+STRING_HEX = 2
+STRING_UUID = 3
+
+# Amount tags
+AMOUNT_VARINT = 0
+AMOUNT_DOUBLE = 1
+
+DOUBLE = struct.Struct("<d")
+HEX_PATTERN = re.compile(r"^(?:[0-9a-f]{2})+$")
+UUID_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    """
+    Write an unsigned LEB128 integer.
+    """
+    if value < 0:
+        raise ValueError("Varints must be positive")
+    while value >= 0x80:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(reader: Reader) -> int:
+    result, shift = 0, 0
+    while True:
+        byte = reader.read_byte()
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result
+        shift += 7
+
+def write_optional_varint(buffer: bytearray, value: Optional[int]) -> None:
+    # 0 means None, any other value is shifted by one
+    write_varint(buffer, 0 if value is None else value + 1)
+
+def read_optional_varint(reader: Reader) -> Optional[int]:
+    value = read_varint(reader)
+    return None if value == 0 else value - 1
+
+def write_bytes(buffer: bytearray, value: bytes) -> None:
+    write_varint(buffer, len(value))
+    buffer += value
+
+def read_bytes(reader: Reader) -> bytes:
+    return reader.read(read_varint(reader))
+
+def write_string(buffer: bytearray, value: Optional[str]) -> None:
+    """
+    Write a string, as raw bytes if it is lowercase hex (keys, signatures, hashes) or a uuid.
+    """
+    if value is None:
+        buffer.append(STRING_NONE)
+    elif len(value) == 36 and UUID_PATTERN.match(value):
+        buffer.append(STRING_UUID)
+        buffer += bytes.fromhex(value.replace("-", ""))
+    elif HEX_PATTERN.match(value):
+        buffer.append(STRING_HEX)
+        write_bytes(buffer, bytes.fromhex(value))
+    else:
+        buffer.append(STRING_UTF8)
+        write_bytes(buffer, value.encode())
+
+def read_string(reader: Reader) -> Optional[str]:
+    tag = reader.read_byte()
+    if tag == STRING_NONE:
+        return None
+    if tag == STRING_UUID:
+        raw = reader.read(16).hex()
+        return f"{raw[:8]}-{raw[8:12]}-{raw[12:16]}-{raw[16:20]}-{raw[20:]}"
+    if tag == STRING_HEX:
+        return read_bytes(reader).hex()
+    if tag == STRING_UTF8:
+        return read_bytes(reader).decode()
+    raise ValueError(f"Unknown string tag {tag}")
+
+def write_amount(buffer: bytearray, value: float) -> None:
+    """
+    Write an amount, as a varint when it is a positive whole number.
+    """
+    if math.copysign(1.0, value) > 0 and float(value).is_integer() and value < 2 ** 63:
+        buffer.append(AMOUNT_VARINT)
+        write_varint(buffer, int(value))
+    else:
+        buffer.append(AMOUNT_DOUBLE)
+        buffer += DOUBLE.pack(value)
+
+def read_amount(reader: Reader) -> float:
+    tag = reader.read_byte()
+    if tag == AMOUNT_VARINT:
+        return float(read_varint(reader))
+    if tag == AMOUNT_DOUBLE:
+        return DOUBLE.unpack(reader.read(DOUBLE.size))[0]
+    raise ValueError(f"Unknown amount tag {tag}")
+
+def write_json(buffer: bytearray, value) -> None:
+    # Free-form values (smart contract arguments)
+    write_string(buffer, None if value is None else json.dumps(value, separators=(',', ':')))
+
+def read_json(reader: Reader):
+    value = read_string(reader)
+    return None if value is None else json.loads(value)
+
+def write_content(buffer: bytearray, transaction_type: TransactionType, content) -> None:
+    write_string(buffer, content.sender)
+    if transaction_type == TransactionType.COIN_TRANSFER:
+        write_string(buffer, content.receiver)
+        write_amount(buffer, content.amount)
+    elif transaction_type in [TransactionType.STAKE_DEPOSIT, TransactionType.STAKE_WITHDRAW]:
+        write_string(buffer, content.node_url)
+        write_amount(buffer, content.amount)
+    elif transaction_type == TransactionType.SMART_CONTRACT_DEPLOY:
+        write_string(buffer, content.contract_code)
+    elif transaction_type == TransactionType.SMART_CONTRACT_EXECUTION:
+        write_string(buffer, content.contract_address)
+        write_string(buffer, content.function_signature)
+        write_json(buffer, content.args)
+        write_json(buffer, content.kwargs)
+    # Add new transaction types here
+    else:
+        raise ValueError(f"Unknown transaction type {transaction_type}")
+
+def read_content(reader: Reader, transaction_type: TransactionType) -> dict:
+    sender = read_string(reader)
+    if transaction_type == TransactionType.COIN_TRANSFER:
+        return {"sender": sender, "receiver": read_string(reader), "amount": read_amount(reader)}
+    if transaction_type in [TransactionType.STAKE_DEPOSIT, TransactionType.STAKE_WITHDRAW]:
+        return {"sender": sender, "node_url": read_string(reader), "amount": read_amount(reader)}
+    if transaction_type == TransactionType.SMART_CONTRACT_DEPLOY:
+        return {"sender": sender, "contract_code": read_string(reader)}
+    if transaction_type == TransactionType.SMART_CONTRACT_EXECUTION:
+        return {"sender": sender,
+                "contract_address": read_string(reader),
+                "function_signature": read_string(reader),
+                "args": read_json(reader),
+                "kwargs": read_json(reader)}
+    # Add new transaction types here
+    raise ValueError(f"Unknown transaction type {transaction_type}")
+
+def construct_content(transaction_type: TransactionType, content: dict):
+    if transaction_type == TransactionType.COIN_TRANSFER:
+        return CoinTransferTransaction.construct(**content)
+    if transaction_type in [TransactionType.STAKE_DEPOSIT, TransactionType.STAKE_WITHDRAW]:
+        return StakeTransaction.construct(**content)
+    if transaction_type == TransactionType.SMART_CONTRACT_DEPLOY:
+        return SmartContractDeploymentTransaction.construct(**content)
+    if transaction_type == TransactionType.SMART_CONTRACT_EXECUTION:
+        return SmartContractTransaction.construct(**content)
+    # Add new transaction types here
+    raise ValueError(f"Unknown transaction type {transaction_type}")
+
+def write_transaction(buffer: bytearray, transaction: Union[Transaction, TransactionWithAdditionalData]) -> None:
+    write_string(buffer, transaction.uuid)
+    buffer.append(int(transaction.type))
+    write_content(buffer, transaction.type, transaction.content)
+    write_string(buffer, transaction.signature)
+    write_optional_varint(buffer, getattr(transaction, "timestamp", None))
+    write_string(buffer, getattr(transaction, "hash", None))
+
+def read_transaction(reader: Reader) -> dict:
+    transaction_uuid = read_string(reader)
+    transaction_type = TransactionType(reader.read_byte())
+    return {"uuid": transaction_uuid,
+            "type": transaction_type,
+            "content": read_content(reader, transaction_type),
+            "signature": read_string(reader),
+            "timestamp": read_optional_varint(reader),
+            "hash": read_string(reader)}
+
+def build_transaction(data: dict, validate: bool = True) -> TransactionWithAdditionalData:
+    """
+    Build a decoded transaction. Data from peers is validated, construct() is only for data the node wrote itself.
+    """
+    if validate:
+        return TransactionWithAdditionalData.parse_obj(data)
+    return TransactionWithAdditionalData.construct(**{**data, "content": construct_content(data["type"], data["content"])})
+
+def write_block(buffer: bytearray, block: Union[Block, BlockWithAdditionalData]) -> None:
+    write_varint(buffer, block.index)
+    write_string(buffer, block.previous_hash)
+    write_optional_varint(buffer, getattr(block, "timestamp", None))
+    write_string(buffer, getattr(block, "hash", None))
+    write_string(buffer, getattr(block, "merkle_root", None))
+    write_varint(buffer, len(block.transactions))
+    for transaction in block.transactions:
+        write_transaction(buffer, transaction)
+
+def read_block(reader: Reader, version: int = CODEC_VERSION) -> dict:
+    index = read_varint(reader)
+    previous_hash = read_string(reader)
+    timestamp = read_optional_varint(reader)
+    block_hash = read_string(reader)
+    merkle_root = read_string(reader) if version >= 2 else None
+    transactions = [read_transaction(reader) for _ in range(read_varint(reader))]
+    return {"index": index,
+            "transactions": transactions,
+            "previous_hash": previous_hash,
+            "timestamp": timestamp,
+            "hash": block_hash,
+            "merkle_root": merkle_root}
+
+def build_block(data: dict, validate: bool = True) -> BlockWithAdditionalData:
+    """
+    Build a decoded block. Data from peers is validated, construct() is only for data the node wrote itself.
+    """
+    if validate:
+        return BlockWithAdditionalData.parse_obj(data)
+    transactions = [build_transaction(transaction, validate=False) for transaction in data["transactions"]]
+    return BlockWithAdditionalData.construct(**{**data, "transactions": transactions})
+
+def read_version(reader: Reader) -> int:
+    version = reader.read_byte()
+    if version not in SUPPORTED_CODEC_VERSIONS:
+        raise ValueError(f"Unsupported binary codec version {version}")
+    return version
+
+def encode_transaction(transaction: Union[Transaction, TransactionWithAdditionalData]) -> bytes:
+    """
+    Encode a transaction in the binary format.
+    """
+    buffer = bytearray([CODEC_VERSION])
+    write_transaction(buffer, transaction)
+    return bytes(buffer)
+
+def decode_transaction(data: bytes) -> TransactionWithAdditionalData:
+    """
+    Decode a transaction from the binary format, the decoded data is validated.
+    """
+    reader = Reader(data)
+    read_version(reader)
+    return build_transaction(read_transaction(reader))
+
+def encode_transactions(transactions: list[TransactionWithAdditionalData]) -> bytes:
+    """
+    Encode a list of transactions in the binary format.
+    """
+    buffer = bytearray([CODEC_VERSION])
+    write_varint(buffer, len(transactions))
+    for transaction in transactions:
+        write_transaction(buffer, transaction)
+    return bytes(buffer)
+
+def decode_transactions(data: bytes) -> list[TransactionWithAdditionalData]:
+    """
+    Decode a list of transactions from the binary format, the decoded data is validated.
+    """
+    reader = Reader(data)
+    read_version(reader)
+    return [build_transaction(read_transaction(reader)) for _ in range(read_varint(reader))]
+
+def encode_block(block: Union[Block, BlockWithAdditionalData]) -> bytes:
+    """
+    Encode a block in the binary format.
+    """
+    buffer = bytearray([CODEC_VERSION])
+    write_block(buffer, block)
+    return bytes(buffer)
+
+def decode_block(data: bytes, validate: bool = True) -> BlockWithAdditionalData:
+    """
+    Decode a block from the binary format. The decoded data is validated, unless validate is False
+    (blocks the node stored itself).
+    """
+    reader = Reader(data)
+    return build_block(read_block(reader, read_version(reader)), validate)
+
+def dump_block(block: BlockWithAdditionalData, encoding: str = "json") -> bytes:
+    """
+    Serialize a block for storage, either as JSON or in the binary format.
+    """
+    if encoding == "binary":
+        return encode_block(block)
+    return block.json().encode()
+
+def load_block(data: bytes) -> BlockWithAdditionalData:
+    """
+    Deserialize a stored block, whatever its encoding (JSON documents start with '{').
+    The binary blocks are not validated again, the node validated them before storing them.
+    """
+    if data[:1] == b"{":
+        return BlockWithAdditionalData.parse_raw(data)
+    return decode_block(data, validate=False)
@@ -0,0 +1,4 @@
+from .classes import SignatureBackend, EcdsaBackend, CoincurveBackend, SIGNATURE_BACKENDS, VerifyingKeyCache, \
+                      SignatureCache, SignatureVerifier, verifying_key_cache, signature_cache
+from .methods import signature_message, get_signature_backend, set_signature_backend, generate_private_key, \
+                      public_key_from_private_key, sign_message, verify_signature, verify_signature_batch
\ No newline at end of file
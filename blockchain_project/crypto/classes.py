@@ -0,0 +1,409 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import binascii
+import hashlib
+import os
+import threading
+from typing import Any, Optional
+
+import ecdsa
+from ecdsa.ellipticcurve import PointJacobi
+
+try:
+    import coincurve
+    from coincurve.ecdsa import cdata_to_der, der_to_cdata, deserialize_compact, serialize_compact, signature_normalize
+except ImportError: # The accelerated backend is optional
+    coincurve = None
+
+class SignatureBackend:
+    """
+    The SignatureBackend class is the interface of the ECDSA (SECP256k1) implementations.
+    Keys are hex strings (32 bytes private keys, 64 bytes raw public keys) and signatures are hex raw r||s (64 bytes)
+    over the SHA-1 digest of the message, the encoding of the original ecdsa based wallets.
+    """
+    name = None
+
+    def generate_private_key(self) -> str:
+        raise NotImplementedError
+
+    def public_key_from_private_key(self, private_key: str) -> str:
+        raise NotImplementedError
+
+    def sign(self, message: bytes, private_key: str) -> str:
+        raise NotImplementedError
+
+    def parse_public_key(self, public_key: str) -> Any:
+        """
+        Decode (and validate) a public key, it raises ValueError if it is malformed.
+        """
+        raise NotImplementedError
+
+    def verify_with_key(self, key: Any, message: bytes, signature: str) -> bool:
+        """
+        Verify a signature with an already parsed public key.
+        """
+        raise NotImplementedError
+
+    def precompute(self, key: Any) -> Any:
+        """
+        Return a version of a parsed public key that is faster to verify with (the same key if not supported).
+        """
+        return key
+
+    def verify(self, message: bytes, signature: str, public_key: str) -> bool:
+        """
+        Verify a signature, False for malformed keys or signatures.
+        """
+        try:
+            key = self.parse_public_key(public_key)
+        except (ValueError, TypeError, AssertionError):
+            return False
+        return self.verify_with_key(key, message, signature)
+
+class EcdsaBackend(SignatureBackend):
+    """
+    The EcdsaBackend class is the pure Python implementation (ecdsa package), the default one.
+    """
+    name = "ecdsa"
+
+    def generate_private_key(self) -> str:
+        return binascii.hexlify(ecdsa.SigningKey.generate(curve=ecdsa.SECP256k1).to_string()).decode('utf-8')
+
+    def public_key_from_private_key(self, private_key: str) -> str:
+        sk = ecdsa.SigningKey.from_string(binascii.unhexlify(private_key), curve=ecdsa.SECP256k1)
+        return binascii.hexlify(sk.verifying_key.to_string()).decode('utf-8')
+
+    def sign(self, message: bytes, private_key: str) -> str:
+        sk = ecdsa.SigningKey.from_string(binascii.unhexlify(private_key), curve=ecdsa.SECP256k1)
+        return binascii.hexlify(sk.sign(message)).decode('utf-8')
+
+    def parse_public_key(self, public_key: str) -> ecdsa.VerifyingKey:
+        # It raises MalformedPointError (an AssertionError) or binascii.Error (a ValueError) on malformed keys
+        return ecdsa.VerifyingKey.from_string(binascii.unhexlify(public_key), curve=ecdsa.SECP256k1)
+
+    def verify_with_key(self, key: ecdsa.VerifyingKey, message: bytes, signature: str) -> bool:
+        try:
+            return key.verify(binascii.unhexlify(signature), message)
+        except (ecdsa.BadSignatureError, ValueError, TypeError, AssertionError):
+            return False
+
+    def precompute(self, key: ecdsa.VerifyingKey) -> ecdsa.VerifyingKey:
+        point = key.pubkey.point
+        # The precomputation needs the order of the point, which is not kept when a key is parsed from its string
+        ordered_point = PointJacobi(point.curve(), point.x(), point.y(), 1, key.curve.order)
+        precomputed_key = ecdsa.VerifyingKey.from_public_point(ordered_point, curve=key.curve,
+                                                                hashfunc=key.default_hashfunc,
+                                                                validate_point=False)
+        precomputed_key.precompute()
+        return precomputed_key
+
+class CoincurveBackend(SignatureBackend):
+    """
+    The CoincurveBackend class is the accelerated implementation (libsecp256k1 through the optional coincurve package).
+    libsecp256k1 only verifies low-S signatures and works with 32 bytes digests, so signatures are normalized
+    and the SHA-1 digest is left padded: both backends accept and produce exactly the same signatures.
+    """
+    name = "coincurve"
+
+    def __init__(self):
+        if coincurve is None:
+            raise ImportError("The coincurve package is not installed")
+
+    @staticmethod
+    def digest(message: bytes) -> bytes:
+        # ecdsa reads the 20 bytes digest as an integer, which is the same as the 32 bytes left padded digest
+        return hashlib.sha1(message).digest().rjust(32, b"\x00")
+
+    def generate_private_key(self) -> str:
+        return coincurve.PrivateKey().secret.hex()
+
+    def public_key_from_private_key(self, private_key: str) -> str:
+        return coincurve.PrivateKey(bytes.fromhex(private_key)).public_key.format(compressed=False)[1:].hex()
+
+    def sign(self, message: bytes, private_key: str) -> str:
+        signature = coincurve.PrivateKey(bytes.fromhex(private_key)).sign(self.digest(message), hasher=None)
+        return serialize_compact(der_to_cdata(signature)).hex()
+
+    def parse_public_key(self, public_key: str) -> "coincurve.PublicKey":
+        raw_public_key = bytes.fromhex(public_key)
+        if len(raw_public_key) != 64:
+            raise ValueError("Invalid public key length")
+        return coincurve.PublicKey(b"\x04" + raw_public_key)
+
+    def verify_with_key(self, key: "coincurve.PublicKey", message: bytes, signature: str) -> bool:
+        try:
+            _, normalized_signature = signature_normalize(deserialize_compact(bytes.fromhex(signature)))
+            return key.verify(cdata_to_der(normalized_signature), self.digest(message), hasher=None)
+        except (ValueError, TypeError):
+            return False
+
+SIGNATURE_BACKENDS = {
+    EcdsaBackend.name: EcdsaBackend,
+    CoincurveBackend.name: CoincurveBackend,
+}
+
+class VerifyingKeyCache:
+    """
+    The VerifyingKeyCache class keeps the parsed verifying keys of the recent signers (LRU, bounded by max_size),
+    so the point decoding and validation of a public key is not repeated on every verification.
+    Keys used at least precompute_threshold times get precomputation tables, which make their verifications cheaper.
+    The keys are parsed (and verified) by the signature backend of the node.
+    """
+    def __init__(self,
+                 backend: Optional[SignatureBackend] = None,
+                 max_size: int = 4096,
+                 precompute_threshold: int = 64,
+                 max_precomputed: int = 64):
+        self.backend = EcdsaBackend() if backend is None else backend
+        self.max_size = max_size # 0 disables the cache
+        self.precompute_threshold = precompute_threshold # 0 disables the precomputation
+        self.max_precomputed = max_precomputed # Precomputation tables take memory, only the hottest keys get them
+        self.hits = 0
+        self.misses = 0
+        self._keys: OrderedDict[str, Any] = OrderedDict()
+        self._uses: dict[str, int] = {}
+        self._precomputed: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def set_backend(self, backend: SignatureBackend) -> None:
+        """
+        Switch the signature backend, the keys parsed by the previous one are dropped.
+        """
+        self.backend = backend
+        self.clear()
+
+    def get(self, public_key: str) -> Any:
+        """
+        Get the parsed verifying key of a public key (in hex), it raises if the key is malformed.
+        """
+        with self._lock:
+            verifying_key = self._keys.get(public_key)
+            if verifying_key is not None:
+                self._keys.move_to_end(public_key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if verifying_key is None:
+            verifying_key = self.backend.parse_public_key(public_key)
+            if self.max_size <= 0:
+                return verifying_key
+            with self._lock:
+                self._keys[public_key] = verifying_key
+                self._uses.setdefault(public_key, 0)
+                while len(self._keys) > self.max_size:
+                    evicted_key, _ = self._keys.popitem(last=False)
+                    self._uses.pop(evicted_key, None)
+                    self._precomputed.discard(evicted_key)
+
+        return self.count_use(public_key, verifying_key)
+
+    def count_use(self, public_key: str, verifying_key: Any) -> Any:
+        """
+        Count a use of a cached key, precomputing it once it is hot enough.
+        """
+        with self._lock:
+            if public_key not in self._uses:
+                return verifying_key
+            self._uses[public_key] += 1
+            precompute = self.precompute_threshold > 0 and \
+                         self._uses[public_key] >= self.precompute_threshold and \
+                         public_key not in self._precomputed and \
+                         len(self._precomputed) < self.max_precomputed
+            if precompute:
+                self._precomputed.add(public_key)
+
+        if precompute:
+            verifying_key = self.backend.precompute(verifying_key)
+            with self._lock:
+                if public_key in self._keys:
+                    self._keys[public_key] = verifying_key
+        return verifying_key
+
+    def verify(self, message: bytes, signature: str, public_key: str) -> bool:
+        """
+        Verify a signature with the cached verifying key of the signer.
+        """
+        try:
+            verifying_key = self.get(public_key)
+        except (ValueError, TypeError, AssertionError):
+            return False
+        return self.backend.verify_with_key(verifying_key, message, signature)
+
+    def verify_batch(self, items: list[tuple[bytes, str, str]]) -> list[bool]:
+        return [self.verify(message, signature, public_key) for message, signature, public_key in items]
+
+    def resize(self, max_size: int) -> None:
+        with self._lock:
+            self.max_size = max_size
+            while len(self._keys) > max(max_size, 0):
+                evicted_key, _ = self._keys.popitem(last=False)
+                self._uses.pop(evicted_key, None)
+                self._precomputed.discard(evicted_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            self._uses.clear()
+            self._precomputed.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> dict[str, int]:
+        return {"size": len(self._keys), "max_size": self.max_size, "hits": self.hits, "misses": self.misses,
+                "precomputed": len(self._precomputed)}
+
+# Verifying keys shared by every verification of the process (worker processes have their own)
+verifying_key_cache = VerifyingKeyCache()
+
+class SignatureCache:
+    """
+    The SignatureCache class remembers the signatures that were successfully verified (LRU, bounded by max_size),
+    so a transaction seen at admission, in gossip and in a block is only verified once per node.
+    Entries are keyed by the digest of the signed message, the signature and the public key: a claimed transaction
+    hash is not trusted, and failed verifications are never cached.
+    """
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size # 0 disables the cache
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[bytes, str, str], None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(message: bytes, signature: str, public_key: str) -> tuple[bytes, str, str]:
+        return (hashlib.sha256(message).digest(), signature, public_key)
+
+    def contains(self, key: tuple[bytes, str, str]) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key: tuple[bytes, str, str]) -> None:
+        with self._lock:
+            if self.max_size <= 0:
+                return
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def resize(self, max_size: int) -> None:
+        with self._lock:
+            self.max_size = max_size
+            while len(self._entries) > max(max_size, 0):
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    def verify(self, message: bytes, signature: str, public_key: str) -> bool:
+        """
+        Verify a signature, unless it was already verified.
+        """
+        key = self.key(message, signature, public_key)
+        if self.contains(key):
+            return True
+        if not verifying_key_cache.verify(message, signature, public_key):
+            return False
+        self.add(key)
+        return True
+
+# Cache shared by every verification of the node (admission, gossip and block import)
+signature_cache = SignatureCache()
+
+class SignatureVerifier:
+    """
+    The SignatureVerifier class verifies batches of signatures, fanning them out across a process pool.
+    Small batches (or a single worker) are verified serially, in the calling process.
+    Signatures already in the cache are skipped and the new valid ones are added to it.
+    """
+    def __init__(self, workers: int = 0, min_batch_size: int = 64, cache: Optional[SignatureCache] = None):
+        self.workers = workers or os.cpu_count() or 1 # 0 means one worker per core
+        self.min_batch_size = min_batch_size
+        self.cache = signature_cache if cache is None else cache
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # The workers do not inherit the settings of the node when they are spawned
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=SignatureVerifier.initialize_worker,
+                                                 initargs=(verifying_key_cache.backend.name,
+                                                           verifying_key_cache.max_size,
+                                                           verifying_key_cache.precompute_threshold))
+            return self._pool
+
+    def verify(self, items: list[tuple[bytes, str, str]]) -> list[bool]:
+        """
+        Verify a batch of (message, signature, public key).
+
+        Returns:
+        - list[bool]: The result of every signature, in the same order.
+        """
+        keys = [self.cache.key(*item) for item in items]
+        results = [self.cache.contains(key) for key in keys]
+        pending = [index for index, verified in enumerate(results) if not verified]
+
+        for index, verified in zip(pending, self.verify_uncached([items[index] for index in pending])):
+            results[index] = verified
+            if verified:
+                self.cache.add(keys[index])
+        return results
+
+    @staticmethod
+    def initialize_worker(backend_name: str, max_size: int, precompute_threshold: int) -> None:
+        # This is what every worker of the process pool runs first: the signature backend and the verifying key
+        # cache of the node
+        if verifying_key_cache.backend.name != backend_name:
+            verifying_key_cache.set_backend(SIGNATURE_BACKENDS[backend_name]())
+        verifying_key_cache.resize(max_size)
+        verifying_key_cache.precompute_threshold = precompute_threshold
+
+    @staticmethod
+    def verify_chunk(items: list[tuple[bytes, str, str]]) -> list[bool]:
+        # This is what every worker of the process pool runs, with the verifying keys cached in the worker
+        return verifying_key_cache.verify_batch(items)
+
+    def verify_uncached(self, items: list[tuple[bytes, str, str]]) -> list[bool]:
+        if self.workers <= 1 or len(items) < self.min_batch_size:
+            return verifying_key_cache.verify_batch(items)
+
+        # A few chunks per worker to balance the load without paying the IPC per signature
+        chunk_size = max(1, -(-len(items) // (self.workers * 4)))
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+        try:
+            results = []
+            for chunk_results in self.get_pool().map(SignatureVerifier.verify_chunk, chunks):
+                results.extend(chunk_results)
+            return results
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Signature verification pool failed, verifying serially: {e}")
+            self.close()
+            return verifying_key_cache.verify_batch(items)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,64 @@
+import json
+
+from .classes import SignatureBackend, SIGNATURE_BACKENDS, verifying_key_cache
+
+def signature_message(content) -> bytes:
+    """
+    The message signed by a wallet: the transaction content as compact JSON.
+    """
+    return json.dumps(dict(content), separators=(',', ':')).encode()
+
+def get_signature_backend() -> SignatureBackend:
+    """
+    The signature backend used by the node.
+    """
+    return verifying_key_cache.backend
+
+def set_signature_backend(name: str) -> SignatureBackend:
+    """
+    Select the signature backend of the node ("ecdsa" or "coincurve"), at startup.
+    The default (ecdsa) backend is kept if the requested one is unknown or not installed.
+    """
+    if name == get_signature_backend().name:
+        return get_signature_backend()
+
+    try:
+        backend = SIGNATURE_BACKENDS[name]()
+    except (KeyError, ImportError) as e:
+        print(f"Signature backend {name} is not available, using {get_signature_backend().name}: {e}")
+        return get_signature_backend()
+
+    verifying_key_cache.set_backend(backend)
+    return backend
+
+def generate_private_key() -> str:
+    return get_signature_backend().generate_private_key()
+
+def public_key_from_private_key(private_key: str) -> str:
+    return get_signature_backend().public_key_from_private_key(private_key)
+
+def sign_message(message: bytes, private_key: str) -> str:
+    """
+    Sign a message with a private key (hex), the signature is returned in hex.
+    """
+    return get_signature_backend().sign(message, private_key)
+
+def verify_signature(message: bytes, signature: str, public_key: str) -> bool:
+    """
+    Verify an ECDSA (SECP256k1) signature of a message, without any cache.
+
+    Args:
+    - message (bytes): The signed message.
+    - signature (str): The signature, in hex.
+    - public_key (str): The public key of the signer, in hex.
+
+    Returns:
+    - bool: True if the signature is valid, False otherwise (malformed keys or signatures included).
+    """
+    return get_signature_backend().verify(message, signature, public_key)
+
+def verify_signature_batch(items: list[tuple[bytes, str, str]]) -> list[bool]:
+    """
+    Verify a batch of (message, signature, public key).
+    """
+    return [verify_signature(message, signature, public_key) for message, signature, public_key in items]
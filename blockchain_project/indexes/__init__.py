@@ -0,0 +1,2 @@
+from .classes import AddressIndex, TransactionIndex, BlockIndex
+from .methods import transaction_addresses, encode_cursor, decode_cursor
\ No newline at end of file
@@ -0,0 +1,94 @@
+from bisect import bisect_left, bisect_right
+from typing import Optional
+from pydantic import BaseModel, PrivateAttr
+
+from blockchain_project.blocks import BlockWithAdditionalData
+
+from .methods import transaction_addresses
+
+class AddressIndex(BaseModel):
+    """
+    The AddressIndex class maps every wallet address to the (height, position) of its transactions in the chain,
+    sorted from the oldest to the newest.
+    """
+    _locations: dict = PrivateAttr(default_factory=dict)
+
+    def add_block(self, height: int, block: BlockWithAdditionalData) -> None:
+        """
+        Index the transactions of a block appended at the given height.
+        """
+        for position, transaction in enumerate(block.transactions):
+            for address in transaction_addresses(transaction):
+                self._locations.setdefault(address, []).append((height, position))
+
+    def remove_block(self, height: int, block: BlockWithAdditionalData) -> None:
+        """
+        Remove the transactions of the block at the given height (it must be the last indexed block).
+        """
+        for transaction in block.transactions:
+            for address in transaction_addresses(transaction):
+                locations = self._locations.get(address, [])
+                while locations and locations[-1][0] >= height:
+                    locations.pop()
+                if not locations:
+                    self._locations.pop(address, None)
+
+    def clear(self) -> None:
+        self._locations.clear()
+
+    def get(self, address: str, cursor: Optional[tuple[int, int]] = None, limit: Optional[int] = None,
+            newest_first: bool = False) -> list[tuple[int, int]]:
+        """
+        Get the locations of the transactions of an address, after the cursor (the last location of the previous page).
+        """
+        locations = self._locations.get(address, [])
+
+        if newest_first:
+            end = len(locations) if cursor is None else bisect_left(locations, cursor)
+            start = 0 if limit is None else max(end - limit, 0)
+            return locations[start:end][::-1]
+
+        start = 0 if cursor is None else bisect_right(locations, cursor)
+        end = len(locations) if limit is None else start + limit
+        return locations[start:end]
+
+class TransactionIndex(BaseModel):
+    """
+    The TransactionIndex class maps every transaction hash to its (height, position) in the chain.
+    """
+    _locations: dict = PrivateAttr(default_factory=dict)
+
+    def add_block(self, height: int, block: BlockWithAdditionalData) -> None:
+        for position, transaction in enumerate(block.transactions):
+            if transaction.hash is not None:
+                self._locations[transaction.hash] = (height, position)
+
+    def remove_block(self, height: int, block: BlockWithAdditionalData) -> None:
+        for transaction in block.transactions:
+            if self._locations.get(transaction.hash, (None,))[0] == height:
+                del self._locations[transaction.hash]
+
+    def clear(self) -> None:
+        self._locations.clear()
+
+    def get(self, transaction_hash: str) -> Optional[tuple[int, int]]:
+        return self._locations.get(transaction_hash)
+
+class BlockIndex(BaseModel):
+    """
+    The BlockIndex class maps every block hash to its height in the chain.
+    """
+    _heights: dict = PrivateAttr(default_factory=dict)
+
+    def add_block(self, height: int, block: BlockWithAdditionalData) -> None:
+        self._heights[block.hash] = height
+
+    def remove_block(self, height: int, block: BlockWithAdditionalData) -> None:
+        if self._heights.get(block.hash) == height:
+            del self._heights[block.hash]
+
+    def clear(self) -> None:
+        self._heights.clear()
+
+    def get(self, block_hash: str) -> Optional[int]:
+        return self._heights.get(block_hash)
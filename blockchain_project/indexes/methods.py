@@ -0,0 +1,25 @@
+from typing import Optional, Union
+
+from blockchain_project.transactions import TransactionType, Transaction, TransactionWithAdditionalData
+
+def transaction_addresses(transaction: Union[Transaction, TransactionWithAdditionalData]) -> set[str]:
+    """
+    Get the wallet addresses involved in a transaction.
+    """
+    addresses = {transaction.content.sender}
+    if transaction.type == TransactionType.COIN_TRANSFER:
+        addresses.add(transaction.content.receiver)
+    # Add new transaction types here
+    return addresses
+
+def encode_cursor(location: tuple[int, int]) -> str:
+    """
+    Encode a (height, position) location as an opaque pagination cursor.
+    """
+    return f"{location[0]}:{location[1]}"
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[int, int]]:
+    if cursor is None:
+        return None
+    height, position = cursor.split(":")
+    return int(height), int(position)
@@ -0,0 +1,2 @@
+from .classes import UndoJournal
+from .methods import transaction_state_keys
\ No newline at end of file
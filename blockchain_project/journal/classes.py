@@ -0,0 +1,70 @@
+from typing import Optional, Union
+from pydantic import BaseModel, PrivateAttr
+
+from blockchain_project import Stake
+from blockchain_project.transactions import Transaction, TransactionWithAdditionalData
+from blockchain_project.vm.classes import SmartContract
+
+from .methods import transaction_state_keys
+
+class UndoJournal(BaseModel):
+    """
+    The UndoJournal class keeps the state entries a block changed, as they were before the block was applied,
+    so the block can be rolled back without replaying the chain. None means the entry did not exist.
+    The unconfirmed balances keep changing with the mempool after the block, so the amounts the block
+    took from them are journaled instead, and given back on undo.
+    """
+    height: int
+    hash: str # Hash of the journaled block
+    balances: dict[str, Optional[float]] = {}
+    stakes: dict[str, Optional[Stake]] = {}
+    deployed_smart_contracts: dict[str, Optional[SmartContract]] = {}
+    unconfirmed_balances: dict[str, float] = {} # Amounts taken from the unconfirmed balances by the block
+    _unconfirmed_balances_before: dict[str, Optional[float]] = PrivateAttr(default_factory=dict)
+
+    def record(self, state: dict[str, dict], transaction: Union[Transaction, TransactionWithAdditionalData]) -> None:
+        """
+        Save the entries of the state (mappings by name) that a transaction can change, before it is processed.
+        The first saved value of an entry is kept: it is the one from before the block.
+        """
+        for name, keys in transaction_state_keys(transaction).items():
+            journal = self._unconfirmed_balances_before if name == "unconfirmed_balances" else getattr(self, name)
+            mapping = state[name]
+            for key in keys:
+                if key not in journal:
+                    value = mapping.get(key)
+                    # Stakes and smart contracts are changed in place
+                    journal[key] = value.copy(deep=True) if isinstance(value, BaseModel) else value
+
+    def close(self, state: dict[str, dict]) -> None:
+        """
+        Compute the amounts taken from the unconfirmed balances, once the block is processed.
+        """
+        mapping = state["unconfirmed_balances"]
+        for key, before in self._unconfirmed_balances_before.items():
+            if before is not None and key in mapping and mapping[key] != before:
+                self.unconfirmed_balances[key] = before - mapping[key]
+        self._unconfirmed_balances_before = {}
+
+    def undo(self, state: dict[str, dict]) -> None:
+        """
+        Put the saved entries back in the state (mappings by name).
+        """
+        for name in ["balances", "stakes", "deployed_smart_contracts"]:
+            mapping = state[name]
+            for key, value in getattr(self, name).items():
+                if value is None:
+                    mapping.pop(key, None)
+                else:
+                    mapping[key] = value.copy(deep=True) if isinstance(value, BaseModel) else value
+
+        mapping = state["unconfirmed_balances"]
+        for key, amount in self.unconfirmed_balances.items():
+            if key in mapping:
+                mapping[key] += amount
+        # A block that was not closed (failed while processing) is rolled back to the values before it
+        for key, before in self._unconfirmed_balances_before.items():
+            if before is None:
+                mapping.pop(key, None)
+            else:
+                mapping[key] = before
@@ -0,0 +1,31 @@
+import hashlib
+from typing import Union
+
+from blockchain_project.transactions import TransactionType, Transaction, TransactionWithAdditionalData
+
+def transaction_state_keys(transaction: Union[Transaction, TransactionWithAdditionalData]) -> dict[str, set[str]]:
+    """
+    Get the state entries a transaction can change when it is processed, by state mapping
+    (balances, unconfirmed_balances, stakes and deployed_smart_contracts).
+    """
+    content = transaction.content
+    keys = {"balances": set(), "unconfirmed_balances": set(), "stakes": set(), "deployed_smart_contracts": set()}
+
+    if transaction.type == TransactionType.COIN_TRANSFER:
+        keys["balances"].update([content.sender, content.receiver])
+        keys["unconfirmed_balances"].add(content.sender)
+    elif transaction.type == TransactionType.STAKE_DEPOSIT:
+        keys["balances"].add(content.sender)
+        keys["unconfirmed_balances"].add(content.sender)
+        keys["stakes"].add(content.sender)
+    elif transaction.type == TransactionType.STAKE_WITHDRAW:
+        keys["balances"].add(content.sender)
+        keys["stakes"].add(content.sender)
+    elif transaction.type == TransactionType.SMART_CONTRACT_DEPLOY:
+        # The address of a contract is the hash of its code (see VM.deploy_contract)
+        keys["deployed_smart_contracts"].add(hashlib.sha256(content.contract_code.encode()).hexdigest())
+    elif transaction.type == TransactionType.SMART_CONTRACT_EXECUTION:
+        keys["deployed_smart_contracts"].add(content.contract_address)
+    # Add new transaction types here
+
+    return keys
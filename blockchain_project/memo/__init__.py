@@ -0,0 +1 @@
+from .classes import Memo, MemoizedModel
\ No newline at end of file
@@ -0,0 +1,143 @@
+import itertools
+import operator
+import weakref
+from typing import Any, Callable, ClassVar, Iterator
+from pydantic import BaseModel, PrivateAttr
+
+class Memo:
+    """
+    The Memo class holds the values memoized on a model (canonical encodings, hashes) and the number
+    of assignments of each of its fields, which tells when a memoized value is stale.
+    An assignment in a sub-model counts as an assignment of the field holding it in every linked parent,
+    so a stale value is detected without walking the sub-models.
+    """
+    __slots__ = ("serial", "versions", "values", "parents", "items", "__weakref__")
+    serials: ClassVar[Iterator[int]] = itertools.count() # Never reused, unlike the ids of collected objects
+
+    def __init__(self) -> None:
+        self.serial = next(Memo.serials)
+        self.versions: dict[str, int] = {}
+        self.values: dict[str, tuple[tuple, Any]] = {}
+        self.parents: dict[int, tuple[weakref.ref, str]] = {} # id -> memo of a parent model, field holding this one
+        # Items of the list fields when they were last linked, the references keep them from being collected
+        # (and their ids reused) until the lists are compared again
+        self.items: dict[str, tuple] = {}
+
+    def __reduce__(self):
+        # Copies and pickles of a model start with an empty memo (the links to the parents are not copied)
+        return (Memo, ())
+
+    def bump(self, field: str) -> None:
+        self.versions[field] = self.versions.get(field, 0) + 1
+        for key, (parent_ref, parent_field) in list(self.parents.items()):
+            parent = parent_ref()
+            if parent is None:
+                del self.parents[key]
+            else:
+                parent.bump(parent_field)
+
+    def link(self, parent: "Memo", field: str) -> None:
+        self.parents[id(parent)] = (weakref.ref(parent), field)
+
+    def version(self, exclude: frozenset = frozenset()) -> int:
+        # Versions only grow, so their sum changes on every assignment
+        return sum(version for field, version in self.versions.items() if field not in exclude)
+
+class MemoizedModel(BaseModel):
+    """
+    The MemoizedModel class is a model whose expensive derived values (canonical encodings and hashes)
+    are computed once and cached on the instance.
+    A cached value is recomputed after an assignment to a field of the model or of one of its sub-models
+    (including the models of its lists): the sub-models are linked to the model when it is built or when they
+    are assigned, so checking a cached value does not walk them. Only the items of the lists the value depends on
+    are compared by identity, an item added or removed in place counts as an assignment of the list (and the new
+    items are linked). Other in-place changes of plain containers are not tracked: assign a new value.
+    """
+    memoization_enabled: ClassVar[bool] = True # Disabled to measure the cost of the encodings
+    _memo: Memo = PrivateAttr(default_factory=Memo)
+
+    def __init__(__pydantic_self__, **data) -> None:
+        super().__init__(**data)
+        __pydantic_self__.link_children()
+
+    @classmethod
+    def construct(cls, _fields_set=None, **values):
+        model = super().construct(_fields_set, **values)
+        model.link_children()
+        return model
+
+    def __setstate__(self, state) -> None:
+        # Deep copies and unpickled models, their sub-models are restored (and linked to theirs) first
+        super().__setstate__(state)
+        self.link_children()
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__fields__:
+            self._memo.bump(name)
+            self.link_child(name, self.__dict__.get(name))
+
+    def __delattr__(self, name):
+        super().__delattr__(name)
+        if name in self.__fields__:
+            self._memo.bump(name)
+
+    def _copy_and_set_values(self, values, fields_set, *, deep):
+        model = super()._copy_and_set_values(values, fields_set, deep=deep)
+        # Shallow copies made by the validation share the fields (and then the memo) of the original,
+        # other copies may have different values
+        if values is not self.__dict__:
+            object.__setattr__(model, "_memo", Memo())
+            model.link_children()
+        return model
+
+    def link_child(self, name: str, value: Any) -> None:
+        for child in value if isinstance(value, list) else [value]:
+            if isinstance(child, MemoizedModel):
+                child._memo.link(self._memo, name)
+
+    def link_children(self) -> None:
+        """
+        Link the sub-models to this model, so their assignments reach its memo (they linked theirs when built).
+        """
+        for name, value in self.__dict__.items():
+            self.link_child(name, value)
+
+    def refresh_items(self, exclude: frozenset = frozenset()) -> None:
+        """
+        Count the in-place changes of the list fields (not excluded) as assignments, linking their new items.
+        """
+        memo = self._memo
+        for name, value in self.__dict__.items():
+            if type(value) is not list or name in exclude:
+                continue
+            items = memo.items.get(name)
+            if items is None or len(items) != len(value) or not all(map(operator.is_, items, value)):
+                if items is not None:
+                    memo.bump(name)
+                memo.items[name] = tuple(value)
+                self.link_child(name, value)
+
+    def memo_stamp(self, exclude: frozenset = frozenset()) -> tuple:
+        """
+        The state of the model and its sub-models that the memoized values depend on.
+        """
+        self.refresh_items(exclude)
+        return (self._memo.serial, self._memo.version(exclude))
+
+    def memoize(self, key: str, compute: Callable[[], Any], exclude: frozenset = frozenset()) -> Any:
+        """
+        Returns the value cached under key, or computes and caches it.
+        exclude holds the fields the value does not depend on (e.g. the hash field for the hash itself).
+        """
+        if not self.memoization_enabled:
+            return compute()
+
+        stamp = self.memo_stamp(exclude)
+        cached = self._memo.values.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        value = compute()
+        self._memo.values[key] = (stamp, value)
+        return value
@@ -0,0 +1,2 @@
+from .classes import Mempool, MempoolFullError
+from .methods import transaction_size
\ No newline at end of file
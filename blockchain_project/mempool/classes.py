@@ -0,0 +1,222 @@
+from collections import OrderedDict
+import heapq
+import itertools
+import time
+from typing import Iterable, Iterator, Optional, Union
+
+from blockchain_project.transactions import TransactionWithAdditionalData
+
+from .methods import transaction_size
+
+class MempoolFullError(Exception):
+    """
+    The MempoolFullError exception is raised when a new transaction does not fit in the full mempool,
+    the client can retry later.
+    """
+
+class Mempool:
+    """
+    The Mempool class holds the unconfirmed transactions keyed by hash, in insertion order.
+    Membership checks and removals (by hash or uuid) are O(1) and the pool is bounded by max_size (transactions)
+    and max_bytes (serialized size).
+    Transactions are prioritized by age on this node: the earlier the node received them (then the earlier
+    the arrival), the higher the priority. The timestamp of a transaction is set by its client, it is not used.
+    When the pool is full the lowest priority transactions are evicted to make room for older ones (transactions
+    given back by a reorganization keep the time they were received or mined), new arrivals are rejected.
+    It can be used as a pydantic field: it is validated from (and serialized to) a list of transactions.
+    """
+    def __init__(self,
+                 transactions: Iterable[TransactionWithAdditionalData] = (),
+                 max_size: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.max_size = max_size # None means unbounded
+        self.max_bytes = max_bytes # None means unbounded
+        self.total_bytes = 0
+        self._transactions: OrderedDict[str, TransactionWithAdditionalData] = OrderedDict()
+        self._hashes_by_uuid: dict[str, str] = {}
+        self._sizes: dict[str, int] = {}
+        self._sequences: dict[str, int] = {}
+        self._received: dict[str, int] = {} # Hash -> time the node received the transaction
+        self._counter = itertools.count()
+        # Max-heap (lowest priority first) of the eviction candidates, stale entries are skipped lazily
+        self._eviction_heap: list[tuple[int, int, str]] = []
+
+        for transaction in transactions:
+            self.add(transaction)
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __iter__(self) -> Iterator[TransactionWithAdditionalData]:
+        # Iterate over a copy, the mempool can change while a block is being built
+        return iter(list(self._transactions.values()))
+
+    def __contains__(self, transaction_hash: str) -> bool:
+        return transaction_hash in self._transactions
+
+    def __repr__(self) -> str:
+        return f"Mempool({list(self._transactions.values())!r})"
+
+    def priority(self, transaction_hash: str) -> tuple[int, int]:
+        """
+        The priority of a transaction in the mempool, lower values are mined first.
+        """
+        return (self._received[transaction_hash], self._sequences[transaction_hash])
+
+    def received(self, transaction_hash: str) -> Optional[int]:
+        """
+        The time the node received a transaction of the mempool.
+        """
+        return self._received.get(transaction_hash)
+
+    def fits(self, size: int, count: int = 1) -> bool:
+        return (self.max_size is None or len(self._transactions) + count <= self.max_size) and \
+               (self.max_bytes is None or self.total_bytes + size <= self.max_bytes)
+
+    def is_full(self) -> bool:
+        return not self.fits(0)
+
+    def add(self, transaction: TransactionWithAdditionalData, size: Optional[int] = None, received: Optional[int] = None) -> bool:
+        """
+        Add a transaction, it is rejected if it is already in the mempool or if there is no room for it
+        (see make_room to evict lower priority transactions first). received defaults to now.
+
+        Returns:
+        - bool: True if the transaction was added.
+        """
+        if transaction.hash in self._transactions or transaction.uuid in self._hashes_by_uuid:
+            return False
+
+        size = transaction_size(transaction) if size is None else size
+        if not self.fits(size):
+            return False
+
+        sequence = next(self._counter)
+        received = int(time.time()) if received is None else received
+        self._transactions[transaction.hash] = transaction
+        self._hashes_by_uuid[transaction.uuid] = transaction.hash
+        self._sizes[transaction.hash] = size
+        self._sequences[transaction.hash] = sequence
+        self._received[transaction.hash] = received
+        self.total_bytes += size
+        heapq.heappush(self._eviction_heap, (-received, -sequence, transaction.hash))
+        return True
+
+    def make_room(self, transaction: TransactionWithAdditionalData, size: Optional[int] = None,
+                  received: Optional[int] = None) -> Optional[list[TransactionWithAdditionalData]]:
+        """
+        Evict the lowest priority transactions until the given one, received at received (default now),
+        fits in the mempool. Only transactions with a lower priority than the new one are evicted.
+
+        Returns:
+        - Optional[list[TransactionWithAdditionalData]]: The evicted transactions (the caller has to revert their effects),
+          or None if there is no way to make room (nothing is evicted then).
+        """
+        size = transaction_size(transaction) if size is None else size
+        if self.max_bytes is not None and size > self.max_bytes:
+            return None
+
+        # The new transaction would be the newest arrival
+        new_priority = (int(time.time()) if received is None else received, float("inf"))
+        candidates, freed_count, freed_bytes = [], 0, 0
+
+        while not self.fits(size - freed_bytes, 1 - freed_count):
+            entry = self._pop_eviction_candidate()
+            if entry is None or (-entry[0], -entry[1]) < new_priority:
+                # Not enough lower priority transactions, put the candidates back
+                if entry is not None:
+                    heapq.heappush(self._eviction_heap, entry)
+                for candidate in candidates:
+                    heapq.heappush(self._eviction_heap, candidate)
+                return None
+            candidates.append(entry)
+            freed_count += 1
+            freed_bytes += self._sizes[entry[2]]
+
+        return [self.remove(candidate[2]) for candidate in candidates]
+
+    def _pop_eviction_candidate(self) -> Optional[tuple[int, int, str]]:
+        while self._eviction_heap:
+            entry = heapq.heappop(self._eviction_heap)
+            if self._sequences.get(entry[2]) == -entry[1]:
+                return entry
+        return None
+
+    def select(self, max_count: Optional[int] = None, max_bytes: Optional[int] = None) -> list[TransactionWithAdditionalData]:
+        """
+        Build a block template: the highest priority transactions that fit in the count and byte budgets.
+        Transactions that do not fit in the remaining bytes are skipped in favour of smaller ones.
+        """
+        selected, used_bytes = [], 0
+        for transaction_hash in sorted(self._transactions, key=self.priority):
+            if max_count is not None and len(selected) >= max_count:
+                break
+            size = self._sizes[transaction_hash]
+            if max_bytes is not None and used_bytes + size > max_bytes:
+                continue
+            selected.append(self._transactions[transaction_hash])
+            used_bytes += size
+        return selected
+
+    def get(self, transaction_hash: str) -> Optional[TransactionWithAdditionalData]:
+        return self._transactions.get(transaction_hash)
+
+    def get_by_uuid(self, transaction_uuid: str) -> Optional[TransactionWithAdditionalData]:
+        transaction_hash = self._hashes_by_uuid.get(transaction_uuid)
+        return None if transaction_hash is None else self._transactions.get(transaction_hash)
+
+    def remove(self, transaction_hash: str) -> Optional[TransactionWithAdditionalData]:
+        """
+        Remove a transaction by its hash, returning it (or None if it was not in the mempool).
+        """
+        transaction = self._transactions.pop(transaction_hash, None)
+        if transaction is not None:
+            self._hashes_by_uuid.pop(transaction.uuid, None)
+            self.total_bytes -= self._sizes.pop(transaction_hash)
+            del self._sequences[transaction_hash]
+            del self._received[transaction_hash]
+            # The heap entry is left behind and skipped later, compact the heap when it gets too stale
+            if len(self._eviction_heap) > 2 * len(self._transactions) + 64:
+                self._rebuild_eviction_heap()
+        return transaction
+
+    def remove_by_uuid(self, transaction_uuid: str) -> Optional[TransactionWithAdditionalData]:
+        transaction_hash = self._hashes_by_uuid.get(transaction_uuid)
+        return None if transaction_hash is None else self.remove(transaction_hash)
+
+    def _rebuild_eviction_heap(self) -> None:
+        self._eviction_heap = [(-self._received[transaction_hash], -self._sequences[transaction_hash], transaction_hash)
+                               for transaction_hash in self._transactions]
+        heapq.heapify(self._eviction_heap)
+
+    def clear(self) -> None:
+        self._transactions.clear()
+        self._hashes_by_uuid.clear()
+        self._sizes.clear()
+        self._sequences.clear()
+        self._received.clear()
+        self._eviction_heap.clear()
+        self.total_bytes = 0
+
+    def to_list(self) -> list[dict]:
+        """
+        Serialize the transactions (used as the JSON encoder of the pydantic field).
+        """
+        return [transaction.dict() for transaction in self._transactions.values()]
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: Union["Mempool", Iterable]) -> "Mempool":
+        if isinstance(value, Mempool):
+            return value
+        if isinstance(value, (str, bytes, dict)):
+            raise TypeError("The mempool must be a list of transactions")
+        return cls(transaction if isinstance(transaction, TransactionWithAdditionalData)
+                   else TransactionWithAdditionalData(**transaction) for transaction in value)
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: dict) -> None:
+        field_schema.update(type="array", items=TransactionWithAdditionalData.schema())
@@ -0,0 +1,7 @@
+from blockchain_project.transactions import TransactionWithAdditionalData
+
+def transaction_size(transaction: TransactionWithAdditionalData) -> int:
+    """
+    The size in bytes of a transaction, as it is serialized in a block.
+    """
+    return len(transaction.json().encode())
@@ -0,0 +1,2 @@
+from .classes import PeerResult, SeenCache, RelayQueue, PeerClient, peer_client
+from .methods import NODE_ID_HEADER, fan_out
\ No newline at end of file
@@ -0,0 +1,187 @@
+import asyncio
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+from pydantic import BaseModel
+import httpx
+
+try:
+    import h2 # HTTP/2 support of httpx, optional
+except ImportError:
+    h2 = None
+
+class PeerResult(BaseModel):
+    """
+    The PeerResult class is the outcome of a request to one peer during a fan-out (see fan_out).
+    """
+    node_url: str
+    ok: bool
+    status_code: Optional[int] = None # HTTP status of the answer, None if the peer did not answer
+    error: Optional[str] = None # Why the request failed (error or timeout)
+    elapsed: float # Seconds until the answer, the error or the timeout
+    value: Any = None # What the request returned
+
+class SeenCache:
+    """
+    The SeenCache class remembers the hashes of the transactions and blocks the node has already seen
+    (bounded by max_size and kept for ttl seconds), so gossip does not admit or relay them again,
+    even once they left the mempool.
+    """
+    def __init__(self, max_size: int = 100000, ttl: float = 600.0):
+        self.max_size = max_size # 0 disables the cache
+        self.ttl = ttl # Seconds a hash is remembered (0 means until it is pushed out by max_size)
+        self._expiries: OrderedDict[str, float] = OrderedDict() # Hash -> expiry, in insertion (and expiry) order
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def __contains__(self, hash: str) -> bool:
+        with self._lock:
+            self.purge()
+            return hash in self._expiries
+
+    def add(self, hash: str) -> bool:
+        """
+        Remember a hash, it returns False if it was already seen.
+        """
+        with self._lock:
+            self.purge()
+            if hash in self._expiries:
+                return False
+            if self.max_size <= 0:
+                return True
+            self._expiries[hash] = time.monotonic() + self.ttl if self.ttl > 0 else float("inf")
+            while len(self._expiries) > self.max_size:
+                self._expiries.popitem(last=False)
+            return True
+
+    def discard(self, hash: str) -> None:
+        """
+        Forget a hash (a block rolled back must be accepted again if it is announced).
+        """
+        with self._lock:
+            self._expiries.pop(hash, None)
+
+    def purge(self) -> None:
+        # The hashes are kept in expiry order, the expired ones are at the start
+        now = time.monotonic()
+        while self._expiries and next(iter(self._expiries.values())) <= now:
+            self._expiries.popitem(last=False)
+
+    def configure(self, max_size: int, ttl: float) -> None:
+        with self._lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            while len(self._expiries) > max(max_size, 0):
+                self._expiries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expiries.clear()
+
+class RelayQueue:
+    """
+    The RelayQueue class holds the messages waiting to be relayed to one peer. They are coalesced for window seconds
+    after the first one, or until max_size of them are waiting, and sent together by send (a coroutine function
+    taking the list of messages), so a busy node makes one request per peer and batch instead of one per message.
+    """
+    def __init__(self, send: Callable[[list], Awaitable[Any]], window: float = 0.05, max_size: int = 500):
+        self.send = send
+        self.window = window
+        self.max_size = max_size
+        self._items: list = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: Any) -> None:
+        """
+        Queue a message, it must be called from the event loop.
+        """
+        self._items.append(item)
+        if len(self._items) >= self.max_size:
+            self.flush_soon()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush_soon)
+
+    def flush_soon(self) -> None:
+        """
+        Send the waiting messages in the background, max_size at a time.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        items, self._items = self._items, []
+        for start in range(0, len(items), max(1, self.max_size)):
+            task = asyncio.create_task(self.send(items[start:start + max(1, self.max_size)]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """
+        Send the waiting messages and wait for all the batches in flight.
+        """
+        self.flush_soon()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+class PeerClient:
+    """
+    The PeerClient class is the HTTP client pool shared by all the requests of the node to its peers,
+    so their connections are kept alive and reused instead of being opened for every message.
+    HTTP/2 is negotiated with the peers served over TLS when the h2 package is installed.
+    The pool is opened by start and closed by close (startup and shutdown of the API), or on first use.
+    """
+    def __init__(self,
+                 max_connections: int = 100,
+                 max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0,
+                 http2: bool = True):
+        self.max_connections = max_connections # 0 means unbounded
+        self.max_keepalive_connections = max_keepalive_connections # Idle connections kept open (0 means unbounded)
+        self.keepalive_expiry = keepalive_expiry # Seconds an idle connection is kept open
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(self, max_connections: int, max_keepalive_connections: int, keepalive_expiry: float, http2: bool) -> None:
+        """
+        Change the settings of the pool, they apply to the next opened pool.
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+
+    def create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.max_connections or None,
+                              max_keepalive_connections=self.max_keepalive_connections or None,
+                              keepalive_expiry=self.keepalive_expiry)
+        return httpx.AsyncClient(limits=limits, http2=self.http2 and h2 is not None)
+
+    def get(self) -> httpx.AsyncClient:
+        """
+        Get the client of the pool, it is opened if needed. Connections belong to an event loop,
+        a pool opened in another loop (closed since) is replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = self.create_client()
+            self._loop = loop
+        return self._client
+
+    async def start(self) -> None:
+        self.get()
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+peer_client = PeerClient()
@@ -0,0 +1,46 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from .classes import PeerResult
+
+# Header carrying the id of the node sending a message, so it is not relayed back to it
+NODE_ID_HEADER = "X-Node-Id"
+
+async def request_peer(node_url: str, request: Callable[[str], Awaitable[Any]], semaphore: asyncio.Semaphore,
+                       timeout: float) -> PeerResult:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(request(node_url), timeout=timeout or None)
+        except asyncio.TimeoutError:
+            return PeerResult(node_url=node_url, ok=False, error=f"Timed out after {timeout}s",
+                              elapsed=time.perf_counter() - start)
+        except Exception as e:
+            return PeerResult(node_url=node_url, ok=False, error=str(e) or type(e).__name__,
+                              elapsed=time.perf_counter() - start)
+
+    # An HTTP answer is a success when its status is not an error
+    status_code = value.status_code if isinstance(value, httpx.Response) else None
+    return PeerResult(node_url=node_url, ok=status_code is None or status_code < 400, status_code=status_code,
+                      elapsed=time.perf_counter() - start, value=value)
+
+async def fan_out(node_urls: list[str], request: Callable[[str], Awaitable[Any]], max_concurrency: int = 16,
+                  timeout: float = 5.0) -> list[PeerResult]:
+    """
+    Run a request against every peer concurrently, at most max_concurrency of them at a time and each within
+    timeout seconds (0 means no timeout). A failing or slow peer only fails its own request.
+
+    Args:
+    - node_urls (list[str]): The peers.
+    - request (Callable): Coroutine function doing the request for a peer url.
+    - max_concurrency (int): Requests in flight at the same time (0 means all of them).
+    - timeout (float): Seconds given to each peer.
+
+    Returns:
+    - list[PeerResult]: The result of every peer, in the order of node_urls.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or max(1, len(node_urls)))
+    return await asyncio.gather(*[request_peer(node_url, request, semaphore, timeout) for node_url in node_urls])
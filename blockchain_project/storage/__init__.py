@@ -0,0 +1 @@
+from .classes import BlockLog, BlockStore, StoredChain, StateSnapshot, SnapshotStore
\ No newline at end of file
@@ -0,0 +1,466 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Callable, Iterator, Optional
+from pydantic import BaseModel, PrivateAttr
+
+from blockchain_project import BlockWithAdditionalData, Stake
+from blockchain_project.vm import SmartContract
+from blockchain_project.codec import dump_block, load_block
+
+from .methods import RECORD_HEADER, read_record
+
+SEGMENT_MAGIC = b"BLKLOG01"
+INDEX_ENTRY = struct.Struct("<IQI") # Segment, record offset, payload length (one entry per height)
+INDEX_FILE_NAME = "index.bin"
+SNAPSHOT_FILE_SUFFIX = ".snapshot.json"
+
+class BlockLog(BaseModel):
+    """
+    The BlockLog class is an append-only, segmented log of blocks.
+    Every block is stored once as a length-prefixed record with a CRC32 checksum,
+    so saving the chain only writes the blocks that are not on disk yet.
+    A fixed-width index (index.bin) maps each height to the location of its record.
+    """
+    directory: str
+    segment_size: int = 64 * 1024 * 1024 # Max bytes per segment file before rolling
+    encoding: str = "json" # Encoding of the new records: "json" or "binary" (both can be read)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE_NAME)
+
+    @property
+    def height(self) -> int:
+        """
+        Number of blocks persisted in the log.
+        """
+        if not os.path.exists(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path) // INDEX_ENTRY.size
+
+    def exists(self) -> bool:
+        """
+        Check if the log has at least one segment on disk.
+        """
+        return len(self.list_segments()) > 0
+
+    def is_consistent(self) -> bool:
+        """
+        Check if the index describes exactly the records on disk (e.g. no crash between a record and its index entry).
+        """
+        segments = self.list_segments()
+        if not os.path.exists(self.index_path):
+            return not segments
+        if os.path.getsize(self.index_path) % INDEX_ENTRY.size != 0:
+            return False
+        if self.height == 0:
+            return not segments
+
+        segment, offset, length = self.position(self.height - 1)
+        return segment == segments[-1] and \
+               offset + RECORD_HEADER.size + length == os.path.getsize(self.segment_path(segment))
+
+    def list_segments(self) -> list[int]:
+        """
+        List the segment numbers on disk, sorted.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".log"))
+
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}.log")
+
+    def position(self, height: int) -> tuple[int, int, int]:
+        """
+        Get the (segment, offset, length) of the record of a block from the index.
+        """
+        with open(self.index_path, "rb") as index_file:
+            index_file.seek(height * INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(index_file.read(INDEX_ENTRY.size))
+
+    def read(self, height: int) -> BlockWithAdditionalData:
+        """
+        Read a single block from the log.
+        """
+        segment, offset, length = self.position(height)
+        with open(self.segment_path(segment), "rb") as segment_file:
+            segment_file.seek(offset + RECORD_HEADER.size)
+            return load_block(segment_file.read(length))
+
+    def replay(self) -> Iterator[BlockWithAdditionalData]:
+        """
+        Read every block of the log in order, verifying the checksum of each record, and rebuild the index.
+        A torn or corrupted record ends the replay and the log is truncated right before it.
+        """
+        entries = []
+
+        try:
+            for segment in self.list_segments():
+                with open(self.segment_path(segment), "rb") as segment_file:
+                    data = segment_file.read()
+
+                if data[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                    print(f"Invalid block log segment {segment}, discarding from here")
+                    self.truncate_at(segment, 0)
+                    return
+
+                offset = len(SEGMENT_MAGIC)
+                while offset < len(data):
+                    payload = read_record(data, offset)
+                    if payload is None:
+                        print(f"Corrupted record in block log segment {segment} at offset {offset}, truncating")
+                        self.truncate_at(segment, offset)
+                        return
+
+                    entries.append(INDEX_ENTRY.pack(segment, offset, len(payload)))
+                    offset += RECORD_HEADER.size + len(payload)
+                    yield load_block(payload)
+        finally:
+            self.write_index(entries)
+
+    def write_index(self, entries: list[bytes]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.index_path, "wb") as index_file:
+            index_file.write(b"".join(entries))
+            index_file.flush()
+            os.fsync(index_file.fileno())
+
+    def append(self, blocks: list[BlockWithAdditionalData]) -> None:
+        """
+        Append blocks at the end of the log and flush them to disk.
+        Records are synced before their index entries, so a crash never indexes a missing record.
+        """
+        if not blocks:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self.list_segments()
+        segment = segments[-1] if segments else 0
+        segment_file = self.open_segment(segment)
+        entries = []
+
+        try:
+            for block in blocks:
+                if segment_file.tell() >= self.segment_size and segment_file.tell() > len(SEGMENT_MAGIC):
+                    self.close_segment(segment_file)
+                    segment += 1
+                    segment_file = self.open_segment(segment)
+
+                payload = dump_block(block, self.encoding)
+                entries.append(INDEX_ENTRY.pack(segment, segment_file.tell(), len(payload)))
+                segment_file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+                segment_file.write(payload)
+        finally:
+            self.close_segment(segment_file)
+
+        with open(self.index_path, "ab") as index_file:
+            index_file.write(b"".join(entries))
+            self.close_segment(index_file)
+
+    def open_segment(self, segment: int):
+        segment_file = open(self.segment_path(segment), "ab")
+        if segment_file.tell() == 0:
+            segment_file.write(SEGMENT_MAGIC)
+        return segment_file
+
+    @staticmethod
+    def close_segment(segment_file) -> None:
+        segment_file.flush()
+        os.fsync(segment_file.fileno())
+        segment_file.close()
+
+    def truncate(self, height: int) -> None:
+        """
+        Drop every block at or above the given height.
+        """
+        if height >= self.height:
+            return
+
+        segment, offset, _ = self.position(height)
+        with open(self.index_path, "r+b") as index_file:
+            index_file.truncate(height * INDEX_ENTRY.size)
+        self.truncate_at(segment, offset)
+
+    def truncate_at(self, segment: int, offset: int) -> None:
+        """
+        Cut the log at a byte position, removing the segments after it.
+        """
+        for later_segment in self.list_segments():
+            if later_segment > segment:
+                os.remove(self.segment_path(later_segment))
+
+        if offset <= len(SEGMENT_MAGIC):
+            os.remove(self.segment_path(segment))
+        else:
+            with open(self.segment_path(segment), "r+b") as segment_file:
+                segment_file.truncate(offset)
+
+    def sync(self, chain: list[BlockWithAdditionalData]) -> int:
+        """
+        Make the log match the chain, writing only what changed: blocks that are no longer
+        part of the chain (e.g. after a chain replacement) are truncated and new ones appended.
+        Returns the number of appended blocks.
+        """
+        common = min(self.height, len(chain))
+        while common > 0 and chain[common - 1].hash != self.read(common - 1).hash:
+            common -= 1
+
+        self.truncate(common)
+        new_blocks = chain[common:]
+        self.append(new_blocks)
+        return len(new_blocks)
+
+class BlockStore(BaseModel):
+    """
+    The BlockStore class serves blocks of a BlockLog by height through memory-mapped segments and index,
+    parsing only the requested records and keeping a bounded LRU of decoded blocks.
+    """
+    directory: str
+    cache_size: int = 1024 # Max decoded blocks kept in memory
+
+    _index: Optional[mmap.mmap] = PrivateAttr(default=None)
+    _segments: dict = PrivateAttr(default_factory=dict)
+    _cache: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def height(self) -> int:
+        index_path = os.path.join(self.directory, INDEX_FILE_NAME)
+        if not os.path.exists(index_path):
+            return 0
+        return os.path.getsize(index_path) // INDEX_ENTRY.size
+
+    def get(self, height: int) -> BlockWithAdditionalData:
+        """
+        Get the block at a given height.
+        """
+        with self._lock:
+            block = self._cache.get(height)
+            if block is not None:
+                self._cache.move_to_end(height)
+                return block
+
+            segment, offset, length = INDEX_ENTRY.unpack_from(self.map_index(height), height * INDEX_ENTRY.size)
+            payload = read_record(self.map_segment(segment, offset + RECORD_HEADER.size + length), offset)
+            if payload is None:
+                raise ValueError(f"Corrupted block record at height {height}")
+
+            block = load_block(payload)
+            self._cache[height] = block
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return block
+
+    def get_range(self, start: int, end: int) -> list[BlockWithAdditionalData]:
+        """
+        Get the blocks in [start, end).
+        """
+        return [self.get(height) for height in range(max(start, 0), min(end, self.height))]
+
+    def map_index(self, height: int) -> mmap.mmap:
+        needed = (height + 1) * INDEX_ENTRY.size
+        if self._index is None or len(self._index) < needed:
+            self._index = self.map_file(os.path.join(self.directory, INDEX_FILE_NAME), needed, self._index)
+        return self._index
+
+    def map_segment(self, segment: int, needed: int) -> mmap.mmap:
+        current = self._segments.get(segment)
+        if current is None or len(current) < needed:
+            path = os.path.join(self.directory, f"{segment:08d}.log")
+            self._segments[segment] = self.map_file(path, needed, current)
+        return self._segments[segment]
+
+    @staticmethod
+    def map_file(path: str, needed: int, current: Optional[mmap.mmap]) -> mmap.mmap:
+        """
+        (Re)map a file that grew since it was last mapped.
+        """
+        if current is not None:
+            current.close()
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < needed:
+            mapped.close()
+            raise IndexError(f"{path} is shorter than expected")
+        return mapped
+
+    def reset(self) -> None:
+        """
+        Drop every mapping and cached block. Must be called before the underlying log is truncated.
+        """
+        with self._lock:
+            for mapped in self._segments.values():
+                mapped.close()
+            if self._index is not None:
+                self._index.close()
+            self._index, self._segments = None, {}
+            self._cache.clear()
+
+class StoredChain(Sequence):
+    """
+    The StoredChain class is a chain whose persisted blocks live in a BlockStore instead of memory.
+    Blocks appended since the last flush are kept in memory until they are written to the BlockLog.
+    The chain can start shorter than the log (height), e.g. to replay the blocks after a snapshot.
+    The in-memory blocks are guarded by lock and the files by write_lock, so the blocks can be written
+    from another thread while the chain keeps changing (see begin_flush).
+    """
+    def __init__(self, block_log: BlockLog, block_store: BlockStore, height: Optional[int] = None):
+        self.block_log = block_log
+        self.block_store = block_store
+        self.persisted = block_log.height if height is None else height
+        self.tail: list[BlockWithAdditionalData] = []
+        self.lock = threading.RLock()
+        self.write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.persisted + len(self.tail)
+
+    def __getitem__(self, key):
+        with self.lock:
+            if isinstance(key, slice):
+                return [self[height] for height in range(*key.indices(len(self)))]
+
+            height = key + len(self) if key < 0 else key
+            if height < 0 or height >= len(self):
+                raise IndexError("chain index out of range")
+            if height >= self.persisted:
+                return self.tail[height - self.persisted]
+            return self.block_store.get(height)
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self[height]
+
+    def __delitem__(self, key) -> None:
+        if not isinstance(key, slice) or key.stop is not None or key.step is not None:
+            raise TypeError("only `del chain[height:]` is supported")
+        self.truncate(key.indices(len(self))[0])
+
+    def append(self, block: BlockWithAdditionalData) -> None:
+        with self.lock:
+            self.tail.append(block)
+
+    def truncate(self, height: int) -> None:
+        """
+        Drop every block at or above the given height, from memory and from disk.
+        """
+        with self.lock:
+            if height < self.persisted:
+                with self.write_lock:
+                    self.block_store.reset()
+                    self.block_log.truncate(height)
+                self.persisted, self.tail = height, []
+            else:
+                del self.tail[height - self.persisted:]
+
+    def flush(self) -> int:
+        """
+        Write the in-memory blocks to the log and release them. Returns the number of written blocks.
+        """
+        persisted, blocks = self.begin_flush()
+        written = self.write_blocks(persisted, blocks)
+        self.end_flush(persisted, blocks)
+        return written
+
+    def begin_flush(self) -> tuple[int, list[BlockWithAdditionalData]]:
+        """
+        Capture the height and the in-memory blocks to write. Only write_blocks does file I/O, it can run in
+        another thread, then end_flush releases the blocks that are still the ones of the chain.
+        """
+        with self.lock:
+            return self.persisted, list(self.tail)
+
+    def write_blocks(self, persisted: int, blocks: list[BlockWithAdditionalData]) -> int:
+        with self.write_lock:
+            # Blocks already in the log past the persisted height (e.g. replayed at startup) are kept if they match
+            on_disk = self.block_log.height
+            matching = 0
+            while matching < len(blocks) and persisted + matching < on_disk and \
+                  self.block_log.read(persisted + matching).hash == blocks[matching].hash:
+                matching += 1
+
+            if persisted + matching < on_disk:
+                self.block_store.reset()
+                self.block_log.truncate(persisted + matching)
+            self.block_log.append(blocks[matching:])
+            return len(blocks) - matching
+
+    def end_flush(self, persisted: int, blocks: list[BlockWithAdditionalData]) -> None:
+        with self.lock:
+            # Blocks rolled back meanwhile stay in memory, the next flush makes the log match them
+            if self.persisted == persisted and len(self.tail) >= len(blocks) and \
+               all(written is current for written, current in zip(blocks, self.tail)):
+                self.tail = self.tail[len(blocks):]
+                self.persisted += len(blocks)
+
+class StateSnapshot(BaseModel):
+    """
+    The StateSnapshot class is the state of the blockchain right after applying the block at height,
+    so a node can start from it and only replay the blocks that come after.
+    The unconfirmed balances are left out, they belong to the mempool, which is not persisted, and so are the
+    indexes, which grow with the history and are rebuilt from the block log.
+    """
+    height: int
+    hash: str # Hash of the block at height
+    balances: dict[str, float]
+    stakes: dict[str, Stake]
+    deployed_smart_contracts: dict[str, SmartContract]
+
+class SnapshotStore(BaseModel):
+    """
+    The SnapshotStore class keeps the latest state snapshots of a node, one JSON file per snapshot.
+    """
+    directory: str
+    keep: int = 3 # Number of snapshots kept on disk
+
+    def snapshot_path(self, height: int) -> str:
+        return os.path.join(self.directory, f"{height:012d}{SNAPSHOT_FILE_SUFFIX}")
+
+    def list_heights(self) -> list[int]:
+        """
+        List the heights of the snapshots on disk, sorted.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(name[:-len(SNAPSHOT_FILE_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(SNAPSHOT_FILE_SUFFIX))
+
+    def load(self, height: int) -> StateSnapshot:
+        return StateSnapshot.parse_file(self.snapshot_path(height))
+
+    def save(self, snapshot: StateSnapshot) -> None:
+        """
+        Write a snapshot atomically and prune the oldest ones.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.snapshot_path(snapshot.height)
+        with open(path + ".tmp", "w") as snapshot_file:
+            snapshot_file.write(snapshot.json())
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(path + ".tmp", path)
+
+        for height in self.list_heights()[:-self.keep]:
+            os.remove(self.snapshot_path(height))
+
+    def latest(self, is_valid: Callable[[StateSnapshot], bool]) -> Optional[StateSnapshot]:
+        """
+        Get the most recent readable snapshot accepted by is_valid (e.g. still matching the chain on disk).
+        """
+        for height in reversed(self.list_heights()):
+            try:
+                snapshot = self.load(height)
+            except Exception as e:
+                print(f"Error occurred loading the snapshot at height {height}: {e}")
+                continue
+
+            if is_valid(snapshot):
+                return snapshot
+        return None
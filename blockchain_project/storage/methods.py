@@ -0,0 +1,20 @@
+import struct
+import zlib
+from typing import Optional
+
+RECORD_HEADER = struct.Struct("<II") # Payload length, CRC32 of the payload
+
+def read_record(data, offset: int) -> Optional[bytes]:
+    """
+    Read the record payload at the given offset, or None if it is incomplete or its checksum does not match.
+    """
+    if offset + RECORD_HEADER.size > len(data):
+        return None
+
+    length, checksum = RECORD_HEADER.unpack_from(data, offset)
+    start = offset + RECORD_HEADER.size
+    payload = bytes(data[start:start + length])
+
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        return None
+    return payload
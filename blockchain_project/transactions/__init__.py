@@ -1,2 +1,3 @@
 from .classes import TransactionType, Transaction, TransactionWithAdditionalData, \
-                     StakeTransaction
\ No newline at end of file
+                     StakeTransaction, TransactionStatus, TransactionReceipt, \
+                     get_signature_message
\ No newline at end of file
@@ -1,15 +1,14 @@
 from enum import Enum
 import hashlib
-import json
 import uuid
 import pytz
 from datetime import datetime
 
-import ecdsa
-import binascii
-
 from typing import Optional, Union
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
+
+from blockchain_project.crypto import signature_message, signature_cache
+from blockchain_project.memo import MemoizedModel
 
 class TransactionType(int, Enum):
     """
@@ -21,7 +20,13 @@ class TransactionType(int, Enum):
     SMART_CONTRACT_DEPLOY = 3
     SMART_CONTRACT_EXECUTION = 4
 
-class CoinTransferTransaction(BaseModel):
+# Types whose signature is verified (stake deposits are not signed)
+SIGNED_TRANSACTION_TYPES = frozenset({TransactionType.COIN_TRANSFER,
+                                      TransactionType.STAKE_WITHDRAW,
+                                      TransactionType.SMART_CONTRACT_DEPLOY,
+                                      TransactionType.SMART_CONTRACT_EXECUTION})
+
+class CoinTransferTransaction(MemoizedModel):
     """
     The CoinTransferTransaction class is a transaction that contains the sender, receiver and amount of coins.
     """
@@ -29,33 +34,42 @@ class CoinTransferTransaction(BaseModel):
     receiver: str
     amount: float
 
-class StakeTransaction(BaseModel):
+class StakeTransaction(MemoizedModel):
     sender: str
     node_url: str # Backed up node for the stake
     amount: float
 
-class SmartContractDeploymentTransaction(BaseModel):
+class SmartContractDeploymentTransaction(MemoizedModel):
     sender: str
     contract_code: str
 
-class SmartContractTransaction(BaseModel):
+class SmartContractTransaction(MemoizedModel):
     sender: str
     contract_address: str
     function_signature: str
     args: Optional[list] = []
     kwargs: Optional[dict] = {}
 
+# Fields the memoized hashes do not depend on
+HASH_FIELD = frozenset({"hash"})
+
 # Centralized transaction content
 PossibleContents = Union[CoinTransferTransaction,
                          StakeTransaction,
                          SmartContractDeploymentTransaction,
                          SmartContractTransaction]
 
-class Transaction(BaseModel):
+def get_signature_message(content: PossibleContents) -> bytes:
+    """
+    The signed message of a transaction content, memoized on the content.
+    """
+    return content.memoize("signature_message", lambda: signature_message(content))
+
+class Transaction(MemoizedModel):
     """
     The Transaction class is a transaction that contains a dictionary depending on the type of transaction.
     """
-    uuid: str = str(uuid.uuid4())
+    uuid: str = Field(default_factory=lambda: str(uuid.uuid4()))
     type: TransactionType
     content: PossibleContents
     signature: str = None
@@ -82,31 +96,71 @@ class Transaction(BaseModel):
             # Add new transaction types here
         raise ValueError("Invalid content for transaction type")
 
+    def requires_signature(self) -> bool:
+        return self.type in SIGNED_TRANSACTION_TYPES
+
     @staticmethod
     def verify_signature(content: PossibleContents, signature: str, public_key: str) -> bool:
         """
-        Verify the signature of a transaction using ECDSA.
+        Verify the signature of a transaction using ECDSA (signatures already verified by the node are cached).
         :param content: The content of the transaction.
         :param signature: The signature to be verified.
         :param public_key: The public key that corresponds to the private key used for signing.
         :return: True if the signature is valid, False otherwise.
         """
-        transaction_content_json = json.dumps(dict(content), separators=(',', ':'))
-        vk = ecdsa.VerifyingKey.from_string(binascii.unhexlify(public_key), curve=ecdsa.SECP256k1)
-        try:
-            return vk.verify(binascii.unhexlify(signature), transaction_content_json.encode())
-        except ecdsa.BadSignatureError:
-            return False
+        return signature_cache.verify(get_signature_message(content), signature, public_key)
 
 class TransactionWithAdditionalData(Transaction):
     """
     The TransactionWithAdditionalData class is a transaction that contains a dictionary depending on the type of transaction.
     """
-    timestamp: Optional[int] = int(datetime.now(pytz.timezone('America/Bogota')).timestamp())
+    timestamp: Optional[int] = Field(default_factory=lambda: int(datetime.now(pytz.timezone('America/Bogota')).timestamp()))
     hash: Optional[str] = None
 
+    def json(self, **kwargs) -> str:
+        """
+        The JSON of the transaction, memoized when no option is given (gossip, mempool sizes).
+        """
+        if kwargs:
+            return super().json(**kwargs)
+        return self.memoize("json", super().json)
+
+    def canonical_bytes(self) -> bytes:
+        """
+        The encoding the hash is computed from: the JSON of the transaction with an empty hash field.
+        """
+        def encode() -> bytes:
+            data = self.dict()
+            data["hash"] = None
+            return self.__config__.json_dumps(data, default=self.__json_encoder__).encode()
+        return self.memoize("canonical_bytes", encode, exclude=HASH_FIELD)
+
     def compute_hash(self) -> str:
         """
-        Compute the unique identifier for the transaction.
+        Compute the unique identifier for the transaction (whatever the hash field holds, it is hashed empty).
+        """
+        return self.memoize("hash", lambda: hashlib.sha256(self.canonical_bytes()).hexdigest(), exclude=HASH_FIELD)
+
+    def has_valid_hash(self) -> bool:
+        """
+        Check the hash of the transaction against its content.
         """
-        return hashlib.sha256(self.json().encode()).hexdigest()
+        return self.hash is not None and self.hash == self.compute_hash()
+
+class TransactionStatus(str, Enum):
+    """
+    The TransactionStatus class is an enumeration that contains the states of a transaction in a node.
+    """
+    PENDING = "pending"
+    CONFIRMED = "confirmed"
+    UNKNOWN = "unknown"
+
+class TransactionReceipt(BaseModel):
+    """
+    The TransactionReceipt class tells where a transaction is: in the mempool, in a block of the chain or unknown to the node.
+    """
+    hash: str
+    status: TransactionStatus
+    block_height: Optional[int] = None
+    block_hash: Optional[str] = None
+    position: Optional[int] = None # Position of the transaction in its block
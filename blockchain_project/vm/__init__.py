@@ -1 +1 @@
-from .classes import VM
\ No newline at end of file
+from .classes import VM, SmartContract
\ No newline at end of file
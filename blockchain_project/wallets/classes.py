@@ -1,8 +1,8 @@
-import ecdsa
-import binascii
 from typing import Optional
 from pydantic import BaseModel
 
+from blockchain_project.crypto import generate_private_key, public_key_from_private_key
+
 class Wallet(BaseModel):
     """
     The Wallet class is a wallet that contains the public and private keys.
@@ -11,11 +11,8 @@ class Wallet(BaseModel):
     public_key: Optional[str]
 
     def generate_keys(self) -> None:
-        sk = ecdsa.SigningKey.generate(curve=ecdsa.SECP256k1) # Private key
-        vk = sk.verifying_key # Public key
-
-        self.private_key = binascii.hexlify(sk.to_string()).decode('utf-8')
-        self.public_key = binascii.hexlify(vk.to_string()).decode('utf-8')
+        self.private_key = generate_private_key() # Private key
+        self.public_key = public_key_from_private_key(self.private_key) # Public key
         
     def get_public_key(self) -> str:
         return self.public_key
@@ -27,6 +24,4 @@ class Wallet(BaseModel):
         """
         Gets the public key from the private key.
         """
-        sk = ecdsa.SigningKey.from_string(binascii.unhexlify(private_key), curve=ecdsa.SECP256k1)
-        vk = sk.verifying_key
-        return binascii.hexlify(vk.to_string()).decode('utf-8')
\ No newline at end of file
+        return public_key_from_private_key(private_key)
\ No newline at end of file
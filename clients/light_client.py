@@ -0,0 +1,164 @@
+import json
+import os
+import hashlib
+import requests
+from typing import Optional
+
+HEADERS_FILE = "headers.json"
+
+# Headers requested per call, the node returns at most MAX_HEADERS_PER_REQUEST of them
+HEADERS_BATCH_SIZE = 2000
+
+# Domain separation of the Merkle tree, must match blockchain_project.blocks.methods
+MERKLE_LEAF_PREFIX = b"\x00"
+MERKLE_NODE_PREFIX = b"\x01"
+
+def api_url(node_url: str) -> str:
+    return f"http://{node_url}/api/v1/blockchain"
+
+def compute_header_hash(header: dict) -> str:
+    """
+    Hash of a block with a Merkle root, computed from its header only (see BlockHeader.compute_hash).
+    """
+    header_json = json.dumps({"index": header["index"],
+                              "previous_hash": header["previous_hash"],
+                              "timestamp": header["timestamp"],
+                              "merkle_root": header["merkle_root"]}, separators=(',', ':'))
+    return hashlib.sha256(header_json.encode()).hexdigest()
+
+def merkle_leaf(transaction_hash: str) -> bytes:
+    return hashlib.sha256(MERKLE_LEAF_PREFIX + bytes.fromhex(transaction_hash)).digest()
+
+def merkle_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(MERKLE_NODE_PREFIX + left + right).digest()
+
+def verify_merkle_proof(transaction_hash: str, steps: list[dict], merkle_root: str) -> bool:
+    try:
+        node = merkle_leaf(transaction_hash)
+        for step in steps:
+            if step["side"] == "left":
+                node = merkle_node(bytes.fromhex(step["hash"]), node)
+            elif step["side"] == "right":
+                node = merkle_node(node, bytes.fromhex(step["hash"]))
+            else:
+                return False
+    except (KeyError, ValueError, TypeError):
+        return False
+    return node.hex() == merkle_root
+
+def load_headers() -> list[dict]:
+    if os.path.exists(HEADERS_FILE):
+        with open(HEADERS_FILE, "r") as file:
+            return json.load(file)
+    return []
+
+def save_headers(headers: list[dict]):
+    with open(HEADERS_FILE, "w") as file:
+        json.dump(headers, file)
+
+def check_header(header: dict, previous: Optional[dict], height: int):
+    """
+    Check that a header extends the synced chain. Headers of blocks without a Merkle root (created before them)
+    can only be checked by their link, their hash covers the transactions.
+    """
+    if header["index"] != height:
+        raise Exception(f"Unexpected header #{header['index']}, expected #{height}")
+    if previous is not None and header["previous_hash"] != previous["hash"]:
+        raise Exception(f"Header #{height} does not extend the synced header chain")
+    if header.get("merkle_root") is not None and compute_header_hash(header) != header["hash"]:
+        raise Exception(f"Invalid hash for header #{height}")
+
+def fetch_headers(node_url: str, start: int, end: int) -> list[dict]:
+    response = requests.get(f"{api_url(node_url)}/headers/", params={"start": start, "end": end})
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch headers: {response.text}")
+    return response.json()
+
+def get_locator_heights(length: int) -> list[int]:
+    """
+    Heights of the synced headers to look for in the chain of the node: the last ones one by one,
+    then exponentially sparser down to the genesis block (like Blockchain.get_block_locator).
+    """
+    heights, height, step = [], length - 1, 1
+    while height > 0:
+        heights.append(height)
+        if len(heights) >= 10:
+            step *= 2
+        height -= step
+    return heights + [0] if length > 0 else []
+
+def find_fork_point(node_url: str, headers: list[dict]) -> int:
+    """
+    Get the height of the last synced header that is still in the chain of the node, -1 if none is.
+    """
+    for height in get_locator_heights(len(headers)):
+        node_headers = fetch_headers(node_url, height, height + 1)
+        if node_headers and node_headers[0]["hash"] == headers[height]["hash"]:
+            return height
+    return -1
+
+def sync_headers(node_url: str, headers: list[dict]) -> list[dict]:
+    """
+    Download the headers after the last synced one, checking each of them before adding it.
+    The last synced header is requested again: if the node left its branch (reorganization, reset by /connect/),
+    the headers after the fork point are dropped and the headers of the new branch are synced.
+    """
+    while True:
+        start = max(len(headers) - 1, 0)
+        batch = fetch_headers(node_url, start, start + HEADERS_BATCH_SIZE)
+
+        if headers:
+            if not batch or batch[0]["hash"] != headers[-1]["hash"]:
+                fork_point = find_fork_point(node_url, headers)
+                print(f"The node left the synced header chain at #{fork_point + 1}, syncing its branch")
+                del headers[fork_point + 1:]
+                continue
+            batch = batch[1:]
+
+        if not batch:
+            return headers
+
+        for header in batch:
+            check_header(header, headers[-1] if headers else None, len(headers))
+            headers.append(header)
+
+def verify_transaction(node_url: str, transaction_hash: str, headers: list[dict]) -> bool:
+    """
+    Check that a transaction is confirmed, from its Merkle proof and the synced header chain only.
+    The headers synced meanwhile are saved.
+    """
+    response = requests.get(f"{api_url(node_url)}/transaction/proof/{transaction_hash}/")
+    if response.status_code == 404:
+        return False
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch the proof: {response.text}")
+
+    proof = response.json()
+    height = proof["block_height"]
+    if height >= len(headers) or proof["header"]["hash"] != headers[height]["hash"]:
+        # A block after the synced headers, or on a branch the node switched to since they were synced
+        headers = sync_headers(node_url, headers)
+        save_headers(headers)
+    if height >= len(headers) or proof["header"]["hash"] != headers[height]["hash"]:
+        return False
+
+    # The root comes from the synced header, not from the node's answer
+    header = headers[height]
+    if header.get("merkle_root") is None:
+        return False
+    return proof["transaction_hash"] == transaction_hash and \
+           verify_merkle_proof(transaction_hash, proof["steps"], header["merkle_root"])
+
+def main():
+    node_url = input("Enter the node URL: ")
+    transaction_hash = input("Enter the transaction hash: ")
+    headers = sync_headers(node_url, load_headers())
+    save_headers(headers)
+    print(f"Synced {len(headers)} headers")
+    if verify_transaction(node_url, transaction_hash, headers):
+        print("The transaction is confirmed")
+    else:
+        print("The transaction could not be proven")
+
+if __name__ == "__main__":
+    main()
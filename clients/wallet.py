@@ -4,11 +4,23 @@ import os
 import requests
 import ecdsa
 import binascii
+import hashlib
 import random
 from typing import Tuple, Union
 
+from light_client import load_headers, save_headers, sync_headers, verify_transaction
+
+try:
+    import coincurve
+    from coincurve.ecdsa import der_to_cdata, serialize_compact
+except ImportError: # The accelerated signature backend is optional
+    coincurve = None
+
 CONFIG_FILE = "wallet_config.json"
 
+# ECDSA implementation used to sign: ecdsa (pure Python) or coincurve (libsecp256k1), both produce the same encoding
+SIGNATURE_BACKEND = os.getenv("SIGNATURE_BACKEND", "ecdsa")
+
 class TransactionType(int, Enum):
     """
     The TransactionType class is an enumeration that contains the types of transactions.
@@ -39,6 +51,11 @@ def create_wallet(node_url: str) -> Tuple[str, str]:
 
 def sign_content(content: dict, private_key_str: str) -> str:
     content_json = json.dumps(dict(content), separators=(',', ':'))
+    if SIGNATURE_BACKEND == "coincurve" and coincurve is not None:
+        # Raw r||s over the (left padded) SHA-1 digest, the same encoding as the ecdsa package
+        digest = hashlib.sha1(content_json.encode()).digest().rjust(32, b"\x00")
+        signature = coincurve.PrivateKey(binascii.unhexlify(private_key_str)).sign(digest, hasher=None)
+        return binascii.hexlify(serialize_compact(der_to_cdata(signature))).decode('utf-8')
     sk = ecdsa.SigningKey.from_string(binascii.unhexlify(private_key_str), curve=ecdsa.SECP256k1)
     signature = sk.sign(content_json.encode())
     return binascii.hexlify(signature).decode('utf-8')
@@ -59,7 +76,8 @@ def menu():
         print("7. Deploy Test Smart Contract")
         print("8. Call Smart Contract")
         print("9. Call Test Smart Contract")
-        print("10. Exit")
+        print("10. Verify Transaction")
+        print("11. Exit")
         choice = input("Enter your choice: ")
 
         if choice == '1':
@@ -81,6 +99,8 @@ def menu():
         elif choice == '9':
             call_test_smart_contract(config)
         elif choice == '10':
+            verify_confirmed_transaction(config)
+        elif choice == '11':
             break
         else:
             print("Invalid choice. Please try again.")
@@ -92,6 +112,15 @@ def set_configuration(config: dict):
     save_config(config)
 
 # Transaction operations
+def verify_confirmed_transaction(config: dict):
+    transaction_hash = input("Enter the transaction hash: ")
+    headers = sync_headers(config["node_url"], load_headers())
+    save_headers(headers)
+    if verify_transaction(config["node_url"], transaction_hash, headers):
+        print("The transaction is confirmed in block headers synced by this wallet")
+    else:
+        print("The transaction could not be proven")
+
 def send_manual_transaction(config: dict):
     receiver = input("Enter receiver address: ")
     amount = float(input("Enter amount to transfer: "))